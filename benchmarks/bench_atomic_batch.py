@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Measures a batch of POSTs committed one by one and as an "atomic" batch --
+one commit, with a savepoint per POST -- against a sqlite file.
+
+    python benchmarks/bench_atomic_batch.py [posts] [repeat]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from django.conf import settings  # noqa: E402
+
+DATABASE_DIR = tempfile.mkdtemp()
+settings.configure(
+    DATABASES={
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(DATABASE_DIR, 'bench.sqlite3'),
+        }
+    },
+    INSTALLED_APPS=[],
+)
+
+import django  # noqa: E402
+import django.db  # noqa: E402
+
+from savory_pie.django import fields, resources, views  # noqa: E402
+from savory_pie.formatters import json  # noqa: E402
+from savory_pie.resources import APIResource  # noqa: E402
+from savory_pie.tests.django.mock_request import Request  # noqa: E402
+
+
+def make_classes():
+    class Item(django.db.models.Model):
+        name = django.db.models.CharField(max_length=20)
+        price = django.db.models.IntegerField()
+
+        class Meta:
+            app_label = 'benchmarks'
+
+    class ItemResource(resources.ModelResource):
+        parent_resource_path = 'items'
+        model_class = Item
+        fields = [
+            fields.AttributeField(attribute='name', type=unicode),
+            fields.AttributeField(attribute='price', type=int),
+        ]
+
+    class ItemQuerySetResource(resources.QuerySetResource):
+        resource_class = ItemResource
+
+    return Item, ItemQuerySetResource
+
+
+def main(post_count=200, repeat=5):
+    try:
+        django.setup()
+    except AttributeError:
+        pass
+
+    Item, ItemQuerySetResource = make_classes()
+    with django.db.connection.schema_editor() as editor:
+        editor.create_model(Item)
+
+    root_resource = APIResource()
+    root_resource.register(ItemQuerySetResource())
+    view = views.batch_api_view(root_resource, r'^api/(?P<base_resource>.*)$')
+
+    def run(atomic):
+        body = json.dumps({'atomic': atomic, 'data': [
+            {'method': 'post', 'uri': 'http://localhost/api/items', 'body': {'name': u'item %d' % i, 'price': i}}
+            for i in range(post_count)
+        ]})
+        response = view(Request('POST', host='localhost', body=body), '')
+        assert all(result['status'] == 201 for result in json.loads(response.content)['data'])
+
+    print '%d POSTs, best of %d' % (post_count, repeat)
+    results = {}
+    for name, atomic in [('per POST', False), ('atomic', True)]:
+        results[name] = min(timeit.repeat(lambda: run(atomic), number=1, repeat=repeat))
+        print '  %-10s %8.1f ms' % (name, results[name] * 1000)
+    print '  speedup    %8.2fx' % (results['per POST'] / results['atomic'])
+
+
+if __name__ == '__main__':
+    try:
+        main(*[int(arg) for arg in sys.argv[1:]])
+    finally:
+        shutil.rmtree(DATABASE_DIR)
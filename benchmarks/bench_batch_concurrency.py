@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Measures a batch of list GETs run one after another and on a thread pool
+(batch_api_view's max_workers), against a sqlite file standing in for a
+database server -- each query is delayed by latency milliseconds to stand in
+for the round trip.
+
+    python benchmarks/bench_batch_concurrency.py [gets] [max_workers] [latency] [repeat]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from django.conf import settings  # noqa: E402
+
+DATABASE_DIR = tempfile.mkdtemp()
+settings.configure(
+    DATABASES={
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(DATABASE_DIR, 'bench.sqlite3'),
+        }
+    },
+    INSTALLED_APPS=[],
+)
+
+import django  # noqa: E402
+import django.db  # noqa: E402
+from django.db.backends.utils import CursorWrapper  # noqa: E402
+
+from savory_pie.django import fields, resources, views  # noqa: E402
+from savory_pie.formatters import json  # noqa: E402
+from savory_pie.resources import APIResource  # noqa: E402
+from savory_pie.tests.django.mock_request import Request  # noqa: E402
+
+
+def make_classes():
+    class Item(django.db.models.Model):
+        name = django.db.models.CharField(max_length=20)
+        price = django.db.models.IntegerField()
+
+        class Meta:
+            app_label = 'benchmarks'
+
+    class ItemResource(resources.ModelResource):
+        parent_resource_path = 'items'
+        model_class = Item
+        fields = [
+            fields.AttributeField(attribute='name', type=unicode),
+            fields.AttributeField(attribute='price', type=int),
+        ]
+
+    class ItemQuerySetResource(resources.QuerySetResource):
+        resource_class = ItemResource
+        page_size = 10
+
+    return Item, ItemQuerySetResource
+
+
+def add_round_trip(latency):
+    execute = CursorWrapper.execute
+
+    def delayed_execute(self, sql, params=None):
+        time.sleep(latency)
+        return execute(self, sql, params)
+    CursorWrapper.execute = delayed_execute
+
+
+def main(get_count=30, max_workers=8, latency=5, repeat=5):
+    try:
+        django.setup()
+    except AttributeError:
+        pass
+
+    Item, ItemQuerySetResource = make_classes()
+    with django.db.connection.schema_editor() as editor:
+        editor.create_model(Item)
+    Item.objects.bulk_create([Item(name=u'item %d' % i, price=i) for i in range(get_count * 10)])
+    # other threads' connections must see the rows
+    django.db.connection.close()
+    add_round_trip(latency / 1000.0)
+
+    root_resource = APIResource()
+    root_resource.register(ItemQuerySetResource())
+    body = json.dumps({'data': [
+        {'method': 'get', 'uri': 'http://localhost/api/items', 'body': {'page': page}}
+        for page in range(get_count)
+    ]})
+
+    def run(view):
+        response = view(Request('POST', host='localhost', body=body), '')
+        assert all(result['status'] == 200 for result in json.loads(response.content)['data'])
+
+    print '%d list GETs, %d ms per query, best of %d' % (get_count, latency, repeat)
+    results = {}
+    for name, workers in [('serial', None), ('%d workers' % max_workers, max_workers)]:
+        view = views.batch_api_view(root_resource, r'^api/(?P<base_resource>.*)$', max_workers=workers)
+        results[name] = min(timeit.repeat(lambda: run(view), number=1, repeat=repeat))
+        print '  %-10s %8.1f ms' % (name, results[name] * 1000)
+    print '  speedup    %8.2fx' % (results['serial'] / results['%d workers' % max_workers])
+
+
+if __name__ == '__main__':
+    try:
+        main(*[int(arg) for arg in sys.argv[1:]])
+    finally:
+        shutil.rmtree(DATABASE_DIR)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Measures creating rows with a POST each and with one POST of newline
+delimited JSON to a QuerySetResource's import sub-resource, against a sqlite
+file.
+
+    python benchmarks/bench_import.py [rows] [chunk_size] [repeat]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from django.conf import settings  # noqa: E402
+
+DATABASE_DIR = tempfile.mkdtemp()
+settings.configure(
+    DATABASES={
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(DATABASE_DIR, 'bench.sqlite3'),
+        }
+    },
+    INSTALLED_APPS=[],
+)
+
+import django  # noqa: E402
+import django.db  # noqa: E402
+
+from savory_pie.django import fields, resources, views  # noqa: E402
+from savory_pie.formatters import json  # noqa: E402
+from savory_pie.resources import APIResource  # noqa: E402
+from savory_pie.tests.django.mock_request import Request  # noqa: E402
+
+
+def make_classes(chunk_size):
+    class Item(django.db.models.Model):
+        sku = django.db.models.CharField(max_length=20, unique=True)
+        name = django.db.models.CharField(max_length=20)
+        price = django.db.models.IntegerField()
+
+        class Meta:
+            app_label = 'benchmarks'
+
+    class ItemResource(resources.ModelResource):
+        parent_resource_path = 'items'
+        model_class = Item
+        published_key = ('sku', unicode)
+        fields = [
+            fields.AttributeField(attribute='sku', type=unicode),
+            fields.AttributeField(attribute='name', type=unicode),
+            fields.AttributeField(attribute='price', type=int),
+        ]
+
+    class ItemQuerySetResource(resources.QuerySetResource):
+        resource_class = ItemResource
+        allow_import = True
+        import_chunk_size = chunk_size
+
+    return Item, ItemQuerySetResource
+
+
+def main(row_count=2000, chunk_size=500, repeat=3):
+    try:
+        django.setup()
+    except AttributeError:
+        pass
+
+    Item, ItemQuerySetResource = make_classes(chunk_size)
+    with django.db.connection.schema_editor() as editor:
+        editor.create_model(Item)
+
+    root_resource = APIResource()
+    root_resource.register(ItemQuerySetResource())
+    view = views.api_view(root_resource)
+    rows = [json.dumps({'sku': u'sku-%d' % i, 'name': u'item %d' % i, 'price': i}) for i in range(row_count)]
+
+    def per_row():
+        Item.objects.all().delete()
+        for row in rows:
+            response = view(Request('POST', resource_path='items', body=row), 'items')
+            assert response.status_code == 201
+
+    def import_():
+        Item.objects.all().delete()
+        body = '\n'.join(rows) + '\n'
+        response = view(Request('POST', resource_path='items/import', body=body), 'items/import')
+        assert json.loads(response.content)['createdCount'] == row_count
+
+    print '%d rows, %d per import chunk, best of %d' % (row_count, chunk_size, repeat)
+    results = {}
+    for name, run in [('per row', per_row), ('import', import_)]:
+        results[name] = min(timeit.repeat(run, number=1, repeat=repeat))
+        print '  %-10s %8.1f ms' % (name, results[name] * 1000)
+    print '  speedup    %8.2fx' % (results['per row'] / results['import'])
+
+
+if __name__ == '__main__':
+    try:
+        main(*[int(arg) for arg in sys.argv[1:]])
+    finally:
+        shutil.rmtree(DATABASE_DIR)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Measures the JSON encoding done for a list response -- the per-object $hash,
+the response ETag and the response body -- encoding every object each time
+versus encoding each object once.
+
+    python benchmarks/bench_list_encoding.py [rows] [fields] [repeat]
+"""
+import os
+import sys
+import timeit
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from savory_pie.context import APIContext  # noqa: E402
+from savory_pie.formatters import JSONFormatter, json  # noqa: E402
+from savory_pie.helpers import _hash_string, add_sha1, encode_with_sha1, get_sha1  # noqa: E402
+
+
+def make_objects(row_count, field_count):
+    return [
+        OrderedDict(('field%d' % n, u'value %d' % (i * n)) for n in range(field_count))
+        for i in range(row_count)
+    ]
+
+
+def main(row_count=1000, field_count=30, repeat=5):
+    ctx = APIContext('http://localhost/api/', None, JSONFormatter())
+    meta = {'count': row_count, 'resourceUri': 'http://localhost/api/rows'}
+    state = {}
+
+    def setup():
+        state['objects'] = make_objects(row_count, field_count)
+
+    def encode_each_time():
+        objects = []
+        for obj in state['objects']:
+            obj['$hash'] = get_sha1(ctx, obj)
+            objects.append(obj)
+        content_dict = {'meta': meta, 'objects': objects}
+        etag = get_sha1(ctx, content_dict)
+        return etag, json.dumps(content_dict)
+
+    def encode_once():
+        objects = [add_sha1(ctx, obj) for obj in state['objects']]
+        return encode_with_sha1(ctx, {'meta': meta, 'objects': objects})[::-1]
+
+    setup()
+    etag, body = encode_once()
+    setup()
+    assert (etag, body) == encode_each_time()
+    assert etag == _hash_string(body)
+
+    print '%d rows x %d fields, best of %d' % (row_count, field_count, repeat)
+    results = {}
+    for name, func in [('each time', encode_each_time), ('once', encode_once)]:
+        results[name] = min(timeit.repeat(func, setup, number=1, repeat=repeat))
+        print '  %-10s %8.1f ms' % (name, results[name] * 1000)
+    print '  speedup    %8.2fx' % (results['each time'] / results['once'])
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
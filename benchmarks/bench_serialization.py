@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Measures ModelResource.get over a list of models, with the compiled outgoing
+plan and with the plain per-field handle_outgoing loop.
+
+    DJANGO_SETTINGS_MODULE=savory_pie.tests.django.dummy_settings \\
+        python benchmarks/bench_serialization.py [rows] [fields] [repeat]
+"""
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'savory_pie.tests.django.dummy_settings')
+
+from savory_pie.context import APIContext  # noqa: E402
+from savory_pie.django import fields, resources  # noqa: E402
+from savory_pie.formatters import JSONFormatter  # noqa: E402
+from savory_pie.resources import EmptyParams  # noqa: E402
+
+
+FIELD_TYPES = [
+    (int, lambda i: i),
+    (unicode, lambda i: u'value %d' % i),
+    (float, lambda i: i / 3.0),
+    (bool, lambda i: i % 2 == 0),
+    (datetime.datetime, lambda i: datetime.datetime(2013, 3, 5, 14, 50, i % 60)),
+]
+
+
+class Row(object):
+    pass
+
+
+def make_resource_class(field_count):
+    class RowResource(resources.ModelResource):
+        parent_resource_path = 'rows'
+        model_class = Row
+        fields = [
+            fields.AttributeField(attribute='field_%d' % n, type=FIELD_TYPES[n % len(FIELD_TYPES)][0])
+            for n in range(field_count)
+        ]
+    return RowResource
+
+
+def make_rows(row_count, field_count):
+    rows = []
+    for i in range(row_count):
+        row = Row()
+        row.pk = i + 1
+        for n in range(field_count):
+            setattr(row, 'field_%d' % n, FIELD_TYPES[n % len(FIELD_TYPES)][1](i))
+        rows.append(row)
+    return rows
+
+
+def main(row_count=1000, field_count=30, repeat=5):
+    resource_class = make_resource_class(field_count)
+    rows = make_rows(row_count, field_count)
+    ctx = APIContext('http://localhost/api/', None, JSONFormatter())
+    params = EmptyParams()
+
+    def compiled():
+        for row in rows:
+            resource_class(row).get(ctx, params)
+
+    def uncompiled():
+        for row in rows:
+            uncompiled_get(resource_class, row, ctx, params)
+
+    assert resource_class(rows[0]).get(ctx, params) == uncompiled_get(resource_class, rows[0], ctx, params)
+
+    print '%d rows x %d fields, best of %d' % (row_count, field_count, repeat)
+    results = {}
+    for name, func in [('uncompiled', uncompiled), ('compiled', compiled)]:
+        results[name] = min(timeit.repeat(func, number=1, repeat=repeat))
+        print '  %-10s %8.1f ms' % (name, results[name] * 1000)
+    print '  speedup    %8.2fx' % (results['uncompiled'] / results['compiled'])
+
+
+def uncompiled_get(resource_class, row, ctx, params):
+    resource = resource_class(row)
+    # instance-level fields bypass the class's compiled plan
+    resource.fields = list(resource_class.fields)
+    return resource.get(ctx, params)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
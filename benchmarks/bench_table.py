@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Measures a QuerySetResource GET over an in-memory sqlite table, encoded as
+objects and as a table (?format=table) -- time to build and encode the
+response, and its size.
+
+    DJANGO_SETTINGS_MODULE=savory_pie.tests.django.dummy_settings \\
+        python benchmarks/bench_table.py [rows] [fields] [repeat]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'savory_pie.tests.django.dummy_settings')
+
+import django  # noqa: E402
+import django.db  # noqa: E402
+from django.http import QueryDict  # noqa: E402
+
+from savory_pie.context import APIContext  # noqa: E402
+from savory_pie.django import fields, resources  # noqa: E402
+from savory_pie.formatters import JSONFormatter  # noqa: E402
+from savory_pie.resources import _ParamsImpl  # noqa: E402
+
+
+def make_classes(field_count):
+    attrs = dict(('field_%d' % n, django.db.models.IntegerField() if n % 2 else django.db.models.CharField(max_length=20))
+                 for n in range(field_count))
+    attrs['__module__'] = __name__
+    attrs['Meta'] = type('Meta', (object,), {'app_label': 'benchmarks'})
+    Row = type('Row', (django.db.models.Model,), attrs)
+
+    class RowResource(resources.ModelResource):
+        parent_resource_path = 'rows'
+        model_class = Row
+        fields = [
+            fields.AttributeField(attribute='field_%d' % n, type=int if n % 2 else unicode)
+            for n in range(field_count)
+        ]
+
+    class RowQuerySetResource(resources.QuerySetResource):
+        resource_class = RowResource
+
+    return Row, RowQuerySetResource
+
+
+def main(row_count=10000, field_count=10, repeat=5):
+    try:
+        django.setup()
+    except AttributeError:
+        pass
+
+    Row, RowQuerySetResource = make_classes(field_count)
+    with django.db.connection.schema_editor() as editor:
+        editor.create_model(Row)
+    Row.objects.bulk_create([
+        Row(**dict(('field_%d' % n, i if n % 2 else u'value %d' % i) for n in range(field_count)))
+        for i in range(row_count)
+    ])
+
+    ctx = APIContext('http://localhost/api/', None, JSONFormatter())
+    resource = RowQuerySetResource(Row.objects.order_by('pk'))
+
+    def get(query):
+        params = _ParamsImpl(QueryDict(query))
+        return lambda: ctx.formatter.encode(resource.get(ctx, params))
+
+    print '%d rows x %d fields, best of %d' % (row_count, field_count, repeat)
+    results = {}
+    for name, query in [('objects', ''), ('table', 'format=table')]:
+        results[name] = min(timeit.repeat(get(query), number=1, repeat=repeat))
+        size = len(get(query)())
+        print '  %-10s %8.1f ms %10d bytes' % (name, results[name] * 1000, size)
+    print '  speedup    %8.2fx' % (results['objects'] / results['table'])
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
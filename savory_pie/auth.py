@@ -32,7 +32,11 @@ def subobject_auth_adapter(field, ctx, source_dict, target_obj):
         source = None
     # this is essentially the same logic as in field.get_subresource(), but
     # ignores source_dict as we're only interested in target's resourceUri
-    target_subobject = getattr(target_obj, field.name)
+    target_subobject = ctx.identity_map.get_related(
+        target_obj,
+        field.name,
+        getattr(field._resource_class, 'model_class', None)
+    )
     if target_subobject is not None:
         target = ctx.build_resource_uri(field._resource_class(target_subobject))
     else:
@@ -45,16 +49,23 @@ def uri_auth_adapter(field, ctx, source_dict, target_obj):
     Authorization adapter for use in fields representing a 1 to many relationship.  Is used when you want to prevent
     unauthorized users from changing the associations of different models.
     """
+    from savory_pie.fields import URIResourceField, URIListResourceField, IterableField
+
     name = field._compute_property(ctx)
     source_field = source_dict[name]
-    target_field = getattr(target_obj, field.name)
-
-    from savory_pie.fields import URIResourceField, URIListResourceField, IterableField
+    if isinstance(field, URIResourceField):
+        target_field = ctx.identity_map.get_related(
+            target_obj,
+            field.name,
+            getattr(field._resource_class, 'model_class', None)
+        )
+    else:
+        target_field = getattr(target_obj, field.name)
 
     if source_field and target_field:
         if isinstance(field, IterableField):
             source = [source_field_item.get('resourceUri', None) for source_field_item in source_field]
-            target = [ctx.build_resource_uri(field._resource_class(target_item))
+            target = [ctx.build_resource_uri(field._resource_class(ctx.identity_map.add(target_item)))
                       for target_item in field.get_iterable(target_field)]
             source.sort()
             target.sort()
@@ -63,7 +74,7 @@ def uri_auth_adapter(field, ctx, source_dict, target_obj):
             target = ctx.build_resource_uri(field._resource_class(target_field))
         elif isinstance(field, URIListResourceField):
             source = source_field
-            target = [ctx.build_resource_uri(field._resource_class(target_item))
+            target = [ctx.build_resource_uri(field._resource_class(ctx.identity_map.add(target_item)))
                       for target_item in field.get_iterable(target_field)]
             source.sort()
             target.sort()
@@ -1,6 +1,295 @@
+import collections
 import contextlib
 
 
+class IdentityMap(object):
+    """
+    Per-request map of models keyed by (model class, pk).  Anything that loads
+    a model while handling a request can add it here, and anything about to go
+    to the database for a model by pk can check here first, so the same row is
+    only loaded once per request.
+
+    Models are also kept by the query that loaded them (see add_loaded), for
+    lookups that must only be answered by a model loaded with the same
+    joins and filters.
+    """
+    def __init__(self):
+        self._models = {}
+        self._loaded = {}
+
+    def __len__(self):
+        return len(self._models)
+
+    def get(self, model_class, pk):
+        """
+        Returns the model of model_class with the given pk, or None if it has
+        not been loaded during this request.
+        """
+        if pk is None or model_class is None:
+            return None
+        return self._models.get((_concrete_class(model_class), pk))
+
+    def add(self, model):
+        """
+        Adds a (saved) model to the map and returns it.
+        """
+        pk = getattr(model, 'pk', None)
+        if pk is not None:
+            self._models[(_concrete_class(type(model)), pk)] = model
+        return model
+
+    def get_loaded(self, query_key, path_fragment):
+        """
+        Returns the model add_loaded for path_fragment under query_key, or
+        None.  A query_key of None is never found.
+        """
+        if query_key is None:
+            return None
+        return self._loaded.get((query_key, path_fragment))
+
+    def add_loaded(self, query_key, path_fragment, model):
+        """
+        Adds a model looked up as path_fragment with the query identified by
+        query_key (e.g. its SQL) to the map and returns it.
+        """
+        if query_key is not None:
+            self._loaded[(query_key, path_fragment)] = model
+        return self.add(model)
+
+    def discard(self, model):
+        """
+        Removes a model from the map, e.g. after it has been deleted.
+        """
+        self._models.pop((_concrete_class(type(model)), getattr(model, 'pk', None)), None)
+        for key in [key for key, loaded_model in self._loaded.items() if loaded_model is model]:
+            del self._loaded[key]
+
+    def get_related(self, obj, attribute, model_class=None):
+        """
+        Returns getattr(obj, attribute), skipping the load when attribute is a
+        foreign key whose target (of model_class) is already in the map.
+        Whatever is loaded is added to the map.
+        """
+        model = None
+        if model_class is not None:
+            model = self.get(model_class, getattr(obj, attribute + '_id', None))
+
+        if model is None:
+            model = getattr(obj, attribute)
+            if model is not None:
+                self.add(model)
+        return model
+
+    def clear(self):
+        self._models.clear()
+        self._loaded.clear()
+
+
+class SubResourceMemo(object):
+    """
+    Per-request memo of what embedding fields build for related models, e.g.
+    the dict of a sub-resource keyed by (resource class, pk, field selection),
+    so a model embedded many times in a response is only serialized once.
+
+    It only memoizes within enabled, which wraps GETs -- a write could make
+    what it holds stale -- and is emptied when the outermost enabled exits.
+    What it returns is shared and must not be modified.
+    """
+    def __init__(self):
+        self._values = {}
+        self._depth = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    @contextlib.contextmanager
+    def enabled(self):
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if not self._depth:
+                self._values.clear()
+
+    def get_or_build(self, key, build):
+        """
+        Returns the value memoized for key, calling build() for it if there is
+        none.  A key of None is never memoized.
+        """
+        if not self._depth or key is None:
+            return build()
+        try:
+            return self._values[key]
+        except KeyError:
+            value = self._values[key] = build()
+            return value
+
+
+class FieldSelection(object):
+    """
+    The fields a client asked for with the fields / exclude parameters, e.g.
+    ?fields=name,manager.name or ?exclude=employees.  Names are public property
+    names; dotted paths reach into the fields of sub-resources.
+
+    A field that is not selected is neither prepared nor serialized, so the
+    joins and prefetches it would have needed are never issued.  resourceUri
+    is always serialized.
+
+    The selection also carries the sideload parameter, e.g.
+    ?sideload=store,items.product, naming the sub-resources to be serialized
+    into the included map of the response instead of inline (see
+    APIContext.including), and the expand parameter, e.g.
+    ?expand=store,items.product, naming collapsed fields to embed anyway.
+    """
+    def __init__(self, include=None, exclude=None, sideload=None, expand=None):
+        # include is None when every field is selected; otherwise, as in
+        # exclude, a name maps to True (the whole field) or to a nested dict.
+        self._include = include
+        self._exclude = exclude or {}
+        # a name maps to a nested dict, holding '' if the field is sideloaded
+        self._sideload = sideload or {}
+        self._expand = expand or {}
+
+    @classmethod
+    def from_params(cls, params):
+        """
+        Builds a FieldSelection from the fields and exclude parameters, or
+        returns None if params has neither.
+        """
+        has_fields = params.get('fields') is not None
+        if not has_fields and all(params.get(name) is None for name in ('exclude', 'sideload', 'expand')):
+            return None
+
+        include = None
+        if has_fields:
+            include = _parse_field_paths(params.get_list('fields'))
+        return cls(
+            include,
+            _parse_field_paths(params.get_list('exclude')),
+            _parse_path_tree(params.get_list('sideload')),
+            _parse_path_tree(params.get_list('expand'))
+        )
+
+    @property
+    def is_all(self):
+        return self._include is None and not self._exclude and not self._sideload and not self._expand
+
+    @property
+    def has_sideloads(self):
+        return bool(self._sideload)
+
+    @property
+    def cache_key(self):
+        """
+        A hashable value equal for selections of the same fields, for keying
+        what is serialized under a selection.
+        """
+        return tuple(
+            _freeze_field_paths(tree) for tree in (self._include, self._exclude, self._sideload, self._expand)
+        )
+
+    def includes(self, property_name):
+        """
+        Returns True if the field named property_name is (at least partly)
+        selected.
+        """
+        if self._include is not None and property_name not in self._include:
+            return False
+        return self._exclude.get(property_name) is not True
+
+    def sideloads(self, property_name):
+        """
+        Returns True if the sub-resources of the field named property_name
+        are to be sideloaded.
+        """
+        return '' in self._sideload.get(property_name, ())
+
+    def expands(self, property_name):
+        """
+        Returns True if the field named property_name is to be embedded even
+        if it is collapsed by default -- it, or a field within it, is named
+        by the expand or sideload parameters.
+        """
+        return property_name in self._expand or property_name in self._sideload
+
+    def includes_field(self, ctx, field):
+        """
+        Like includes, for a field; fields without a public property name are
+        always selected.
+        """
+        compute_property = getattr(field, '_compute_property', None)
+        return compute_property is None or self.includes(compute_property(ctx))
+
+    def child(self, property_name):
+        """
+        Returns the selection within the sub-resource of the field named
+        property_name.
+        """
+        include = None
+        if self._include is not None:
+            include = self._include.get(property_name)
+            if include is True:
+                include = None
+
+        exclude = self._exclude.get(property_name)
+        if exclude is True:
+            exclude = None
+
+        sideload = _get_child_tree(self._sideload, property_name)
+        expand = _get_child_tree(self._expand, property_name)
+        if include is None and not exclude and not sideload and not expand:
+            return ALL_FIELDS
+        return FieldSelection(include, exclude, sideload, expand)
+
+
+ALL_FIELDS = FieldSelection()
+
+
+def _parse_field_paths(values):
+    tree = {}
+    for value in values:
+        for path in value.split(','):
+            parts = [part.strip() for part in path.split('.')]
+            if not all(parts):
+                continue
+
+            node = tree
+            for part in parts[:-1]:
+                node = node.setdefault(part, {})
+                if node is True:
+                    break
+            else:
+                node[parts[-1]] = True
+    return tree
+
+
+def _parse_path_tree(values):
+    tree = {}
+    for value in values:
+        for path in value.split(','):
+            parts = [part.strip() for part in path.split('.')]
+            if not all(parts):
+                continue
+
+            node = tree
+            for part in parts:
+                node = node.setdefault(part, {})
+            node[''] = True
+    return tree
+
+
+def _get_child_tree(tree, name):
+    # leaves out the '' marking the node itself
+    return dict((child_name, node) for child_name, node in tree.get(name, {}).items() if child_name)
+
+
+def _freeze_field_paths(tree):
+    if not isinstance(tree, dict):
+        return tree
+    return tuple(sorted((name, _freeze_field_paths(node)) for name, node in tree.items()))
+
+
 class APIContext(object):
     """
     Context object passed as the second argument (after self) to Resources and Fields.
@@ -15,6 +304,28 @@ class APIContext(object):
     respected. This can be used as a performance improvement when returning
     large result sets where fragments of them can be pre-computed/cached and
     stitched in to a final result.
+
+    The identity_map attribute holds the models loaded while handling the
+    request (see IdentityMap); it is cleared when the request ends.
+
+    The field_selection attribute holds the FieldSelection of the resource
+    being handled; it selects every field unless the client sent fields or
+    exclude parameters.
+
+    The sub_resource_memo attribute (see SubResourceMemo) lets fields reuse
+    the sub-resources they embed while a GET is handled.
+
+    The included attribute maps the URIs of sideloaded sub-resources to their
+    dicts while a response with sideloads is built (see including); it is
+    None otherwise.
+
+    The db_alias attribute names the database the request's queries go to
+    (see using); None leaves them to Django's routing.
+
+    The project_columns attribute is True when the request is a GET, so that
+    the resources it resolves may be loaded with only the columns their
+    fields read; the models of any other request are loaded whole, since
+    they may be modified and saved.
     """
     def __init__(self, base_uri, root_resource, formatter, request=None):
         self.base_uri = base_uri
@@ -25,6 +336,12 @@ class APIContext(object):
         self._headers_dict = {}
         self.object_stack = []
         self.streaming_response = False
+        self.identity_map = IdentityMap()
+        self.field_selection = ALL_FIELDS
+        self.sub_resource_memo = SubResourceMemo()
+        self.included = None
+        self.db_alias = None
+        self.project_columns = False
 
     def resolve_resource_uri(self, uri):
         """
@@ -56,6 +373,67 @@ class APIContext(object):
 
         return resource
 
+    def resolve_resource_uris(self, uris):
+        """
+        Resolves a list of URIs within the same resource tree.
+
+        Returns a list of resources in the same order as uris; entries that
+        could not be resolved are None.  URIs that share a parent resource are
+        resolved together through the parent's get_child_resources, so a
+        QuerySetResource issues one query per group rather than one per URI.
+        """
+        resource_paths = []
+        for uri in uris:
+            if uri is not None and uri.startswith(self.base_uri):
+                resource_paths.append(uri[len(self.base_uri):])
+            else:
+                resource_paths.append(None)
+
+        return self.resolve_resource_paths(resource_paths)
+
+    def resolve_resource_paths(self, resource_paths):
+        """
+        Resolves a list of resource paths (not full URIs), grouping them by
+        parent resource.  Returns a list in the same order as resource_paths,
+        with None for each path that could not be resolved.
+        """
+        resources = [None] * len(resource_paths)
+
+        groups = collections.OrderedDict()
+        for index, resource_path in enumerate(resource_paths):
+            if resource_path is None:
+                continue
+
+            path_fragments = _split_resource_path(resource_path)
+            if not path_fragments:
+                resources[index] = self.resolve_resource_path(resource_path)
+                continue
+
+            parent_path = '/'.join(path_fragments[:-1])
+            groups.setdefault(parent_path, []).append((index, path_fragments))
+
+        for parent_path, members in groups.items():
+            parent = self.resolve_resource_path(parent_path)
+            if not parent:
+                continue
+
+            child_fragments = [fragments[-1] for _, fragments in members]
+            get_child_resources = getattr(parent, 'get_child_resources', None)
+            if get_child_resources is None:
+                children = [parent.get_child_resource(self, fragment) for fragment in child_fragments]
+            else:
+                children = get_child_resources(self, child_fragments)
+
+            for (index, path_fragments), resource in zip(members, children):
+                if not resource:
+                    continue
+
+                if resource.resource_path is None:
+                    resource.resource_path = ''.join('/' + fragment for fragment in path_fragments)
+                resources[index] = resource
+
+        return resources
+
     def build_resource_uri(self, resource):
         """
         Given a Resource with a resource_path, provides the correspond URI.
@@ -66,6 +444,13 @@ class APIContext(object):
         if resource_path is None:
             raise ValueError(u'unaddressable resource')
 
+        return self.build_resource_path_uri(resource_path)
+
+    def build_resource_path_uri(self, resource_path):
+        """
+        Given a resource_path, provides the corresponding URI without needing a
+        Resource around it.
+        """
         return self.base_uri + resource_path
 
     def set_header(self, header, value):
@@ -94,6 +479,62 @@ class APIContext(object):
         yield
         self.pop()
 
+    @contextlib.contextmanager
+    def selecting(self, field_selection):
+        """
+        Makes field_selection the current selection for the duration of the
+        block; a field_selection of None leaves it unchanged.
+        """
+        previous = self.field_selection
+        if field_selection is not None:
+            self.field_selection = field_selection
+        try:
+            yield
+        finally:
+            self.field_selection = previous
+
+    def selecting_child(self, property_name):
+        """
+        Narrows the current selection to the sub-resource of the field named
+        property_name for the duration of the block.
+        """
+        return self.selecting(self.field_selection.child(property_name))
+
+    def selecting_field(self, field):
+        """
+        Like selecting_child, for the property of field.
+        """
+        if self.field_selection.is_all:
+            return self.selecting(None)
+        return self.selecting_child(field._compute_property(self))
+
+    def using(self, queryset):
+        """
+        Returns queryset bound to db_alias, or queryset itself if there is no
+        db_alias.
+        """
+        if self.db_alias is None:
+            return queryset
+        return queryset.using(self.db_alias)
+
+    @contextlib.contextmanager
+    def including(self):
+        """
+        Collects the sub-resources sideloaded under the current selection into
+        a new included map, which the block gets to put in its response.  It
+        gets None when nothing is sideloaded or when an enclosing block is
+        already collecting them.
+        """
+        if self.included is not None or not self.field_selection.has_sideloads:
+            yield None
+            return
+
+        self.included = collections.OrderedDict()
+        try:
+            yield self.included
+        finally:
+            self.included = None
+
     def push(self, target):
         self.object_stack.append(target)
 
@@ -104,6 +545,14 @@ class APIContext(object):
         return self.object_stack[-n]
 
 
+def _concrete_class(model_class):
+    # Deferred-field querysets (.only / .defer) produce models of a generated
+    # subclass, which should share the entries of the real model class.
+    if getattr(model_class, '_deferred', False):
+        return model_class._meta.proxy_for_model
+    return model_class
+
+
 def _split_resource_path(resource_path):
     path_fragments = resource_path.split('/')
     if path_fragments[-1] == '':
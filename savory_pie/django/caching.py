@@ -0,0 +1,312 @@
+import collections
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from savory_pie.context import _concrete_class
+from savory_pie.formatters import EncodedValue
+from savory_pie.helpers import encode_with_sha1, get_accept_header, process_get_request
+from savory_pie.resources import _ParamsImpl
+
+_watched_models = set()
+
+# the length of the hex sha1 digest a response cache entry starts with
+_SHA1_LENGTH = len(hashlib.sha1().hexdigest())
+
+
+def watch_model(model_class):
+    """
+    Makes saves and deletes of model_class instances advance its generation
+    (see get_generation), invalidating cache entries keyed on it.
+
+    Only saves made in processes that have called watch_model are seen, so
+    cache entries should still carry a timeout.
+    """
+    if not _watched_models:
+        post_save.connect(_advance_generation, dispatch_uid='savory_pie.caching.post_save')
+        post_delete.connect(_advance_generation, dispatch_uid='savory_pie.caching.post_delete')
+    _watched_models.add(_concrete_class(model_class))
+
+
+def get_generation(model_class):
+    """
+    Returns a value that changes whenever an instance of model_class (which
+    must be watched) is saved or deleted.
+    """
+    key = _generation_key(_concrete_class(model_class))
+    generation = cache.get(key)
+    if generation is None:
+        # Start from the clock, so an evicted generation does not come back
+        # to a value used before.
+        cache.add(key, int(time.time() * 1000), None)
+        generation = cache.get(key)
+    return generation
+
+
+def make_key(prefix, *parts):
+    """
+    Builds a cache key from prefix and a hash of the repr of parts.
+    """
+    return 'savory_pie:{0}:{1}'.format(prefix, hashlib.sha1(repr(parts)).hexdigest())
+
+
+def get_reachable_models(resource_class):
+    """
+    Returns the model_class of resource_class and of every resource class
+    reachable through its fields (sub-resources, URI fields and so on).
+    """
+    return _get_models([resource_class])
+
+
+def get_embedded_models(resource_class):
+    """
+    Like get_reachable_models, but only the models reachable through the
+    fields of resource_class -- those of the objects embedded in its output.
+    """
+    return _get_models(_get_field_resource_classes(resource_class))
+
+
+def _get_field_resource_classes(resource_class):
+    resource_classes = []
+    for field in getattr(resource_class, 'fields', None) or []:
+        field_resource_class = getattr(field, '_resource_class', None)
+        if field_resource_class is not None:
+            resource_classes.append(field_resource_class)
+    return resource_classes
+
+
+def _get_models(resource_classes):
+    models = []
+    pending = list(reversed(resource_classes))
+    seen = set()
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+
+        model_class = getattr(current, 'model_class', None)
+        if model_class is not None and model_class not in models:
+            models.append(model_class)
+        pending.extend(_get_field_resource_classes(current))
+    return models
+
+
+def get_permission_fingerprint(ctx):
+    """
+    Returns a value that differs between users with different permissions,
+    so that they do not share cached responses.  Users of a model without
+    PermissionsMixin's get_all_permissions each get their own.
+    """
+    user = getattr(ctx.request, 'user', None)
+    if user is None or not user.is_authenticated():
+        return 'anonymous'
+    is_superuser = getattr(user, 'is_superuser', False)
+    get_all_permissions = getattr(user, 'get_all_permissions', None)
+    if get_all_permissions is None:
+        return is_superuser, 'user', getattr(user, 'pk', None)
+    return is_superuser, sorted(get_all_permissions())
+
+
+class ResponseCache(object):
+    """
+    Base class of the caches for whole GET responses of a resource, set as
+    its response_cache.  Entries are keyed by the resource_path, the query
+    parameters, the formatter and get_permission_fingerprint, and hold the
+    hash of the response (see helpers.encode_with_sha1) followed by its
+    encoding, which a hit returns as an EncodedValue without decoding it.
+    The generations (see get_generation) of the models
+    reachable from the resource are part of the key too, so saving or
+    deleting any of them makes earlier entries unreachable.
+
+    A ResponseCache can also be set as the fragment_cache of a
+    QuerySetResource, to hold the encoded objects of its responses (see
+    get_fragments).
+
+    hits and misses count lookups; stats returns them as a dict.
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        raise NotImplementedError()
+
+    def set(self, key, encoded):
+        raise NotImplementedError()
+
+    def get_many(self, keys):
+        """
+        Returns a dict of the keys found to their encoded values.
+        """
+        found = {}
+        for key in keys:
+            encoded = self.get(key)
+            if encoded is not None:
+                found[key] = encoded
+        return found
+
+    def set_many(self, encoded_by_key):
+        for key, encoded in encoded_by_key.iteritems():
+            self.set(key, encoded)
+
+    def get_fragments(self, keys):
+        """
+        get_many, counting each key as a hit or a miss.
+        """
+        found = self.get_many(keys)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def get_key(self, ctx, resource, params):
+        models = resource.get_cache_models()
+        for model_class in models:
+            watch_model(model_class)
+
+        return make_key(
+            'response',
+            resource.resource_path,
+            type(ctx.formatter).__name__,
+            sorted((key, params.get_list(key)) for key in params.keys()),
+            get_accept_header(ctx),
+            get_permission_fingerprint(ctx),
+            [get_generation(model_class) for model_class in models]
+        )
+
+    def process_get_request(self, ctx, resource, params):
+        key = self.get_key(ctx, resource, params)
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            return EncodedValue(entry[_SHA1_LENGTH:], entry[:_SHA1_LENGTH])
+
+        self.misses += 1
+        content_dict = resource.get(ctx, params)
+        if ctx.streaming_response:
+            return content_dict
+
+        encoded, sha1 = encode_with_sha1(ctx, content_dict)
+        self.set(key, sha1 + encoded)
+        return EncodedValue(encoded, sha1)
+
+
+class LRUResponseCache(ResponseCache):
+    """
+    In-process ResponseCache that evicts the least recently used entries once
+    the encoded responses it holds add up to more than max_size characters.
+    Entries older than timeout seconds (when given) are not used; set one when
+    models may be saved by processes that never served a cached response.
+    """
+    def __init__(self, max_size=10 * 1024 * 1024, timeout=None):
+        super(LRUResponseCache, self).__init__()
+        self.max_size = max_size
+        self.timeout = timeout
+        self.size = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+
+            encoded, expires = entry
+            if expires is not None and expires < time.time():
+                self.size -= len(encoded)
+                return None
+            # move it to the most recently used end
+            self._entries[key] = entry
+            return encoded
+
+    def set(self, key, encoded):
+        if len(encoded) > self.max_size:
+            return
+
+        expires = time.time() + self.timeout if self.timeout is not None else None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[0])
+
+            self._entries[key] = (encoded, expires)
+            self.size += len(encoded)
+            while self.size > self.max_size:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self):
+        stats = super(LRUResponseCache, self).stats()
+        stats.update(entries=len(self._entries), size=self.size)
+        return stats
+
+
+class DjangoResponseCache(ResponseCache):
+    """
+    ResponseCache stored in a Django cache -- the default cache unless one is
+    given -- for timeout seconds.  The hit and miss counts are per process.
+    """
+    def __init__(self, cache=None, timeout=300):
+        super(DjangoResponseCache, self).__init__()
+        self._cache = cache
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return self._cache if self._cache is not None else cache
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, encoded):
+        self.cache.set(key, encoded, self.timeout)
+
+    def get_many(self, keys):
+        return self.cache.get_many(keys)
+
+    def set_many(self, encoded_by_key):
+        self.cache.set_many(encoded_by_key, self.timeout)
+
+
+def process_cached_get_request(ctx, resource, get_params):
+    """
+    process_get_request, going through the resource's response_cache if it
+    has one.  Embedded sub-resources are memoized meanwhile (see
+    SubResourceMemo).
+    """
+    with ctx.sub_resource_memo.enabled():
+        response_cache = getattr(resource, 'response_cache', None)
+        if response_cache is None or 'GET' not in resource.allowed_methods:
+            return process_get_request(ctx, resource, get_params)
+        return response_cache.process_get_request(ctx, resource, _ParamsImpl(get_params))
+
+
+def _generation_key(model_class):
+    return 'savory_pie:generation:{0}.{1}'.format(model_class.__module__, model_class.__name__)
+
+
+def advance_generation(model_class):
+    """
+    Advances the generation of model_class (if it is watched) as its saves
+    and deletes do -- for writes that send no signals, like bulk_create.
+    """
+    model_class = _concrete_class(model_class)
+    if model_class not in _watched_models:
+        return
+
+    key = _generation_key(model_class)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def _advance_generation(sender, instance, **kwargs):
+    advance_generation(type(instance))
@@ -92,15 +92,34 @@ class AttributeField(base_fields.AttributeField, DjangoField):
 
     def prepare(self, ctx, related):
         related_attr = '__'.join(self._attrs[:-1])
-        if related_attr:
-            if self._use_prefetch:
-                related.prefetch(related_attr)
-            else:
+        if related_attr and self._use_prefetch:
+            related.prefetch(related_attr)
+            related.only(self._attrs[0])
+        else:
+            if related_attr:
                 related.select(related_attr)
+            related.only('__'.join(self._attrs))
 
     def handle_incoming(self, ctx, source_dict, target_obj):
         super(AttributeField, self).handle_incoming(ctx, source_dict, target_obj)
 
+    def compile_values(self, formatter):
+        """
+        Returns (ORM path, public property, value converter) for reading this
+        field straight from values_list rows, or None if the field customizes
+        how outgoing values are read.
+        """
+        if self._use_prefetch or base_fields._overrides(
+                self, base_fields.AttributeField, 'handle_outgoing', 'compile_outgoing',
+                '_compute_property', '_get', '_get_object', 'to_api_value'):
+            return None
+
+        if self._published_property is not None:
+            property_name = formatter.convert_to_public_property(self._published_property)
+        else:
+            property_name = formatter.convert_to_public_property(self._bare_attribute)
+        return '__'.join(self._attrs), property_name, formatter.compile_to_api_value(self._type)
+
     def save(self, target_obj):
         # TODO: remove this save call and track all models to save in the ctx.
         # Also run a topo-sort in the ctx and save models in the order.  We can
@@ -239,17 +258,52 @@ class URIResourceField(base_fields.URIResourceField, DjangoField):
                 See https://docs.djangoproject.com/en/dev/ref/models/querysets/
 
                 This parameter is meaningless for top-level attributes.
+
+            ``uri_only``
+                optional -- build the URI from the {attribute}_id column instead
+                of loading the related model.  Only takes effect when the
+                resource_class can build its resource_path from the pk alone
+                (see :meth:`ModelResource.get_resource_path_template`), and
+                requires attribute to be a forward ForeignKey or OneToOneField
+                of the model itself -- not a dotted path.  No join is added to
+                the QuerySet.  Defaults to false.
     """
     def __init__(self, *args, **kwargs):
         self._use_prefetch = kwargs.pop('use_prefetch', False)
+        self._uri_only = kwargs.pop('uri_only', False)
         super(URIResourceField, self).__init__(*args, **kwargs)
+        if self._uri_only and '.' in self._attribute:
+            raise SavoryPieError(u'uri_only requires a top-level attribute, not {0}'.format(self._attribute))
+
+    def _get_resource_path_template(self):
+        if self._uri_only:
+            return self._resource_class.get_resource_path_template()
+        return None
 
     def prepare(self, ctx, related):
+        if self._get_resource_path_template() is not None:
+            # The URI comes from the foreign key column; nothing to join.
+            related.only(self._attribute)
+            return
+
+        related.only(self._attribute)
         if self._use_prefetch:
             related.sub_prefetch(self._attribute)
         else:
             related.sub_select(self._attribute)
 
+    def handle_outgoing(self, ctx, source_obj, target_dict):
+        template = self._get_resource_path_template()
+        attname = self._attribute + '_id'
+        if template is None or not hasattr(source_obj, attname):
+            return super(URIResourceField, self).handle_outgoing(ctx, source_obj, target_dict)
+
+        pk = getattr(source_obj, attname)
+        if pk is not None:
+            target_dict[self._compute_property(ctx)] = ctx.build_resource_path_uri(template.format(pk))
+        else:
+            target_dict[self._compute_property(ctx)] = None
+
     def pre_save(self, model):
         return True
 
@@ -264,13 +318,55 @@ class URIListResourceField(base_fields.URIListResourceField, DjangoField):
             ``pre_save``
                 optional -- tells the sub-model resource field whether to save
                 before or after the related field.
+
+            ``uri_only``
+                optional -- build the URIs straight from the pks of the related
+                models, without constructing a resource around each of them.
+                Reads the prefetched models when available, and otherwise only
+                selects the pks.  Only takes effect when the resource_class can
+                build its resource_path from the pk alone (see
+                :meth:`ModelResource.get_resource_path_template`).  The models
+                on the way to a dotted attribute are selected along with the
+                model.  Defaults to false.
     """
+    def __init__(self, *args, **kwargs):
+        self._uri_only = kwargs.pop('uri_only', False)
+        super(URIListResourceField, self).__init__(*args, **kwargs)
+
     def prepare(self, ctx, related):
-        related.prefetch(self._attribute)
+        attrs = self._attribute.replace('.', '__')
+        path, _, _ = attrs.rpartition('__')
+        if path:
+            # the models on the way to the related manager are joined, not
+            # loaded row by row
+            related.select(path)
+        related.prefetch(attrs)
 
     def get_iterable(self, value):
         return value.all()
 
+    def handle_outgoing(self, ctx, source_obj, target_dict):
+        template = self._resource_class.get_resource_path_template() if self._uri_only else None
+        if template is None:
+            return super(URIListResourceField, self).handle_outgoing(ctx, source_obj, target_dict)
+
+        attribute = source_obj
+        for attr in self._attribute.split('.'):
+            attribute = getattr(attribute, attr)
+            if attribute is None:
+                return None
+
+        iterable = self.get_iterable(attribute)
+        if getattr(iterable, '_result_cache', False) is None:
+            # Not prefetched, so there is no reason to load more than the pks.
+            pks = iterable.values_list('pk', flat=True)
+        else:
+            pks = [model.pk for model in iterable]
+
+        target_dict[self._compute_property(ctx)] = [
+            ctx.build_resource_path_uri(template.format(pk)) for pk in pks
+        ]
+
     def pre_save(self, model):
         return False
 
@@ -306,12 +402,24 @@ class SubModelResourceField(base_fields.SubObjectResourceField, DjangoField):
             return super(SubModelResourceField, self).validate_resource(ctx, key, resource, source_dict)
 
     def prepare(self, ctx, related):
-        if self._use_prefetch:
-            related.prefetch(self._attribute)
-            self._resource_class.prepare(ctx, related.sub_prefetch(self._attribute))
-        else:
-            related.select(self._attribute)
-            self._resource_class.prepare(ctx, related.sub_select(self._attribute))
+        related.only(self._attribute)
+        if self.is_collapsed(ctx):
+            # The URI comes from the foreign key column when it can; otherwise
+            # only the related model itself is loaded.
+            if self._resource_class.get_resource_path_template() is None:
+                if self._use_prefetch:
+                    related.prefetch(self._attribute)
+                else:
+                    related.select(self._attribute)
+            return
+
+        with ctx.selecting_field(self):
+            if self._use_prefetch:
+                related.prefetch(self._attribute)
+                self._resource_class.prepare(ctx, related.sub_prefetch(self._attribute))
+            else:
+                related.select(self._attribute)
+                self._resource_class.prepare(ctx, related.sub_select(self._attribute))
 
     def schema(self, ctx, **kwargs):
         kwargs = dict(kwargs.items() + {'schema': {'type': 'related', 'relatedType': 'to_one'}}.items())
@@ -347,6 +455,18 @@ class SubModelResourceField(base_fields.SubObjectResourceField, DjangoField):
 
         return sub_model
 
+    def get_uri(self, ctx, source_object):
+        template = self._resource_class.get_resource_path_template()
+        attname = self._attribute + '_id'
+        # a loaded foreign key column is in the instance's __dict__
+        if template is None or attname not in vars(source_object):
+            return super(SubModelResourceField, self).get_uri(ctx, source_object)
+
+        pk = getattr(source_object, attname)
+        if pk is None:
+            return None
+        return ctx.build_resource_path_uri(template.format(pk))
+
     def _get_field(self, model):
         field_name = (model._meta.pk.name if self.name == 'pk' else self.name)
         field = None
@@ -430,7 +550,12 @@ class RelatedManagerField(base_fields.IterableField, DjangoField):
     def prepare(self, ctx, related):
         attrs = self._attribute.replace('.', '__')
         related.prefetch(attrs)
-        self._resource_class.prepare(ctx, related.sub_prefetch(attrs))
+        if self.is_collapsed(ctx):
+            # only the URIs of the related models are read
+            return
+
+        with ctx.selecting_field(self):
+            self._resource_class.prepare(ctx, related.sub_prefetch(attrs))
 
     def schema(self, ctx, **kwargs):
         dct = {'type': 'related', 'relatedType': 'to_many', 'fields': {}}
@@ -478,6 +603,10 @@ class ReverseField(object):
             return
         setattr(target_obj, self.attribute_name, ctx.peek())
 
+    def prepare(self, ctx, related):
+        # Reads no columns.
+        pass
+
     def handle_outgoing(self, ctx, source_obj, target_dict):
         pass
 
@@ -503,6 +632,10 @@ class ReverseRelatedManagerField(object):
     def name(self):
         return self.attribute_name
 
+    def prepare(self, ctx, related):
+        # Reads no columns.
+        pass
+
     def handle_outgoing(self, ctx, source_obj, target_dict):
         pass
 
@@ -28,6 +28,8 @@ class ResourceIndex(indexes.SearchIndex):
         related = Related()
         ctx = APIContext('', None, None)
         self.resource_class.prepare(ctx, related)
+        # the index's own fields may read any attribute of the model
+        related.load_all()
         self.prefetch_related(related)
         return related.prepare(qs)
 
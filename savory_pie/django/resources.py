@@ -1,15 +1,23 @@
 from collections import OrderedDict
+import base64
 import logging
 import urllib
 
 import dirty_bits
 import django.core.exceptions
+import django.db
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.db.models.sql import EmptyResultSet
 
+from savory_pie.context import FieldSelection
+from savory_pie.django import caching
 from savory_pie.django.fields import ReverseField
-from savory_pie.django.utils import Related
+from savory_pie.django.utils import Related, get_query_models, has_multivalued_joins, resolve_column_path
 from savory_pie.django.validators import ValidationError, validate
 from savory_pie.errors import SavoryPieError
-from savory_pie.helpers import get_sha1
+from savory_pie.formatters import EncodedValue, json
+from savory_pie.helpers import add_sha1, compute_etag, get_accept_header
 from savory_pie.resources import EmptyParams, Resource
 
 logger = logging.getLogger(__name__)
@@ -24,6 +32,18 @@ class QuerySetResource(Resource):
         ``resource_class``
             type of Resource to create for a given Model in the queryset
 
+    A GET with the sideload parameter, e.g. ?sideload=store,items.product,
+    renders the named sub-resources as their resourceUri and serializes each
+    distinct one once, into an included map of URI to object alongside meta
+    and objects.  Sub-resources without a URI stay embedded.
+
+    A GET with ?format=table, or whose Accept header names
+    table_content_type, returns columns -- the public property names -- and
+    rows -- lists of values in column order -- in place of objects.  When
+    the objects can be built from values_list rows (see get_values_plan),
+    rows are the converted columns zipped together, with no dict per row.
+    Streamed and cursor paged GETs always return objects.
+
     Typical usage...
 
     .. code::
@@ -38,6 +58,60 @@ class QuerySetResource(Resource):
     #: optional - if set specifies the page size for data returned during a GET
     #: - defaults to None (no paging)
     page_size = None
+    #: optional - if True (and page_size is set) pages are addressed by opaque
+    #: after / before cursors over the queryset's ordering instead of by page
+    #: number, so every page costs the same and pages don't shift as rows are
+    #: inserted.  Ordering must be by plain, non-null columns; pk is always
+    #: added as the final tie breaker.
+    #: - defaults to False
+    cursor_pagination = False
+    #: optional - upper bound for the pageSize param of cursor pagination
+    #: - defaults to page_size
+    max_page_size = None
+    #: optional - how the count in a GET's meta is produced:
+    #: 'exact' counts the filtered queryset on every GET, 'none' does not count
+    #: (the page is read with one extra row to tell whether there is a next
+    #: one) and 'cached' caches exact counts per filtered query for
+    #: count_cache_timeout seconds, dropping them when an instance of a model
+    #: the query reads (through its filters too) is saved or deleted.
+    #: - defaults to 'exact'
+    count_strategy = 'exact'
+    count_cache_timeout = 300
+    #: optional - if True a GET streams the response, loading and serializing
+    #: the (unpaged) queryset stream_chunk_size models at a time in pk order
+    #: - defaults to False
+    streaming = False
+    stream_chunk_size = 500
+    #: optional - a caching.ResponseCache (LRUResponseCache or
+    #: DjangoResponseCache) holding whole GET responses, invalidated when a
+    #: model reachable from resource_class is saved or deleted
+    #: - defaults to None (no caching)
+    response_cache = None
+    #: optional - a caching.ResponseCache holding the encoded objects of GETs
+    #: (those not streamed, cursor paged or sideloading) one by one, keyed by pk and the
+    #: resource_class's etag_attribute, which is required.  A GET then reads
+    #: only pks and versions, and loads and serializes just the objects not
+    #: in the cache.  Saves and deletes of models embedded in the objects
+    #: invalidate every fragment; those of resource_class's model_class are
+    #: expected to change its etag_attribute.  Objects found in the cache are
+    #: EncodedValue-s, written out without being decoded, so an override of
+    #: get cannot change them.
+    #: - defaults to None (no caching)
+    fragment_cache = None
+    #: the media type in a GET's Accept header that asks for a tabular
+    #: response, like ?format=table
+    table_content_type = 'application/vnd.savory-pie.table+json'
+    #: the number of rows inserted per query when a POST of a list of
+    #: resources is created with bulk_create (see post_many)
+    bulk_create_chunk_size = 500
+    #: optional - if True the import sub-resource (e.g. foos/import) takes
+    #: POSTs of newline delimited JSON, a resource per line, and creates them
+    #: import_chunk_size lines per transaction (see ImportResource), reporting
+    #: the errors of at most import_max_errors lines
+    #: - defaults to False
+    allow_import = False
+    import_chunk_size = 1000
+    import_max_errors = 100
     filters = []
 
     #Setup so that by default we will allow Unfiltered Queries
@@ -50,6 +124,16 @@ class QuerySetResource(Resource):
         else:
             self.queryset = self.resource_class.model_class.objects.all()
 
+        if self.count_strategy == 'cached' or \
+                (self.count_strategy == 'none' and self.resource_class.etag_attribute is not None):
+            caching.watch_model(self.queryset.model)
+        if self.response_cache is not None:
+            for model_class in self.get_cache_models():
+                caching.watch_model(model_class)
+        if self.fragment_cache is not None:
+            for model_class in caching.get_embedded_models(self.resource_class):
+                caching.watch_model(model_class)
+
     @property
     def supports_paging(self):
         return self.page_size is not None
@@ -58,6 +142,23 @@ class QuerySetResource(Resource):
     def resource_path(self):
         return self.resource_class.parent_resource_path
 
+    def get_filtered_queryset(self, ctx, params):
+        """
+        Returns queryset filtered for params.  It is only made distinct when
+        the base queryset or the filters join across a to-many relation, as
+        otherwise no row can come back twice.
+        """
+        filtered_queryset = self.filter_queryset(ctx, params, ctx.using(self.queryset.all()))
+        if has_multivalued_joins(filtered_queryset):
+            if filtered_queryset.query.can_filter():
+                filtered_queryset = filtered_queryset.distinct()
+            else:
+                # a filter sliced it, after which distinct() refuses; the SQL
+                # DISTINCT still comes before the LIMIT
+                filtered_queryset = filtered_queryset._clone()
+                filtered_queryset.query.distinct = True
+        return filtered_queryset
+
     def filter_queryset(self, ctx, params, queryset):
         for filter in self.filters:
             queryset = filter.filter(ctx, params, queryset)
@@ -69,6 +170,9 @@ class QuerySetResource(Resource):
         if self.supports_paging:
             page = params.get_as('page', int, 0)
             offset = page * self.page_size
+            if self.count_strategy == 'none':
+                # one more row tells whether there is a next page
+                return queryset[offset: offset + self.page_size + 1]
             return queryset[offset: offset + self.page_size]
         else:
             return queryset
@@ -97,10 +201,17 @@ class QuerySetResource(Resource):
     def prepare(cls, ctx, related):
         cls.resource_class.prepare(ctx, related)
 
-    def prepare_queryset(self, ctx, queryset):
+    def prepare_queryset(self, ctx, queryset, columns=(), project=False):
+        """
+        Applies the prepare-d select / prefetch plan to queryset.  With project
+        True, as for the querysets a GET reads, it is also restricted to the
+        columns the fields read (see Related.only); models that may be written
+        to must have every column loaded.
+        """
         related = Related()
         self.prepare(ctx, related)
-        return related.prepare(queryset)
+        related.only(*columns)
+        return related.prepare(queryset, project=project)
 
     def has_valid_key(self, ctx, params):
         get_query_dict = getattr(params, '_GET', None)
@@ -115,58 +226,399 @@ class QuerySetResource(Resource):
                     return True
         return False
 
-    def paginate(self, ctx, params, count, meta):
-        if self.supports_paging:
+    def paginate(self, ctx, params, count, meta, has_more=None):
+        if self.supports_paging and not self.cursor_pagination:
             page = params.get_as('page', int, 0)
 
-            # subtract one from count in case our count is at page size
-            # then add 1 to the number of pages since python rounds down
-            # this should be better than using math.ceil
-            meta['total_pages'] = ((count - 1) / self.page_size) + 1
+            if count is not None:
+                # subtract one from count in case our count is at page size
+                # then add 1 to the number of pages since python rounds down
+                # this should be better than using math.ceil
+                meta['total_pages'] = ((count - 1) / self.page_size) + 1
+                has_more = (page + 1) * self.page_size < count
 
             if page > 0:
                 meta['prev'] = self.build_page_uri(ctx, page - 1)
 
-            if (page + 1) * self.page_size < count:
+            if has_more:
                 meta['next'] = self.build_page_uri(ctx, page + 1)
 
         return meta
 
+    def get_count(self, ctx, params, filtered_queryset):
+        """
+        Returns the count of filtered_queryset according to count_strategy, or
+        None if it is not counted.
+        """
+        if self.count_strategy == 'none':
+            return None
+        elif self.count_strategy == 'cached':
+            try:
+                sql, sql_params = filtered_queryset.query.sql_with_params()
+            except EmptyResultSet:
+                # the filters can never match
+                return 0
+
+            generations = []
+            for model_class in get_query_models(filtered_queryset):
+                caching.watch_model(model_class)
+                generations.append(caching.get_generation(model_class))
+            key = caching.make_key('count', filtered_queryset.db, sql, sql_params, generations)
+            count = caching.cache.get(key)
+            if count is None:
+                count = filtered_queryset.count()
+                caching.cache.set(key, count, self.count_cache_timeout)
+            return count
+        else:
+            return filtered_queryset.count()
+
+    def get_cache_models(self):
+        """
+        Returns the models whose saves and deletes invalidate response_cache.
+        """
+        return [self.queryset.model] + [
+            model_class for model_class in caching.get_reachable_models(self.resource_class)
+            if model_class is not self.queryset.model
+        ]
+
+    def get_etag(self, ctx, params):
+        """
+        Derives the ETag from the Max of the resource_class's etag_attribute
+        and the Count over the filtered queryset -- one aggregate query.  With
+        count_strategy 'none' nothing is counted; the generation of the
+        queryset's model (see caching.get_generation) tells of deletes instead.
+        """
+        etag_attribute = self.resource_class.etag_attribute
+        if etag_attribute is None:
+            return None
+        if not self.allow_unfiltered_query and not self.has_valid_key(ctx, params):
+            return None
+
+        filtered_queryset = self.get_filtered_queryset(ctx, params)
+        if self.count_strategy == 'none':
+            aggregates = filtered_queryset.aggregate(version=Max(etag_attribute))
+            version = (aggregates['version'], caching.get_generation(filtered_queryset.model))
+        else:
+            aggregates = filtered_queryset.aggregate(version=Max(etag_attribute), count=Count('pk'))
+            version = (aggregates['version'], aggregates['count'])
+        if self.is_tabular(ctx, params):
+            # the Accept header is not among params
+            version += ('table',)
+        return compute_etag(ctx, self, params, *version)
+
+    def is_tabular(self, ctx, params):
+        """
+        Returns whether a GET with params asks for a tabular response.
+        """
+        if params.get('format') == 'table':
+            return True
+        return self.table_content_type in get_accept_header(ctx)
+
     def get(self, ctx, params):
         if not self.allow_unfiltered_query and not self.has_valid_key(ctx, params):
             raise SavoryPieError(
                 'Request must be filtered, will not return all.  Acceptable filters are: {0}'.format([filter.name for filter in self.filters])
             )
 
-        complete_queryset = self.queryset.all().distinct()
+        with ctx.selecting(FieldSelection.from_params(params)):
+            if self.streaming:
+                # sideloads are embedded, as the included map would have to
+                # follow the objects
+                return self._get(ctx, params)
+
+            with ctx.including() as included:
+                content_dict = self._get(ctx, params)
+            if included is not None:
+                content_dict['included'] = included
+            return content_dict
+
+    def _get(self, ctx, params):
+        filtered_queryset = self.get_filtered_queryset(ctx, params)
+        if self.supports_paging and self.cursor_pagination:
+            return self._get_cursor_page(ctx, params, filtered_queryset)
 
-        filtered_queryset = self.filter_queryset(ctx, params, complete_queryset)
         sliced_queryset = self.slice_queryset(ctx, params, filtered_queryset)
 
-        # prepare must be last for optimization to be respected by Django.
-        final_queryset = self.prepare_queryset(ctx, sliced_queryset)
+        if not self.streaming and self.is_tabular(ctx, params):
+            return self._get_table(ctx, params, filtered_queryset, sliced_queryset)
+
+        if self.streaming:
+            ctx.streaming_response = True
+            page = dict()
+            return ctx.formatter.stream_collection(
+                self._stream_objects(ctx, filtered_queryset, sliced_queryset, page, ctx.field_selection),
+                lambda: self._get_meta(ctx, params, filtered_queryset, page.get('has_more'))
+            )
+
+        # fragments would not bring along what they sideload
+        if self.fragment_cache is not None and self.resource_class.etag_attribute is not None and ctx.included is None:
+            objects, has_more = self._get_fragment_objects(ctx, sliced_queryset)
+        else:
+            values_plan = self.get_values_plan(ctx)
+            if values_plan is not None:
+                objects, has_more = self._get_value_objects(ctx, values_plan, sliced_queryset)
+            else:
+                # prepare must be last for optimization to be respected by Django.
+                final_queryset = self.prepare_queryset(ctx, sliced_queryset, project=True)
+
+                models, has_more = self._split_page(final_queryset)
+                objects = [self._get_object(ctx, model) for model in models]
+
+        return {
+            'meta': self._get_meta(ctx, params, filtered_queryset, has_more),
+            'objects': objects
+        }
+
+    def _get_table(self, ctx, params, filtered_queryset, sliced_queryset):
+        values_plan = self.get_values_plan(ctx)
+        if values_plan is not None:
+            columns, rows, has_more = self._get_value_columns(ctx, values_plan, sliced_queryset)
+        else:
+            final_queryset = self.prepare_queryset(ctx, sliced_queryset, project=True)
+            models, has_more = self._split_page(final_queryset)
+            columns, rows = _to_table([self.to_resource(model).get(ctx, EmptyParams()) for model in models])
+
+        return {
+            'meta': self._get_meta(ctx, params, filtered_queryset, has_more),
+            'columns': columns,
+            'rows': rows
+        }
+
+    def _split_page(self, queryset):
+        """
+        Returns the models of a page read by slice_queryset, without the extra
+        row read under count_strategy 'none', and whether there was one.
+        """
+        if self.count_strategy == 'none' and self.supports_paging:
+            models = list(queryset)
+            return models[:self.page_size], len(models) > self.page_size
+        return queryset, None
+
+    def _get_object(self, ctx, model):
+        return add_sha1(ctx, self.to_resource(model).get(ctx, EmptyParams()))
+
+    def get_values_plan(self, ctx):
+        """
+        Returns the values plan of the resource_class (see
+        ModelResource.get_values_plan), or None if objects must be built from
+        models because this QuerySetResource customizes how they are.
+        """
+        for method_name in ('to_resource', '_get_object', 'prepare', 'prepare_queryset'):
+            if getattr(type(self), method_name).__func__ is not getattr(QuerySetResource, method_name).__func__:
+                return None
+        return self.resource_class.get_values_plan(ctx.formatter)
+
+    def _get_value_objects(self, ctx, values_plan, sliced_queryset):
+        """
+        Builds the objects of a page from values_list rows rather than models,
+        converting the values column by column.
+        """
+        property_names, rows, has_more = self._get_value_columns(ctx, values_plan, sliced_queryset)
+        objects = [add_sha1(ctx, OrderedDict(zip(property_names, row))) for row in rows]
+        return objects, has_more
 
-        objects = []
-        for model in final_queryset:
-            model_json = self.to_resource(model).get(ctx, EmptyParams())
-            model_json['$hash'] = get_sha1(ctx, model_json)
-            objects.append(model_json)
+    def _get_value_columns(self, ctx, values_plan, sliced_queryset):
+        """
+        Returns the public property names of a page built from values_list
+        rows, the rows of converted values in that order, and whether there
+        is a next page.
+        """
+        selection = ctx.field_selection
+        if not selection.is_all:
+            values_plan = [entry for entry in values_plan if selection.includes(entry[1])]
 
+        resource_class = self.resource_class
+        if resource_class.parent_resource_path is not None:
+            parent_path = resource_class.parent_resource_path
+        else:
+            parent_path = self.resource_path
+
+        queryset = sliced_queryset.values_list(resource_class.published_key[0], *[path for path, _, _ in values_plan])
+        rows, has_more = self._split_page(queryset)
+        columns = zip(*rows) or [()]
+        values = [map(to_api_value, column) for column, (_, _, to_api_value) in zip(columns[1:], values_plan)]
+
+        property_names = [property_name for _, property_name, _ in values_plan]
+        if parent_path is not None:
+            property_names.append('resourceUri')
+            values.append([ctx.build_resource_path_uri(parent_path + '/' + str(key)) for key in columns[0]])
+        rows = zip(*values) if values else [()] * len(columns[0])
+        return property_names, rows, has_more
+
+    def _get_fragment_objects(self, ctx, sliced_queryset):
+        """
+        Builds the objects of a page from fragment_cache, loading and
+        serializing only the ones it misses.
+        """
+        rows, has_more = self._split_page(sliced_queryset.values_list('pk', self.resource_class.etag_attribute))
+        rows = list(rows)
+        key_parts = self.get_fragment_key_parts(ctx)
+        keys = [caching.make_key('fragment', key_parts, pk, version) for pk, version in rows]
+        encoded_by_key = self.fragment_cache.get_fragments(keys)
+
+        objects = {}
+        missing = [pk for (pk, _), key in zip(rows, keys) if key not in encoded_by_key]
+        if missing:
+            for model in self.prepare_queryset(ctx, ctx.using(self.queryset.filter(pk__in=missing)), project=True):
+                objects[model.pk] = self._get_object(ctx, model)
+
+            new_encoded_by_key = {}
+            for (pk, _), key in zip(rows, keys):
+                if pk in objects:
+                    new_encoded_by_key[key] = ctx.formatter.encode(objects[pk])
+            self.fragment_cache.set_many(new_encoded_by_key)
+
+        for (pk, _), key in zip(rows, keys):
+            encoded = encoded_by_key.get(key)
+            if encoded is not None:
+                objects[pk] = EncodedValue(encoded)
+
+        # rows deleted since the pks were read are left out
+        return [objects[pk] for pk, _ in rows if pk in objects], has_more
+
+    def get_fragment_key_parts(self, ctx):
+        """
+        Returns what, besides pk and version, the objects serialized by a GET
+        depend on: the resource_class, formatter, base URI, field selection,
+        user's permissions and the generations of the embedded models.
+        """
+        return (
+            '{0}.{1}'.format(self.resource_class.__module__, self.resource_class.__name__),
+            type(ctx.formatter).__name__,
+            ctx.build_resource_path_uri(''),
+            ctx.field_selection.cache_key,
+            caching.get_permission_fingerprint(ctx),
+            [caching.get_generation(model_class) for model_class in caching.get_embedded_models(self.resource_class)]
+        )
+
+    def _get_meta(self, ctx, params, filtered_queryset, has_more=None):
         meta = dict()
-        count = filtered_queryset.count()
-        meta['count'] = count
-        meta = self.paginate(ctx, params, count, meta)
+        count = self.get_count(ctx, params, filtered_queryset)
+        if count is not None:
+            meta['count'] = count
+        meta['countStrategy'] = self.count_strategy
+        if has_more is not None:
+            meta['hasMore'] = has_more
+        meta = self.paginate(ctx, params, count, meta, has_more)
 
         # add meta-level resourceUri to QuerySet response
         if self.resource_path is not None:
             meta['resourceUri'] = ctx.build_resource_uri(self)
 
+        return meta
+
+    def get_ordering(self, queryset):
+        """
+        Returns the ordering of queryset as a list of (attribute, descending)
+        pairs, ending with pk so that the order is total.
+        """
+        order_by = list(queryset.query.order_by)
+        if not order_by and queryset.query.default_ordering:
+            order_by = list(queryset.model._meta.ordering)
+
+        ordering = []
+        for field in order_by:
+            if not isinstance(field, basestring) or field == '?':
+                raise SavoryPieError('Cursor pagination requires ordering by attributes, not {0!r}'.format(field))
+            ordering.append((field.lstrip('-'), field.startswith('-')))
+            if ordering[-1][0] in ('pk', queryset.model._meta.pk.name):
+                break
+        else:
+            ordering.append(('pk', False))
+        return ordering
+
+    def get_page_size(self, ctx, params):
+        page_size = params.get_as(ctx.formatter.convert_to_public_property('page_size'), int, self.page_size)
+        return max(1, min(page_size, self.max_page_size or self.page_size))
+
+    def build_cursor_uri(self, ctx, direction, cursor):
+        params = ctx.request.GET.copy()
+        for name in ('after', 'before', 'page'):
+            params.pop(name, None)
+        params[direction] = cursor
+        return ctx.build_resource_uri(self) + '?' + urllib.urlencode(params)
+
+    def _get_cursor_page(self, ctx, params, filtered_queryset):
+        ordering = self.get_ordering(filtered_queryset)
+        page_size = self.get_page_size(ctx, params)
+        after, before = params.get('after'), params.get('before')
+
+        # a before page is read backwards from the cursor, then put back in order
+        reverse = before is not None
+        queryset = filtered_queryset
+        if after is not None or before is not None:
+            queryset = queryset.filter(_keyset_q(ordering, _decode_cursor(before if reverse else after), reverse))
+        queryset = queryset.order_by(*[
+            ('-' if descending != reverse else '') + attribute for attribute, descending in ordering
+        ])
+
+        # one extra row tells whether there is another page beyond this one
+        columns = [attribute for attribute, descending in ordering]
+        models = list(self.prepare_queryset(ctx, queryset[:page_size + 1], columns, project=True))
+        has_more = len(models) > page_size
+        models = models[:page_size]
+        if reverse:
+            models.reverse()
+
+        meta = self._get_meta(ctx, params, filtered_queryset)
+        if models:
+            # the cursor's own row lies on the other side of an after / before page
+            if has_more or reverse:
+                meta['next'] = self.build_cursor_uri(ctx, 'after', _encode_cursor(ctx, ordering, models[-1]))
+            if has_more if reverse else after is not None:
+                meta['prev'] = self.build_cursor_uri(ctx, 'before', _encode_cursor(ctx, ordering, models[0]))
+        elif after is not None:
+            meta['prev'] = self.build_cursor_uri(ctx, 'before', after)
+        elif before is not None:
+            meta['next'] = self.build_cursor_uri(ctx, 'after', before)
+        if self.count_strategy == 'none':
+            meta['hasMore'] = 'next' in meta
+
         return {
             'meta': meta,
-            'objects': objects
+            'objects': [self._get_object(ctx, model) for model in models]
         }
 
+    def iter_chunks(self, ctx, queryset):
+        """
+        Generates lists of at most stream_chunk_size models of queryset in pk
+        order.  Each chunk is its own query with the prepare-d select / prefetch
+        plan applied, since prefetch_related has no effect on a plain iterator().
+        """
+        related = Related()
+        self.prepare(ctx, related)
+
+        queryset = queryset.order_by('pk')
+        last_pk = None
+        while True:
+            chunk_queryset = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            chunk = list(related.prepare(chunk_queryset[:self.stream_chunk_size]))
+            if chunk:
+                yield chunk
+            if len(chunk) < self.stream_chunk_size:
+                break
+            last_pk = chunk[-1].pk
+
+    def _stream_objects(self, ctx, filtered_queryset, sliced_queryset, page, field_selection):
+        # runs after get has returned, so the selection is put back in place
+        with ctx.selecting(field_selection):
+            if self.supports_paging:
+                # a page is a single chunk
+                models, page['has_more'] = self._split_page(self.prepare_queryset(ctx, sliced_queryset, project=True))
+                chunks = [list(models)]
+            else:
+                chunks = self.iter_chunks(ctx, filtered_queryset)
+
+            for chunk in chunks:
+                for model in chunk:
+                    yield self._get_object(ctx, model)
+                # don't hold on to the related models of earlier chunks
+                ctx.identity_map.clear()
+
     def post(self, ctx, source_dict):
+        if isinstance(source_dict, list):
+            return self.post_many(ctx, source_dict)
+
         resource = self.resource_class.create_resource()
         if filter(lambda field: isinstance(field, ReverseField), resource.fields):
             raise ValidationError(resource, {'do not post a resource with a ReverseField':
@@ -174,25 +626,231 @@ class QuerySetResource(Resource):
         with ctx.target(resource.model):
             resource.put(ctx, source_dict)
 
+        self._set_posted_resource_path(resource)
+        return resource
+
+    def post_many(self, ctx, source_dicts):
+        """
+        Creates a resource for each of source_dicts, in one transaction, and
+        returns them in order.  All of source_dicts are validated before any
+        is saved, against the database and, by validators with a
+        find_duplicates method, against each other; the errors are keyed by
+        position in source_dicts.  A database constraint no validator checks
+        is reported as a ValidationError too.
+
+        When can_bulk_create allows it, the models are inserted with
+        bulk_create, bulk_create_chunk_size rows per query -- so neither
+        their save method nor the pre_save and post_save signals are called.
+        Otherwise each resource is put as by post.
+        """
+        resources = [self.resource_class.create_resource() for _ in source_dicts]
+        if not resources:
+            return resources
+        if filter(lambda field: isinstance(field, ReverseField), resources[0].fields):
+            raise ValidationError(resources[0], {'do not post a resource with a ReverseField':
+                                                 type(resources[0]).__name__})
+
+        errors = dict()
+        for index, (resource, source_dict) in enumerate(zip(resources, source_dicts)):
+            resource_errors = validate(ctx, type(resource).__name__, resource, source_dict)
+            if resource_errors:
+                errors[str(index)] = resource_errors
+
+        key = ctx.formatter.convert_to_public_property(type(resources[0]).__name__)
+        for validator in self.resource_class.validators:
+            find_duplicates = getattr(validator, 'find_duplicates', None)
+            if find_duplicates is not None:
+                for index in find_duplicates(ctx, source_dicts):
+                    errors.setdefault(str(index), {}).setdefault(key, []).append(validator.error_message)
+        if errors:
+            raise ValidationError(resources[0], errors)
+
+        try:
+            self._create_many(ctx, resources, source_dicts)
+        except django.db.IntegrityError, e:
+            raise ValidationError(resources[0], {'databaseError': str(e)})
+        return resources
+
+    def _create_many(self, ctx, resources, source_dicts):
+        """
+        Saves the new, validated resources from source_dicts in one
+        transaction, as described by post_many, and fills in their
+        resource_path.  A ValidationError raised for one of them has its
+        errors keyed by its position in source_dicts.
+        """
+        with transaction.atomic(using=ctx.db_alias):
+            if self.can_bulk_create(ctx, resources[0]):
+                for index, (resource, source_dict) in enumerate(zip(resources, source_dicts)):
+                    with ctx.target(resource.model):
+                        try:
+                            resource._set_pre_save_fields(ctx, source_dict)
+                        except TypeError, e:
+                            raise ValidationError(resource, {str(index): {'invalidFieldData': e.message}})
+
+                model_class = self.resource_class.model_class
+                queryset = ctx.using(model_class.objects.all())
+                queryset.bulk_create([resource.model for resource in resources], batch_size=self.bulk_create_chunk_size)
+                caching.advance_generation(model_class)
+            else:
+                for index, (resource, source_dict) in enumerate(zip(resources, source_dicts)):
+                    with ctx.target(resource.model):
+                        try:
+                            resource.put(ctx, source_dict, skip_validation=True)
+                        except ValidationError, e:
+                            raise ValidationError(e.resource, {str(index): e.errors})
+
+        for resource in resources:
+            self._set_posted_resource_path(resource)
+
+    def can_bulk_create(self, ctx, resource):
+        """
+        Returns whether new resource_class instances like resource can be
+        created with bulk_create: every field is set before the model is saved
+        and saves nothing else, the model_class neither customizes save nor
+        inherits from a concrete model, and the keys of the new rows are known
+        -- the published_key is not pk, the pk has a default or the database
+        returns the ids of bulk inserts.
+        """
+        model_class = self.resource_class.model_class
+        if model_class._meta.parents or \
+                getattr(model_class.save, '__func__', None) is not django.db.models.Model.save.__func__:
+            return False
+
+        for field in resource.fields:
+            pre_save = getattr(field, 'pre_save', None)
+            if pre_save is not None and not pre_save(resource.model):
+                return False
+            # setting a nested attribute saves the model it belongs to
+            if len(getattr(field, '_attrs', ())) > 1:
+                return False
+
+        if self.resource_class.published_key[0] != 'pk' or model_class._meta.pk.has_default():
+            return True
+        alias = ctx.db_alias or django.db.router.db_for_write(model_class)
+        return getattr(django.db.connections[alias].features, 'can_return_ids_from_bulk_insert', False)
+
+    def _set_posted_resource_path(self, resource):
         # If the newly created child_resource is not absolutely addressable on
         # its own, then fill in the address (assuming the QuerySetResource
         # is addressable itself.)
         if resource.resource_path is None and self.resource_path is not None:
             resource.resource_path = self.resource_path + '/' + str(resource.key)
 
-        return resource
-
     def get_child_resource(self, ctx, path_fragment):
-        if path_fragment == 'schema':
-            return SchemaResource(self.resource_class)
+        sub_resource = self._get_sub_resource(path_fragment)
+        if sub_resource is not None:
+            return sub_resource
 
         # No need to filter or slice here, does not make sense as part of get_child_resource
-        queryset = self.prepare_queryset(ctx, self.queryset)
+        queryset = self.prepare_queryset(ctx, ctx.using(self.queryset), project=ctx.project_columns)
+        query_key = self._get_query_key(queryset)
+        model = ctx.identity_map.get_loaded(query_key, path_fragment)
+        if model is None:
+            try:
+                model = self.resource_class.get_from_queryset(queryset, path_fragment)
+            except queryset.model.DoesNotExist:
+                return None
+            ctx.identity_map.add_loaded(query_key, path_fragment, model)
+
+        return self.to_resource(model)
+
+    def _get_query_key(self, queryset):
+        """
+        Returns what identifies the models looked up in the prepared queryset
+        in the identity map (see IdentityMap.add_loaded): a model loaded
+        elsewhere may lack its select_related joins or fail the queryset's or
+        an overridden get_from_queryset's filters.  None if queryset cannot
+        match anything.
+        """
         try:
-            model = self.resource_class.get_from_queryset(queryset, path_fragment)
-            return self.to_resource(model)
-        except queryset.model.DoesNotExist:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
             return None
+        return self.resource_class, queryset.db, sql, tuple(params)
+
+    def get_child_resources(self, ctx, path_fragments):
+        """
+        Resolves all of path_fragments with a single query against the prepared
+        queryset, rather than one get_from_queryset per fragment.
+        """
+        children = dict()
+        keys = set()
+        queryset = self.prepare_queryset(ctx, ctx.using(self.queryset), project=ctx.project_columns)
+        query_key = self._get_query_key(queryset)
+        for path_fragment in path_fragments:
+            if self._get_sub_resource(path_fragment) is not None or path_fragment in children:
+                continue
+            model = ctx.identity_map.get_loaded(query_key, path_fragment)
+            if model is None:
+                keys.add(path_fragment)
+            else:
+                children[path_fragment] = self.to_resource(model)
+
+        if keys:
+            for path_fragment, model in self.resource_class.get_many_from_queryset(queryset, keys).items():
+                children[path_fragment] = self.to_resource(ctx.identity_map.add_loaded(query_key, path_fragment, model))
+
+        resources = []
+        for path_fragment in path_fragments:
+            sub_resource = self._get_sub_resource(path_fragment)
+            resources.append(children.get(path_fragment) if sub_resource is None else sub_resource)
+        return resources
+
+    def _get_sub_resource(self, path_fragment):
+        if path_fragment == 'schema':
+            return SchemaResource(self.resource_class)
+        if path_fragment == 'import' and self.allow_import:
+            return ImportResource(self)
+        return None
+
+
+def _to_table(objects):
+    """
+    Returns the columns -- every property of objects, in order of appearance
+    -- and the rows of objects.
+    """
+    columns = OrderedDict()
+    for object_dict in objects:
+        for property_name in object_dict:
+            columns[property_name] = None
+    columns = list(columns)
+    return columns, [[object_dict.get(property_name) for property_name in columns] for object_dict in objects]
+
+
+def _encode_cursor(ctx, ordering, model):
+    values = []
+    for attribute, descending in ordering:
+        value = model
+        for attr in attribute.split('__'):
+            value = getattr(value, attr)
+        values.append(ctx.formatter.to_api_value(type(value), value))
+    return base64.urlsafe_b64encode(json.dumps(values))
+
+
+def _decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+    except (TypeError, ValueError):
+        values = None
+    if not isinstance(values, list):
+        raise SavoryPieError('Invalid cursor: {0}'.format(cursor))
+    return values
+
+
+def _keyset_q(ordering, values, reverse=False):
+    """
+    Builds the Q selecting the rows that come after values in ordering -- or
+    before them if reverse.
+    """
+    if len(values) != len(ordering):
+        raise SavoryPieError('Invalid cursor')
+
+    q = None
+    for index, (attribute, descending) in enumerate(ordering):
+        criteria = dict((ordering[i][0], values[i]) for i in range(index))
+        criteria[attribute + ('__lt' if descending != reverse else '__gt')] = values[index]
+        q = Q(**criteria) if q is None else q | Q(**criteria)
+    return q
 
 
 class DirtyInitializerMetaClass(type):
@@ -242,6 +900,25 @@ class ModelResource(Resource):
     #: integrity on a model.
     validators = []
 
+    #: optional - name of a version / last-modified attribute of model_class
+    #: (e.g. 'updated_at') that changes whenever a model is saved.  When set,
+    #: GET ETags are derived from it rather than from the serialized response,
+    #: so unchanged resources get a 304 without being serialized.  Changes to
+    #: related models embedded in the response are not reflected.
+    etag_attribute = None
+
+    #: optional - a caching.ResponseCache holding whole GET responses of this
+    #: resource (see QuerySetResource.response_cache)
+    response_cache = None
+
+    #: optional - if True the querysets of model_class that GETs read are
+    #: restricted with only() to the columns the fields name in their prepare
+    #: (plus the published_key and etag_attribute).  Any other attribute read
+    #: -- by an override of get_etag or to_resource, say -- then costs a query
+    #: per model, so only opt in when the fields are all the resource reads.
+    #: - defaults to False (every column is loaded)
+    project_columns = False
+
     _resource_path = None
 
     @classmethod
@@ -256,6 +933,56 @@ class ModelResource(Resource):
         kwargs[attr] = type_(path_fragment)
         return queryset.get(**kwargs)
 
+    @classmethod
+    def get_many_from_queryset(cls, queryset, path_fragments):
+        """
+        Bulk counterpart of get_from_queryset.  Filters the QuerySet with a
+        single {published_key}__in lookup and returns a dict mapping each
+        path_fragment that was found to its Model.  Fragments that are not
+        valid keys or that match nothing are left out.
+        """
+        attr, type_ = cls.published_key
+
+        path_fragments_by_key = dict()
+        for path_fragment in path_fragments:
+            try:
+                path_fragments_by_key[type_(path_fragment)] = path_fragment
+            except (TypeError, ValueError):
+                pass
+
+        models = dict()
+        if not path_fragments_by_key:
+            return models
+
+        kwargs = dict()
+        kwargs[attr + '__in'] = list(path_fragments_by_key.keys())
+        for model in queryset.filter(**kwargs):
+            path_fragment = path_fragments_by_key.get(getattr(model, attr))
+            if path_fragment is not None:
+                models[path_fragment] = model
+        return models
+
+    @classmethod
+    def get_resource_path_template(cls):
+        """
+        Returns a format string that produces the resource_path of this
+        ModelResource from a bare pk -- allowing URIs to be built without
+        loading the model.  Returns None when the resource_path cannot be
+        derived from the pk alone: the published_key is not pk, there is no
+        parent_resource_path, or key / resource_path are customized.
+
+        Computed once per class.
+        """
+        if '_resource_path_template' not in cls.__dict__:
+            template = None
+            if cls.published_key[0] == 'pk' and \
+                    cls.parent_resource_path is not None and \
+                    cls.key is ModelResource.__dict__['key'] and \
+                    cls.resource_path is ModelResource.__dict__['resource_path']:
+                template = cls.parent_resource_path.replace('{', '{{').replace('}', '}}') + '/{0}'
+            cls._resource_path_template = template
+        return cls._resource_path_template
+
     @classmethod
     def create_resource(cls):
         """
@@ -267,15 +994,24 @@ class ModelResource(Resource):
     def prepare(cls, ctx, related):
         """
         Called by QuerySetResource to add necessary select_related-s
-        calls to the QuerySet.
+        calls to the QuerySet.  Fields left out of ctx.field_selection are
+        skipped.
         """
+        if cls.project_columns:
+            related.only(cls.published_key[0], *filter(None, [cls.etag_attribute]))
+        else:
+            related.load_all()
+
+        selection = ctx.field_selection
         for field in cls.fields:
             try:
                 prepare = field.prepare
             except AttributeError:
-                pass
+                # no telling which columns it reads
+                related.load_all()
             else:
-                prepare(ctx, related)
+                if selection.is_all or selection.includes_field(ctx, field):
+                    prepare(ctx, related)
         return related
 
     @classmethod
@@ -290,7 +1026,7 @@ class ModelResource(Resource):
                 filter_by_item(ctx, filters, source_dict)
 
         try:
-            model = cls.model_class.objects.filter(**filters).get()
+            model = ctx.using(cls.model_class.objects.filter(**filters)).get()
         except django.core.exceptions.ObjectDoesNotExist:
             return None
         else:
@@ -322,11 +1058,116 @@ class ModelResource(Resource):
         # TODO: Sanity checks that path is bound properly
         self._resource_path = resource_path
 
+    @classmethod
+    def get_cache_models(cls):
+        """
+        Returns the models whose saves and deletes invalidate response_cache.
+        """
+        return caching.get_reachable_models(cls)
+
+    @classmethod
+    def get_outgoing_plan(cls, formatter):
+        """
+        Returns the compiled outgoing plan of this ModelResource for formatter:
+        one function per field with the signature of handle_outgoing, as
+        produced by the field's compile_outgoing (or handle_outgoing itself for
+        fields that cannot be compiled).
+
+        Plans are built once per (resource class, formatter class) and reused
+        for every model serialized -- including resources embedded through
+        SubObjectResourceField and IterableField.  A plan is rebuilt if fields
+        is replaced or changes length.
+        """
+        plans = cls.__dict__.get('_outgoing_plans')
+        if plans is None:
+            plans = cls._outgoing_plans = dict()
+
+        fields = cls.fields
+        plan = plans.get(type(formatter))
+        if plan is None or plan[0] is not fields or plan[1] != len(fields):
+            handlers = []
+            for field in fields:
+                try:
+                    compile_outgoing = field.compile_outgoing
+                except AttributeError:
+                    handlers.append(field.handle_outgoing)
+                else:
+                    handlers.append(compile_outgoing(formatter))
+            plan = plans[type(formatter)] = (fields, len(fields), handlers)
+        return plan[2]
+
+    @classmethod
+    def get_values_plan(cls, formatter):
+        """
+        Returns the values plan of this ModelResource for formatter: one
+        (ORM path, public property, value converter) per field, as produced
+        by the field's compile_values.  QuerySetResource uses it to build
+        objects straight from values_list rows, without a model or a
+        ModelResource per row.
+
+        Returns None -- so that models are used -- unless every field supports
+        compile_values on a column of model_class, and get, key and
+        resource_path are not customized.  Plans are built once per (resource
+        class, formatter class), like get_outgoing_plan.
+        """
+        plans = cls.__dict__.get('_values_plans')
+        if plans is None:
+            plans = cls._values_plans = dict()
+
+        fields = cls.fields
+        plan = plans.get(type(formatter))
+        if plan is None or plan[0] is not fields or plan[1] != len(fields):
+            plan = plans[type(formatter)] = (fields, len(fields), cls._compile_values_plan(formatter))
+        return plan[2]
+
+    @classmethod
+    def _compile_values_plan(cls, formatter):
+        if not isinstance(cls.fields, (list, tuple)) or \
+                getattr(cls.get, '__func__', None) is not ModelResource.get.__func__ or \
+                cls.key is not ModelResource.__dict__['key'] or \
+                cls.resource_path is not ModelResource.__dict__['resource_path']:
+            return None
+
+        values_plan = []
+        for field in cls.fields:
+            compile_values = getattr(field, 'compile_values', None)
+            entry = compile_values(formatter) if compile_values is not None else None
+            if entry is None:
+                return None
+            values_plan.append(entry)
+
+        for path in [cls.published_key[0]] + [path for path, _, _ in values_plan]:
+            if resolve_column_path(cls.model_class, path)[1] is not None:
+                return None
+        return values_plan
+
+    def get_etag(self, ctx, params):
+        if self.etag_attribute is None:
+            return None
+        return compute_etag(ctx, self, params, self.key, getattr(self.model, self.etag_attribute))
+
     def get(self, ctx, params):
+        with ctx.selecting(FieldSelection.from_params(params)):
+            return self._get(ctx)
+
+    def _get(self, ctx):
         target_dict = OrderedDict()
+        selection = ctx.field_selection
 
-        for field in self.fields:
-            field.handle_outgoing(ctx, self.model, target_dict)
+        if self.fields is type(self).fields:
+            plan = self.get_outgoing_plan(ctx.formatter)
+            if selection.is_all:
+                for handle_outgoing in plan:
+                    handle_outgoing(ctx, self.model, target_dict)
+            else:
+                for field, handle_outgoing in zip(self.fields, plan):
+                    if selection.includes_field(ctx, field):
+                        handle_outgoing(ctx, self.model, target_dict)
+        else:
+            # fields computed per instance cannot share a compiled plan
+            for field in self.fields:
+                if selection.is_all or selection.includes_field(ctx, field):
+                    field.handle_outgoing(ctx, self.model, target_dict)
 
         if self.resource_path is not None:
             target_dict['resourceUri'] = ctx.build_resource_uri(self)
@@ -353,9 +1194,12 @@ class ModelResource(Resource):
                 if not pre_save(self.model):
                     field.handle_incoming(ctx, source_dict, self.model)
 
-    def _save(self):
+    def _save(self, using=None):
         if self.model.is_dirty():
-            self.model.save()
+            if using is None:
+                self.model.save()
+            else:
+                self.model.save(using=using)
 
         for field in self.fields:
             try:
@@ -390,7 +1234,7 @@ class ModelResource(Resource):
             raise ValidationError(self, {'invalidFieldData': e.message})
 
         if save:
-            self._save()
+            self._save(ctx.db_alias)
             logger.debug('save succeeded for %s' % self)
 
         self._set_post_save_fields(ctx, source_dict)
@@ -398,6 +1242,7 @@ class ModelResource(Resource):
 
     def delete(self, ctx):
         self.model.delete()
+        ctx.identity_map.discard(self.model)
 
     @classmethod
     def _validator_schema(cls):
@@ -431,3 +1276,100 @@ class SchemaResource(Resource):
             except AttributeError:
                 pass
         return schema
+
+
+class ImportResource(Resource):
+    """
+    The import sub-resource of a QuerySetResource with allow_import set.  A
+    POST to it carries newline delimited JSON, one resource per line, and is
+    read a line at a time rather than loaded whole.  Every import_chunk_size
+    lines are validated and created -- as by QuerySetResource.post_many --
+    in a transaction of their own, so memory use does not grow with the
+    upload and what was created stays created if a later chunk fails.
+
+    Lines that are not a JSON object, fail validation, hold a value that
+    cannot be set (an unresolvable URI, a value of the wrong type) or break
+    a database constraint are skipped and reported by line number; the rest
+    of the stream is still imported.  The response holds the createdCount, the
+    errorCount and the errors of the first import_max_errors failed lines.
+    """
+    #: tells the views to hand post the request itself, not its decoded body
+    streaming_request = True
+
+    def __init__(self, queryset_resource):
+        self.__queryset_resource = queryset_resource
+
+    @property
+    def allowed_methods(self):
+        return self.__queryset_resource.allowed_methods & {'POST'}
+
+    def post(self, ctx, lines):
+        resource_class = self.__queryset_resource.resource_class
+        if filter(lambda field: isinstance(field, ReverseField), resource_class.fields):
+            raise ValidationError(resource_class.create_resource(), {'do not post a resource with a ReverseField':
+                                                                     resource_class.__name__})
+
+        chunk_size = self.__queryset_resource.import_chunk_size
+        result = {'createdCount': 0, 'errorCount': 0, 'errors': {}}
+        chunk = []
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                source_dict = json.loads(line)
+            except ValueError, e:
+                self._add_error(result, line_number, {'invalidJson': str(e)})
+                continue
+            if not isinstance(source_dict, dict):
+                self._add_error(result, line_number, {'invalidJson': 'expected an object'})
+                continue
+
+            chunk.append((line_number, source_dict))
+            if len(chunk) == chunk_size:
+                self._import_chunk(ctx, chunk, result)
+                chunk = []
+        if chunk:
+            self._import_chunk(ctx, chunk, result)
+        return result
+
+    def _import_chunk(self, ctx, chunk, result):
+        queryset_resource = self.__queryset_resource
+        line_numbers, resources, source_dicts = [], [], []
+        for line_number, source_dict in chunk:
+            resource = queryset_resource.resource_class.create_resource()
+            errors = validate(ctx, type(resource).__name__, resource, source_dict)
+            if errors:
+                self._add_error(result, line_number, errors)
+            else:
+                line_numbers.append(line_number)
+                resources.append(resource)
+                source_dicts.append(source_dict)
+        if not resources:
+            return
+
+        try:
+            queryset_resource._create_many(ctx, resources, source_dicts)
+            result['createdCount'] += len(resources)
+        except (ValidationError, django.db.IntegrityError, django.db.DataError, ValueError, KeyError, TypeError):
+            # find the lines at fault by creating the chunk's one at a time,
+            # each in a savepoint of the chunk's transaction
+            with transaction.atomic(using=ctx.db_alias):
+                for line_number, source_dict in zip(line_numbers, source_dicts):
+                    try:
+                        queryset_resource._create_many(ctx, [queryset_resource.resource_class.create_resource()],
+                                                       [source_dict])
+                        result['createdCount'] += 1
+                    except ValidationError, e:
+                        self._add_error(result, line_number, e.errors['0'])
+                    except (django.db.IntegrityError, django.db.DataError), e:
+                        self._add_error(result, line_number, {'databaseError': str(e)})
+                    except (ValueError, KeyError, TypeError), e:
+                        # e.g. an unresolvable URI or a value of the wrong type
+                        self._add_error(result, line_number, {'invalidFieldData': str(e)})
+        finally:
+            ctx.identity_map.clear()
+
+    def _add_error(self, result, line_number, errors):
+        result['errorCount'] += 1
+        if len(result['errors']) < self.__queryset_resource.import_max_errors:
+            result['errors'][str(line_number)] = errors
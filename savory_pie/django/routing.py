@@ -0,0 +1,97 @@
+import itertools
+import threading
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+
+class DatabaseRouter(object):
+    """
+    Chooses the database alias the queries of an API request go to, which
+    api_view and batch_api_view put in APIContext.db_alias.  This base class
+    leaves every request on Django's default routing.
+    """
+    def db_for_request(self, request):
+        """
+        Returns the alias for the queries of request, or None for Django's
+        default routing.
+        """
+        return None
+
+    def db_for_write(self, request):
+        """
+        Returns the alias for requests that must see the writes just made on
+        behalf of request -- e.g. the GETs following a write in a batch.
+        """
+        return None
+
+    def record_write(self, request):
+        """
+        Called once a write made on behalf of request has succeeded.
+        """
+        pass
+
+
+class ReplicaRouter(DatabaseRouter):
+    """
+    Sends GETs to the replicas, in turn, and everything else to primary.
+
+    For sticky_seconds after a client's write, its GETs go to primary too, so
+    it reads its own writes despite replication lag.  Clients are told apart
+    by get_client_key, and the time of their last write is kept in the Django
+    cache.
+    """
+    read_methods = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+    def __init__(self, replicas, primary=DEFAULT_DB_ALIAS, sticky_seconds=0):
+        self.replicas = list(replicas)
+        self.primary = primary
+        self.sticky_seconds = sticky_seconds
+        self._next_replica = itertools.cycle(self.replicas)
+        self._lock = threading.Lock()
+
+    def get_client_key(self, request):
+        """
+        Returns what identifies the client making request, or None if it
+        cannot be told apart from other clients.
+        """
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated() and getattr(user, 'pk', None) is not None:
+            return 'user:{0}'.format(user.pk)
+
+        session = getattr(request, 'session', None)
+        if session is not None and session.session_key:
+            return 'session:{0}'.format(session.session_key)
+
+        address = getattr(request, 'META', {}).get('REMOTE_ADDR')
+        if address:
+            return 'address:{0}'.format(address)
+        return None
+
+    def db_for_request(self, request):
+        if request.method not in self.read_methods or not self.replicas or self._is_sticky(request):
+            return self.primary
+
+        with self._lock:
+            return next(self._next_replica)
+
+    def db_for_write(self, request):
+        return self.primary
+
+    def record_write(self, request):
+        key = self._sticky_key(request)
+        if key is not None:
+            cache.set(key, True, self.sticky_seconds)
+
+    def _is_sticky(self, request):
+        key = self._sticky_key(request)
+        return key is not None and cache.get(key) is not None
+
+    def _sticky_key(self, request):
+        if not self.sticky_seconds:
+            return None
+
+        client_key = self.get_client_key(request)
+        if client_key is None:
+            return None
+        return 'savory_pie:sticky:{0}:{1}'.format(self.primary, client_key)
@@ -3,6 +3,7 @@ import pprint
 import sys
 import traceback
 
+from django.core.exceptions import FieldDoesNotExist
 from django.db import connection
 
 
@@ -80,10 +81,11 @@ class Related(object):
     Originally created to work around Django silliness - https://code.djangoproject.com/ticket/16855,
     but later extended to help track the related path from the root Model being selected.
     """
-    def __init__(self, prefix=None, select=None, prefetch=None, force_prefetch=False):
+    def __init__(self, prefix=None, select=None, prefetch=None, force_prefetch=False, only=None):
         self._prefix = prefix
         self._select = select if select is not None else set()
         self._prefetch = prefetch if prefetch is not None else set()
+        self._only = only if only is not None else set()
         self._annotate = []
         self._force_prefetch = force_prefetch
 
@@ -119,6 +121,26 @@ class Related(object):
         self._prefetch.add(self.translate(attribute))
         return self
 
+    def only(self, *attributes):
+        """
+        Called to name the columns a field reads -- prepare then restricts the
+        final queryset to the named columns (plus the pks and select-ed
+        relations) with an only call.
+
+        Columns read through a sub_prefetch are ignored, since prefetched
+        models are loaded by queries of their own.
+        """
+        if not self._force_prefetch:
+            self._only.update(self.translate(attribute) for attribute in attributes)
+        return self
+
+    def load_all(self):
+        """
+        Called when the model being prepared may have any of its columns read,
+        so that none of them are deferred.
+        """
+        return self.only('*')
+
     def sub_select(self, attribute):
         """
         Creates a sub-Related through this relationship.  All calls to select or
@@ -132,7 +154,8 @@ class Related(object):
             prefix=self.translate(attribute),
             select=self._select,
             prefetch=self._prefetch,
-            force_prefetch=self._force_prefetch
+            force_prefetch=self._force_prefetch,
+            only=self._only
         )
 
     def sub_prefetch(self, attribute):
@@ -148,7 +171,8 @@ class Related(object):
             prefix=self.translate(attribute),
             select=self._select,
             prefetch=self._prefetch,
-            force_prefetch=True
+            force_prefetch=True,
+            only=self._only
         )
 
     def annotate(self, aggregate, *args, **kwargs):
@@ -161,10 +185,14 @@ class Related(object):
         """
         self._annotate.append(aggregate(*args, **kwargs))
 
-    def prepare(self, queryset):
+    def prepare(self, queryset, project=True):
         """
         Should be called after all select and prefetch calls have been made to
         applied the accumulated confiugration to a QuerySet.
+
+        With project False, the columns named through only are ignored and
+        every column is loaded -- models that are to be modified and saved
+        must not be deferred.
         """
         if self._select:
             queryset = queryset.select_related(*self._select)
@@ -172,7 +200,135 @@ class Related(object):
         if self._prefetch:
             queryset = queryset.prefetch_related(*self._prefetch)
 
+        only = self.get_only(queryset.model) if project and self._only else None
+        if only:
+            queryset = queryset.only(*only)
+
         if self._annotate:
             queryset = queryset.annotate(*self._annotate)
 
         return queryset
+
+    def get_only(self, model):
+        """
+        Returns the arguments of the only call for a queryset of model: the
+        columns named through only, with every concrete column of the models
+        that had load_all called or that had an attribute named that is not a
+        column (a property, say).
+        """
+        only = set()
+        load_all = dict()
+        for path in self._only | self._select:
+            field_names, unresolved = resolve_column_path(model, path)
+            if unresolved is None:
+                only.add('__'.join(field_names))
+            else:
+                load_all['__'.join(field_names)] = unresolved
+
+        for prefix, current in load_all.items():
+            for field in current._meta.concrete_fields:
+                only.add(prefix + '__' + field.name if prefix else field.name)
+        return sorted(only)
+
+
+def has_multivalued_joins(queryset):
+    """
+    True if queryset joins across a to-many relation -- a reverse ForeignKey
+    or a ManyToManyField, whether through a filter, an ordering or the base
+    queryset -- so that the same row may come back more than once.  Tables
+    added with extra() are assumed to do so.
+    """
+    query = queryset.query
+    if query.extra_tables:
+        return True
+
+    for join in query.alias_map.values():
+        # the base table has no join_field
+        join_field = getattr(join, 'join_field', None)
+        if join_field is not None and (join_field.one_to_many or join_field.many_to_many):
+            return True
+
+    # orderings are only joined when the query is compiled
+    order_by = query.order_by
+    if not order_by and query.default_ordering:
+        order_by = queryset.model._meta.ordering
+    for field_name in order_by:
+        if isinstance(field_name, basestring) and _traverses_to_many(queryset.model, field_name.lstrip('-')):
+            return True
+    return False
+
+
+def get_query_models(queryset):
+    """
+    Returns the model of queryset followed by the models of the tables its
+    filters (and base queryset) read -- those joined to and those of
+    subqueries.
+    """
+    models = [queryset.model]
+    _add_query_models(queryset.query, models)
+    return models
+
+
+def _add_query_models(query, models):
+    for join in query.alias_map.values():
+        # the base table has no join_field
+        model = getattr(getattr(join, 'join_field', None), 'related_model', None)
+        if model is not None and model not in models:
+            models.append(model)
+
+    pending = [query.where]
+    while pending:
+        node = pending.pop()
+        pending.extend(getattr(node, 'children', ()))
+        rhs = getattr(node, 'rhs', None)
+        # a QuerySet is turned into its Query when filtered on
+        subquery = getattr(rhs, 'query', rhs)
+        if hasattr(subquery, 'alias_map'):
+            if subquery.model not in models:
+                models.append(subquery.model)
+            _add_query_models(subquery, models)
+
+
+def _traverses_to_many(model, path):
+    for name in path.split('__'):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        if field.one_to_many or field.many_to_many:
+            return True
+        model = field.related_model
+        if model is None:
+            return False
+    return False
+
+
+def resolve_column_path(model, path):
+    """
+    Resolves path, an ORM path such as 'group__name', through the concrete
+    columns of model.  Returns (field_names, None) when all of path is
+    columns; otherwise the field_names of the part that is, and the model on
+    which the next part is not a column (a property, say).
+    """
+    names = path.split('__')
+    field_names = []
+    for index, name in enumerate(names):
+        field = _get_column_field(model, name)
+        if field is None or (index + 1 < len(names) and field.related_model is None):
+            return field_names, model
+        # only() understands pk at the top level alone
+        field_names.append(name if name == 'pk' and not index else field.name)
+        model = field.related_model
+    return field_names, None
+
+
+def _get_column_field(model, name):
+    if name == 'pk':
+        return model._meta.pk
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if not field.concrete or field.many_to_many:
+        return None
+    return field
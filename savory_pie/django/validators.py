@@ -1,5 +1,6 @@
 import collections
 import datetime
+import json
 import re
 import savory_pie
 
@@ -419,17 +420,41 @@ class UniqueTogetherValidator(ResourceValidator):
 
         if filters and hasattr(resource, 'model'):
             try:
-                qset = resource.model.__class__.objects.all()
+                qset = ctx.using(resource.model.__class__.objects.all())
                 for f in filters:
                     qset = qset.filter(**f)
-                if len(qset):
+                # two rows are enough to tell a duplicate from the object itself
+                matches = [ctx.identity_map.add(model) for model in qset[:2]]
+                if matches:
                     # if validation fails because we're re-saving an existing object, ignore
-                    if len(qset) == 1 and resource.model.pk and qset[0].pk == resource.model.pk:
+                    if len(matches) == 1 and resource.model.pk and matches[0].pk == resource.model.pk:
                         return
                     self._add_error(error_dict, key, self.error_message)
             except Exception:
                 pass
 
+    def find_duplicates(self, ctx, source_dicts):
+        """
+        Returns the indexes of source_dicts that repeat the values of an
+        earlier one for the fields -- find_errors only compares each against
+        the database, which does not hold the others of a set created at once.
+        """
+        seen = set()
+        duplicates = []
+        for index, source_dict in enumerate(source_dicts):
+            values = []
+            for attr in self._fields:
+                public_attr = ctx.formatter.convert_to_public_property(attr)
+                if public_attr not in source_dict or (self.null and source_dict[public_attr] is None):
+                    break
+                values.append(json.dumps(source_dict[public_attr], sort_keys=True))
+            else:
+                values = tuple(values)
+                if values in seen:
+                    duplicates.append(index)
+                seen.add(values)
+        return duplicates
+
 
 class UniquePairedFieldValidator(ResourceValidator):
     """
@@ -485,7 +510,7 @@ class UniquePairedFieldValidator(ResourceValidator):
 
         if filters and hasattr(resource, 'model'):
             try:
-                qset = resource.model.__class__.objects.filter(**filters[0]).exclude(**filters[1])
+                qset = ctx.using(resource.model.__class__.objects.filter(**filters[0])).exclude(**filters[1])
                 if len(qset):
                     self._add_error(error_dict, key, self.error_message)
             except Exception:
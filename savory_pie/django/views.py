@@ -1,28 +1,49 @@
+import Queue
 import functools
+import json
 import logging
 import re
+import sys
+import threading
 
-from django.db import transaction, DatabaseError
+from django.db import connections, transaction, DatabaseError
 from django.http import HttpResponse, StreamingHttpResponse, HttpRequest
 from django.utils.datastructures import MultiValueDict
 
-from savory_pie.context import APIContext
-from savory_pie.django import validators
+from savory_pie.context import APIContext, FieldSelection
+from savory_pie.django import caching, validators
 from savory_pie.errors import AuthorizationError, PreConditionError, MethodNotAllowedError
-from savory_pie.formatters import JSONFormatter
+from savory_pie.formatters import EncodedValue, JSONFormatter
 from savory_pie.savory_newrelic import set_transaction_name
-from savory_pie.helpers import get_sha1, process_get_request, process_post_request, process_put_request, process_delete_request
+from savory_pie.resources import _ParamsImpl
+from savory_pie.helpers import encode_with_sha1, process_post_request, process_put_request, process_delete_request
 
 logger = logging.getLogger(__name__)
 
 
-def batch_api_view(root_resource, base_regex):
+def batch_api_view(root_resource, base_regex, router=None, max_workers=None):
     """
     View function factory that provides accessing to the resource tree
     rooted at root_resource.
 
     The produced function needs to be bound into URLs as r'^some/base/path/(.*)$'
     base_regex is the regex to the sub resources r'^some/base/path/(?P<base_resource>.*)$'
+
+    router, a savory_pie.django.routing.DatabaseRouter, picks the database of
+    each sub-request; once a write has succeeded, the GETs after it go to
+    router.db_for_write so that they see it.
+
+    If max_workers is set, the GETs between two writes run at the same time,
+    on up to max_workers threads with a database connection each.  Writes
+    still run one at a time, in order, and results keep the order of the
+    sub-requests.  They run one at a time too when a transaction is open on
+    the database they read from (under ATOMIC_REQUESTS, say), whose
+    uncommitted writes other connections would not see.
+
+    A batch with "atomic": true runs in a single transaction, committed once
+    at the end, with a savepoint per sub-request: one that fails is rolled
+    back alone and reported in its result, like in any other batch.  Its
+    GETs are not run concurrently.
     """
     # Hide this import from sphinx
     from django.views.decorators.csrf import csrf_exempt
@@ -32,6 +53,7 @@ def batch_api_view(root_resource, base_regex):
 
     # TODO: Make this a setter
     root_resource.set_base_regex(base_regex)
+    base_pattern = re.compile(root_resource.base_regex)
 
     def create_request(method, uri, user):
         request = HttpRequest()
@@ -45,20 +67,63 @@ def batch_api_view(root_resource, base_regex):
         url_path = host.join(uri.split(host)[1:])
         if url_path and url_path[0] == '/':
             url_path = url_path[1:]
-        pattern = re.compile(root_resource.base_regex)
-        match = pattern.search(url_path)
+        match = base_pattern.search(url_path)
         if match:
             base_url = match.group('base_resource')
             if base_url:
                 return base_url
         return ''
 
-    def resource_dispatch(request, uri, data, host):
+    def resolve_get_run(request, resource_requests, start, db_alias=None):
+        """
+        Resolves the resources of the run of consecutive GET sub-requests
+        starting at start in one pass, so that sibling resources are fetched
+        together.  Returns a dict mapping sub-request index to resource, and
+        one mapping the index of each sub-request identical to an earlier one
+        of the run to the index of that one.
+        """
+        host = request.get_host()
+        indexes = []
+        resource_paths = []
+        first_indexes = {}
+        duplicates = {}
+        for index in xrange(start, len(resource_requests)):
+            if resource_requests[index]['method'].upper() != 'GET':
+                break
+            key = (resource_requests[index]['uri'], json.dumps(resource_requests[index].get('body'), sort_keys=True))
+            if key in first_indexes:
+                duplicates[index] = first_indexes[key]
+                continue
+            first_indexes[key] = index
+            indexes.append(index)
+            resource_paths.append(compute_resource_path(resource_requests[index]['uri'], host))
+
+        ctx = compute_context('', request, root_resource)
+        ctx.project_columns = True
+        ctx.db_alias = get_run_db_alias(request, resource_requests, start, db_alias)
+        return dict(zip(indexes, ctx.resolve_resource_paths(resource_paths))), duplicates
+
+    def get_run_db_alias(request, resource_requests, start, db_alias=None):
+        """
+        Returns the database the run of GET sub-requests starting at start
+        reads from: db_alias if set, otherwise the router's choice, or None
+        when there is no router.
+        """
+        if db_alias is None and router is not None:
+            # routed as the GETs it resolves for, not as the batch POST
+            db_alias = router.db_for_request(create_request('GET', resource_requests[start]['uri'], request.user))
+        return db_alias
+
+    def resource_dispatch(request, uri, data, host, resource=None, db_alias=None):
 
         resource_path = compute_resource_path(uri, host)
-        ctx = compute_context(resource_path, request, root_resource)
+        ctx = compute_context(resource_path, request, root_resource, router=router)
+        ctx.project_columns = request.method == 'GET'
+        if db_alias is not None:
+            ctx.db_alias = db_alias
 
-        resource = ctx.resolve_resource_path(resource_path)
+        if resource is None:
+            resource = ctx.resolve_resource_path(resource_path)
 
         resource_result = {'uri': uri}
 
@@ -100,6 +165,8 @@ def batch_api_view(root_resource, base_regex):
             resource_result['data'] = {
                 ctx.formatter.convert_to_public_property('error'): traceback.format_exc()
             }
+        finally:
+            ctx.identity_map.clear()
 
         return resource_result
 
@@ -107,10 +174,13 @@ def batch_api_view(root_resource, base_regex):
         resource_result = {}
         get_data = MultiValueDict()
         get_data.update(data)
-        content_dict = process_get_request(ctx, resource, get_data)
+        content_dict = caching.process_cached_get_request(ctx, resource, get_data)
+        if ctx.streaming_response:
+            # a batch response is written in one piece
+            content_dict = EncodedValue(''.join(content_dict))
+        encoded, resource_result['etag'] = encode_with_sha1(ctx, content_dict)
         resource_result['status'] = 200
-        resource_result['etag'] = get_sha1(ctx, content_dict)
-        resource_result['data'] = content_dict
+        resource_result['data'] = EncodedValue(encoded)
 
         return resource_result
 
@@ -119,7 +189,10 @@ def batch_api_view(root_resource, base_regex):
         resource_result = {}
         new_resource = process_post_request(ctx, resource, data)
         resource_result['status'] = 201
-        resource_result['location'] = ctx.build_resource_uri(new_resource)
+        if isinstance(new_resource, list):
+            resource_result['data'] = _created_uris(ctx, new_resource)
+        else:
+            resource_result['location'] = ctx.build_resource_uri(new_resource)
         return resource_result
 
     @_database_transaction_batch
@@ -143,32 +216,81 @@ def batch_api_view(root_resource, base_regex):
 
         return resource_result
 
+    def dispatch_batch(request, resource_requests, atomic=False, using=None):
+        """
+        Dispatches resource_requests in order and returns their results.  If
+        atomic, the caller has opened a transaction on using, and each
+        sub-request runs in a savepoint of it.
+        """
+        resolved = {}
+        duplicates = {}
+        dispatched = {}
+        result = []
+        # set once a write succeeds, for the GETs after it to read from
+        written_db_alias = None
+
+        def dispatch(index):
+            resource_request = resource_requests[index]
+            uri = resource_request['uri']
+            return resource_dispatch(
+                create_request(resource_request['method'], uri, request.user),
+                uri,
+                resource_request.get('body', None),
+                request.get_host(),
+                resource=resolved.get(index),
+                db_alias=written_db_alias
+            )
+
+        for index, resource_request in enumerate(resource_requests):
+            method = resource_request['method'].upper()
+
+            # Resources can only be resolved ahead of time up to the next
+            # write, which might create or delete them.
+            if method == 'GET' and index not in resolved and index not in duplicates:
+                resolved, duplicates = resolve_get_run(request, resource_requests, index, db_alias=written_db_alias)
+                # other threads' connections would not see the uncommitted writes
+                if max_workers and not atomic and \
+                        not _in_atomic_block(get_run_db_alias(request, resource_requests, index, written_db_alias)):
+                    indexes = sorted(resolved)
+                    dispatched = dict(zip(indexes, _run_concurrently(dispatch, indexes, max_workers)))
+
+            if index in duplicates:
+                # nothing is written between identical GETs of a run
+                result.append(dict(result[duplicates[index]]))
+                continue
+
+            if index in dispatched:
+                resource_result = dispatched.pop(index)
+            elif atomic and method not in ('POST', 'PUT'):
+                # POSTs and PUTs are in a (nested, so savepoint) atomic block already
+                resource_result = _in_savepoint(using, dispatch, index)
+            else:
+                resource_result = dispatch(index)
+            result.append(resource_result)
+
+            if router is not None and method != 'GET' and 200 <= resource_result['status'] < 300:
+                router.record_write(request)
+                written_db_alias = router.db_for_write(request)
+
+        return result
+
     @csrf_exempt
     @set_transaction_name
     def view(request, resource_path):
 
-        ctx = compute_context(resource_path, request, root_resource)
+        ctx = compute_context(resource_path, request, root_resource, router=router)
         try:
             if resource_path or request.method != 'POST':
                 return _not_allowed_resource_method(ctx, root_resource, request, ['POST'])
 
             data = ctx.formatter.read_from(request)
-            result = []
-            for resource_request in data.get('data', []):
-                method = resource_request['method']
-                uri = resource_request['uri']
-                body = resource_request.get('body', None)
-
-                resource_request = create_request(method, uri, request.user)
-
-                result.append(
-                    resource_dispatch(
-                        resource_request,
-                        uri,
-                        body,
-                        request.get_host()
-                    )
-                )
+            resource_requests = data.get('data', [])
+            if data.get('atomic'):
+                using = router.db_for_write(request) if router is not None else None
+                with transaction.atomic(using=using):
+                    result = dispatch_batch(request, resource_requests, atomic=True, using=using)
+            else:
+                result = dispatch_batch(request, resource_requests)
 
             return _content_success(ctx, None, request, {'data': result})
 
@@ -180,7 +302,43 @@ def batch_api_view(root_resource, base_regex):
     return view
 
 
-def compute_context(resource_path, request, root_resource):
+def _run_concurrently(func, items, max_workers):
+    """
+    Returns [func(item) for item in items], calling func on up to max_workers
+    threads.  Each thread closes the database connections it opened before
+    it ends.
+    """
+    results = [None] * len(items)
+    work = Queue.Queue()
+    for index, item in enumerate(items):
+        work.put((index, item))
+    errors = []
+
+    def worker():
+        try:
+            while True:
+                try:
+                    index, item = work.get_nowait()
+                except Queue.Empty:
+                    return
+                results[index] = func(item)
+        except Exception:
+            errors.append(sys.exc_info())
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in xrange(min(max_workers, len(items)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0][0], errors[0][1], errors[0][2]
+    return results
+
+
+def compute_context(resource_path, request, root_resource, router=None):
     full_path = _strip_query_string(request.get_full_path())
     if len(resource_path) == 0:
         base_path = full_path
@@ -193,16 +351,21 @@ def compute_context(resource_path, request, root_resource):
         formatter=JSONFormatter(),
         request=request
     )
+    if router is not None:
+        ctx.db_alias = router.db_for_request(request)
 
     return ctx
 
 
-def api_view(root_resource):
+def api_view(root_resource, router=None):
     """
     View function factory that provides accessing to the resource tree
     rooted at root_resource.
 
     The produced function needs to be bound into URLs as r'^some/base/path/(.*)$'
+
+    router, a savory_pie.django.routing.DatabaseRouter, picks the database of
+    each request and is told of the writes that succeed.
     """
     # Hide this import from sphinx
     from django.views.decorators.csrf import csrf_exempt
@@ -214,9 +377,15 @@ def api_view(root_resource):
     @set_transaction_name
     def view(request, resource_path):
 
-        ctx = compute_context(resource_path, request, root_resource)
+        ctx = compute_context(resource_path, request, root_resource, router=router)
 
         try:
+            if request.method == 'GET':
+                # selected before resolving, so that the queryset a detail
+                # resource is loaded from is prepared for the selection too
+                ctx.field_selection = FieldSelection.from_params(_ParamsImpl(request.GET)) or ctx.field_selection
+                ctx.project_columns = True
+
             resource = ctx.resolve_resource_path(resource_path)
 
             if resource is None:
@@ -224,20 +393,28 @@ def api_view(root_resource):
 
             if request.method == 'GET':
                 return _process_get(ctx, resource, request)
+            elif request.method == 'POST' and getattr(resource, 'streaming_request', False):
+                response = _process_streaming_post(ctx, resource, request)
             elif request.method == 'POST':
-                return _process_post(ctx, resource, request)
+                response = _process_post(ctx, resource, request)
             elif request.method == 'PUT':
-                return _process_put(ctx, resource, request)
+                response = _process_put(ctx, resource, request)
             elif request.method == 'DELETE':
-                return _process_delete(ctx, resource, request)
+                response = _process_delete(ctx, resource, request)
             else:
                 return _not_allowed_method(ctx, resource, request)
+
+            if router is not None and 200 <= response.status_code < 300:
+                router.record_write(request)
+            return response
         except AuthorizationError as e:
             return _access_denied(ctx, field_name=e.name)
         except Exception:
             import traceback
             logger.exception('Caught Exception in API')
             return _internal_error(ctx, request, traceback.format_exc())
+        finally:
+            ctx.identity_map.clear()
 
     return view
 
@@ -258,7 +435,7 @@ def _database_transaction_batch(func):
     @functools.wraps(func)
     def inner(ctx, resource, request, func=func):
         try:
-            with transaction.atomic():
+            with transaction.atomic(using=ctx.db_alias):
                 response = func(ctx, resource, request)
                 if not 200 <= response.get('status', 500) < 300:
                     # force a rollback
@@ -278,11 +455,39 @@ def _database_transaction_batch(func):
     return outer
 
 
+def _in_savepoint(using, func, *args):
+    """
+    Returns func(*args), a batch sub-request result, rolling back what it did
+    unless it succeeded.  Within a transaction, the atomic block is a
+    savepoint.
+    """
+    try:
+        with transaction.atomic(using=using):
+            response = func(*args)
+            if not 200 <= response.get('status', 500) < 300:
+                # force a rollback
+                raise _RequestError
+    except _RequestError:
+        return response
+
+    return response
+
+
+def _in_atomic_block(using):
+    """
+    True if a transaction is open on the connection of using, or on any
+    connection when using is None.
+    """
+    if using is None:
+        return any(connection.in_atomic_block for connection in connections.all())
+    return connections[using].in_atomic_block
+
+
 def _database_transaction(func):
     @functools.wraps(func)
     def inner(ctx, resource, request, func=func):
         try:
-            with transaction.atomic():
+            with transaction.atomic(using=ctx.db_alias):
                 response = func(ctx, resource, request)
                 if not 200 <= response.status_code < 300:
                     # force a rollback
@@ -317,16 +522,43 @@ def _inner_transaction(ctx, resource, request, func):
 
 def _process_get(ctx, resource, request):
     try:
-        content_dict = process_get_request(
+        etag = None
+        if 'GET' in resource.allowed_methods:
+            # checked before get, so a match costs no serialization; it is
+            # the ETag of every response, so the client revalidates with it
+            etag = _get_etag(ctx, resource, request)
+            if etag is not None and _etag_matches(etag, request.META.get('HTTP_IF_NONE_MATCH')):
+                return _not_modified(ctx, resource, request, etag)
+
+        content_dict = caching.process_cached_get_request(
             ctx,
             resource,
             request.GET
         )
-        return _content_success(ctx, resource, request, content_dict)
+        return _content_success(ctx, resource, request, content_dict, etag=etag)
     except MethodNotAllowedError:
         return _not_allowed_method(ctx, resource, request)
 
 
+def _get_etag(ctx, resource, request):
+    get_etag = getattr(resource, 'get_etag', None)
+    if get_etag is None:
+        return None
+    return get_etag(ctx, _ParamsImpl(request.GET))
+
+
+def _etag_matches(etag, if_none_match):
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == '*' or tag.strip('"') == etag:
+            return True
+    return False
+
+
 @_database_transaction
 def _process_post(ctx, resource, request):
     try:
@@ -343,6 +575,26 @@ def _process_post(ctx, resource, request):
         return _not_allowed_method(ctx, resource, request)
 
 
+def _process_streaming_post(ctx, resource, request):
+    """
+    POSTs the request itself, a file-like object, to a resource that reads
+    the body as it goes and manages its own transactions -- like
+    resources.ImportResource -- and responds with the dict it returns.
+    """
+    try:
+        content_dict = process_post_request(ctx, resource, request)
+        response = HttpResponse(
+            status=200,
+            content_type=ctx.formatter.content_type
+        )
+        ctx.formatter.write_to(content_dict, response)
+        return response
+    except validators.ValidationError, ve:
+        return _validation_errors(ctx, ve.resource, request, ve.errors)
+    except MethodNotAllowedError:
+        return _not_allowed_method(ctx, resource, request)
+
+
 @_database_transaction
 def _process_put(ctx, resource, request):
     try:
@@ -408,7 +660,14 @@ def _validation_errors(ctx, resource, request, errors):
 
 
 def _created(ctx, resource, request, new_resource):
-    if resource.return_on_post:
+    if isinstance(new_resource, list):
+        response = HttpResponse(
+            status=201,
+            content_type=ctx.formatter.content_type
+        )
+        ctx.formatter.write_to(_created_uris(ctx, new_resource), response)
+        return response
+    elif resource.return_on_post:
         # We don't need Location, ETag or streaming
         response = HttpResponse(
             status=201,
@@ -422,20 +681,37 @@ def _created(ctx, resource, request, new_resource):
         return response
 
 
-def _content_success(ctx, resource, request, content_dict):
+def _created_uris(ctx, new_resources):
+    return {
+        ctx.formatter.convert_to_public_property('resource_uris'): [
+            ctx.build_resource_uri(new_resource) for new_resource in new_resources
+        ]
+    }
+
+
+def _content_success(ctx, resource, request, content_dict, etag=None):
     if ctx.streaming_response:
         response = StreamingHttpResponse(
             content_dict,
             status=200,
             content_type=ctx.formatter.content_type)
-        # No ETag, not practical on streaming
-    else:
+        # Only a resource provided ETag, hashing is not practical on streaming
+        if etag is not None:
+            response['ETag'] = etag
+    elif etag is not None:
         response = HttpResponse(
             status=200,
             content_type=ctx.formatter.content_type
         )
-        response['ETag'] = get_sha1(ctx, content_dict)
+        response['ETag'] = etag
         ctx.formatter.write_to(content_dict, response)
+    else:
+        response = HttpResponse(
+            status=200,
+            content_type=ctx.formatter.content_type
+        )
+        encoded, response['ETag'] = encode_with_sha1(ctx, content_dict)
+        response.write(encoded)
     headers = ctx.headers
     if headers:
         for header, value in headers.items():
@@ -444,6 +720,12 @@ def _content_success(ctx, resource, request, content_dict):
     return response
 
 
+def _not_modified(ctx, resource, request, etag):
+    response = HttpResponse(status=304)
+    response['ETag'] = etag
+    return response
+
+
 def _no_content_success(ctx, resource, request):
     return HttpResponse(status=204)
 
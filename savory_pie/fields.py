@@ -7,6 +7,75 @@ from savory_pie.django.validators import validate, ValidationError
 from savory_pie.errors import SavoryPieError
 
 
+def _overrides(field, base_class, *method_names):
+    """
+    True if the class of field replaces any of method_names of base_class, in
+    which case a compiled outgoing plan cannot stand in for handle_outgoing.
+    """
+    field_class = type(field)
+    for method_name in method_names:
+        method = getattr(field_class, method_name)
+        if getattr(method, '__func__', method) is not getattr(base_class, method_name).__func__:
+            return True
+    return False
+
+
+def _memo_key(kind, resource_class, model, *extra):
+    """
+    Returns the key under which ctx.sub_resource_memo holds what kind of
+    field output was built for model with resource_class, or None for models
+    without a pk.
+    """
+    pk = getattr(model, 'pk', None)
+    if pk is None:
+        return None
+    return (kind, resource_class, type(model), pk) + extra
+
+
+def _get_sub_resource_dict(ctx, resource_class, model):
+    """
+    Returns resource_class(model).get(ctx, EmptyParams()), memoized for the
+    request under the current field selection.  The dict may be shared.
+    """
+    return ctx.sub_resource_memo.get_or_build(
+        _memo_key('get', resource_class, model, ctx.field_selection.cache_key),
+        lambda: resource_class(model).get(ctx, EmptyParams())
+    )
+
+
+def _sideload(ctx, resource_class, model):
+    """
+    Adds the dict of resource_class(model) to ctx.included, unless already
+    there, and returns its URI -- or returns None if the resource has no URI
+    and must be embedded instead.
+    """
+    resource = resource_class(model)
+    if resource.resource_path is None:
+        return None
+
+    uri = ctx.build_resource_uri(resource)
+    if uri not in ctx.included:
+        ctx.included[uri] = _get_sub_resource_dict(ctx, resource_class, model)
+    return uri
+
+
+def _get_uri(ctx, resource_class, model):
+    """
+    Returns the URI of resource_class(model), memoized for the request.
+    """
+    return ctx.sub_resource_memo.get_or_build(
+        _memo_key('uri', resource_class, model),
+        lambda: ctx.build_resource_uri(resource_class(model))
+    )
+
+
+def _resolve_uri(ctx, uri):
+    resource = ctx.resolve_resource_uri(uri)
+    if resource is None:
+        raise ValueError('invalid URI {0}: '.format(uri))
+    return resource
+
+
 def read_only_noop(func):
     @functools.wraps(func)
     def inner(self, *args, **kwargs):
@@ -51,6 +120,14 @@ class Field(object):
             raise SavoryPieError(u'Unable to determine name for field: {0}'.format(self))
         return name
 
+    def _get_related(self, ctx, obj):
+        """
+        Reads the related model at self._attribute through the identity map of
+        the request, so a row that was already loaded is not loaded again.
+        """
+        model_class = getattr(self._resource_class, 'model_class', None)
+        return ctx.identity_map.get_related(obj, self._attribute, model_class)
+
     def schema(self, ctx, **kwargs):
         schema = kwargs.pop('schema', {})
         if getattr(self, '_type', None):
@@ -168,6 +245,39 @@ class AttributeField(Field):
             self._get(source_obj)
         )
 
+    def compile_outgoing(self, formatter):
+        """
+        Returns a function with the signature of handle_outgoing that has the
+        public property, the attribute chain and the value converter for
+        formatter resolved up front.  Subclasses that customize how outgoing
+        values are read or converted just get handle_outgoing back.
+        """
+        if _overrides(self, AttributeField,
+                      'handle_outgoing', '_compute_property', '_get', '_get_object', 'to_api_value'):
+            return self.handle_outgoing
+
+        if self._published_property is not None:
+            property_name = formatter.convert_to_public_property(self._published_property)
+        else:
+            property_name = formatter.convert_to_public_property(self._bare_attribute)
+        to_api_value = formatter.compile_to_api_value(self._type)
+        attrs = self._attrs
+        path, bare_attribute = attrs[:-1], attrs[-1]
+
+        if not path:
+            def handle_outgoing(ctx, source_obj, target_dict):
+                target_dict[property_name] = to_api_value(getattr(source_obj, bare_attribute))
+        else:
+            def handle_outgoing(ctx, source_obj, target_dict):
+                obj = source_obj
+                for attr in path:
+                    obj = getattr(obj, attr)
+                    if obj is None:
+                        target_dict[property_name] = to_api_value(None)
+                        return
+                target_dict[property_name] = to_api_value(getattr(obj, bare_attribute))
+        return handle_outgoing
+
     def to_python_value(self, ctx, api_value):
         return ctx.formatter.to_python_value(self._type, api_value)
 
@@ -251,8 +361,7 @@ class URIResourceField(Field):
     def handle_outgoing(self, ctx, source_obj, target_dict):
         sub_model = getattr(source_obj, self._attribute)
         if sub_model is not None:
-            resource = self._resource_class(sub_model)
-            target_dict[self._compute_property(ctx)] = ctx.build_resource_uri(resource)
+            target_dict[self._compute_property(ctx)] = _get_uri(ctx, self._resource_class, sub_model)
         else:
             target_dict[self._compute_property(ctx)] = None
 
@@ -362,6 +471,7 @@ class URIListResourceField(Field):
         db_keys = set()
         db_models = {}
         for model in self.get_iterable(attribute):
+            ctx.identity_map.add(model)
             resource = self._resource_class(model)
             db_models[resource.key] = model
             db_keys.add(resource.key)
@@ -369,8 +479,8 @@ class URIListResourceField(Field):
         new_models = []
         request_keys = set()
 
-        for resource_uri in source_dict[self._compute_property(ctx)]:
-            resource = ctx.resolve_resource_uri(resource_uri)
+        resource_uris = source_dict[self._compute_property(ctx)]
+        for resource_uri, resource in zip(resource_uris, ctx.resolve_resource_uris(resource_uris)):
             if resource:
                 request_keys.add(resource.key)
 
@@ -387,6 +497,7 @@ class URIListResourceField(Field):
         else:
             for model in models_to_remove:
                 model.delete()
+                ctx.identity_map.discard(model)
 
         if hasattr(attribute, 'add'):
             attribute.add(*new_models)
@@ -437,6 +548,12 @@ class SubObjectResourceField(Field):
             optional -- a ResourceValidator, or list/tuple of ResourceValidators, to
             validate the data in the related object
 
+        ``collapsed``
+            optional -- render the related object as its resourceUri, unless
+            the client names the field in the expand parameter; resource_class
+            must be addressable.  The URI is also accepted on the way in.
+            Defaults to False.
+
         .. code-block:: python
 
             SubObjectResourceField('other', OtherResource)
@@ -453,13 +570,21 @@ class SubObjectResourceField(Field):
                  published_property=None,
                  read_only=False,
                  validator=None,
-                 permission=None):
+                 permission=None,
+                 collapsed=False):
         self._attribute = attribute
         self.init_resource_class(resource_class)
         self._published_property = published_property
         self._read_only = read_only
         self.validator = validator or []
         self.permission = permission
+        self._collapsed = collapsed
+
+    def is_collapsed(self, ctx):
+        """
+        True if the field renders as a URI under ctx.field_selection.
+        """
+        return self._collapsed and not ctx.field_selection.expands(self._compute_property(ctx))
 
     def _compute_property(self, ctx):
         if self._published_property is not None:
@@ -480,7 +605,7 @@ class SubObjectResourceField(Field):
             resource = ctx.resolve_resource_uri(sub_source_dict['resourceUri'])
         else:
             try:
-                attribute = getattr(target_obj, self._attribute)
+                attribute = self._get_related(ctx, target_obj)
             except AttributeError:
                 return None
 
@@ -491,6 +616,15 @@ class SubObjectResourceField(Field):
     def get_submodel(self, ctx, source_object):
         return getattr(source_object, self._attribute, None)
 
+    def get_uri(self, ctx, source_object):
+        """
+        Returns the URI a collapsed field renders for source_object.
+        """
+        sub_model = self.get_submodel(ctx, source_object)
+        if sub_model is None:
+            return None
+        return _get_uri(ctx, self._resource_class, sub_model)
+
     def pre_save(self, model):
         return True
 
@@ -499,6 +633,10 @@ class SubObjectResourceField(Field):
     def handle_incoming(self, ctx, source_dict, target_obj):
         if not source_dict:
             setattr(target_obj, self._attribute, None)
+        elif self._collapsed and isinstance(source_dict.get(self._compute_property(ctx)), basestring):
+            # the URI of a collapsed field only references the object
+            uri = source_dict[self._compute_property(ctx)]
+            setattr(target_obj, self._attribute, _resolve_uri(ctx, uri).model)
         else:
             sub_resource = self.get_subresource(ctx, source_dict, target_obj)
 
@@ -533,14 +671,41 @@ class SubObjectResourceField(Field):
                     setattr(target_obj, self._attribute, sub_resource.model)
 
     def handle_outgoing(self, ctx, source_obj, target_dict):
+        self._handle_outgoing(ctx, source_obj, target_dict, self._compute_property(ctx))
+
+    def _handle_outgoing(self, ctx, source_obj, target_dict, property_name):
+        if self._collapsed and not ctx.field_selection.expands(property_name):
+            target_dict[property_name] = self.get_uri(ctx, source_obj)
+            return
+
         sub_model = self.get_submodel(ctx, source_obj)
         if sub_model is None:
-            target_dict[self._compute_property(ctx)] = None
+            target_dict[property_name] = None
         else:
-            target_dict[self._compute_property(ctx)] =\
-                self._resource_class(sub_model).get(ctx, EmptyParams())
+            sideload = ctx.included is not None and ctx.field_selection.sideloads(property_name)
+            with ctx.selecting_child(property_name):
+                uri = _sideload(ctx, self._resource_class, sub_model) if sideload else None
+                if uri is not None:
+                    target_dict[property_name] = uri
+                else:
+                    target_dict[property_name] = _get_sub_resource_dict(ctx, self._resource_class, sub_model)
+
+    def compile_outgoing(self, formatter):
+        """
+        Returns a function with the signature of handle_outgoing that has the
+        public property resolved for formatter.
+        """
+        if _overrides(self, SubObjectResourceField, 'handle_outgoing', '_compute_property'):
+            return self.handle_outgoing
+        if self._published_property is not None:
+            property_name = formatter.convert_to_public_property(self._published_property)
+        else:
+            property_name = formatter.convert_to_public_property(self._attribute)
+        return functools.partial(self._handle_outgoing, property_name=property_name)
 
     def validate_resource(self, ctx, key, resource, source_dict):
+        if self._collapsed and isinstance(source_dict, basestring):
+            return {}
         return validate(ctx, key + '.' + self.name, self._resource_class, source_dict)
 
 
@@ -567,6 +732,13 @@ class IterableField(Field):
             optional -- a callable which is passed the attribute and returns an
             iterable this fields exports
 
+        ``collapsed``
+            optional -- render the related objects as a list of their
+            resourceUri-s, unless the client names the field in the expand
+            parameter; resource_class must be addressable.  URIs are also
+            accepted on the way in, referencing objects without changing
+            them.  Defaults to False.
+
         .. code-block:: python
 
             RelatedManagerField('others', OtherResource)
@@ -584,7 +756,8 @@ class IterableField(Field):
                  read_only=False,
                  iterable_factory=None,
                  validator=None,
-                 permission=None):
+                 permission=None,
+                 collapsed=False):
         self._attribute = attribute
         self.init_resource_class(resource_class)
         self._published_property = published_property
@@ -592,6 +765,13 @@ class IterableField(Field):
         self._iterable_factory = iterable_factory
         self.validator = validator or []
         self.permission = permission
+        self._collapsed = collapsed
+
+    def is_collapsed(self, ctx):
+        """
+        True if the field renders as a list of URIs under ctx.field_selection.
+        """
+        return self._collapsed and not ctx.field_selection.expands(self._compute_property(ctx))
 
     def _compute_property(self, ctx):
         if self._published_property is not None:
@@ -612,6 +792,34 @@ class IterableField(Field):
             resource = self._resource_class(model)
         return resource
 
+    def _get_incoming_uri(self, model_dict):
+        # collapsed fields take bare URIs as well as dicts
+        if self._collapsed and isinstance(model_dict, basestring):
+            return model_dict
+        elif 'resourceUri' in model_dict:
+            return model_dict['resourceUri']
+        return None
+
+    def _get_resources(self, ctx, attribute, model_dicts):
+        """
+        Finds the existing resource (or None) for each of model_dicts.  All of
+        the resourceUri-s are resolved together with a single call to
+        ctx.resolve_resource_uris.
+        """
+        uris = [self._get_incoming_uri(model_dict) for model_dict in model_dicts]
+        resolved = iter(ctx.resolve_resource_uris(filter(None, uris)) if any(uris) else [])
+
+        resources = []
+        for model_dict, uri in zip(model_dicts, uris):
+            if uri is not None:
+                resource = next(resolved)
+                if resource is None and isinstance(model_dict, basestring):
+                    raise ValueError('invalid URI {0}: '.format(uri))
+                resources.append(resource)
+            else:
+                resources.append(self._get_resource(ctx, attribute, model_dict))
+        return resources
+
     def get_iterable(self, value):
         return value
 
@@ -634,6 +842,7 @@ class IterableField(Field):
         db_keys = set()
         db_models = {}
         for model in iterable:
+            ctx.identity_map.add(model)
             resource = self._resource_class(model)
             db_models[resource.key] = model
             db_keys.add(resource.key)
@@ -642,15 +851,17 @@ class IterableField(Field):
         new_put_data = []
         request_keys = set()
         request_models = {}
-        for model_dict in source_dict.get(self._compute_property(ctx), []):
-            resource = self._get_resource(ctx, attribute, model_dict)
+        model_dicts = source_dict.get(self._compute_property(ctx), [])
+        for model_dict, resource in zip(model_dicts, self._get_resources(ctx, attribute, model_dicts)):
             if resource:
                 request_models[resource.key] = resource.model
                 request_keys.add(resource.key)
                 # Check to see if the resource has already been saved in the DB
                 if resource.key in db_keys:
-                    with ctx.target(resource.model):
-                        resource.put(ctx, model_dict)
+                    # a bare URI references the object without changing it
+                    if not isinstance(model_dict, basestring):
+                        with ctx.target(resource.model):
+                            resource.put(ctx, model_dict)
                     # If the resource has been saved to the db and the model is
                     # a RelatedManager that is a through (existence of add attribute)
                     # must add it to the new model since it can create a model based
@@ -684,6 +895,7 @@ class IterableField(Field):
                 # RelatedManager
                 else:
                     obj.delete()
+                    ctx.identity_map.discard(obj)
 
         # Delay all the new creates untill after the deletes for unique
         # constraints again
@@ -706,6 +918,23 @@ class IterableField(Field):
                     attribute.through.objects.create(**through_params)
 
     def handle_outgoing(self, ctx, source_obj, target_dict):
+        self._handle_outgoing(ctx, source_obj, target_dict, self._compute_property(ctx))
+
+    def compile_outgoing(self, formatter):
+        """
+        Returns a function with the signature of handle_outgoing that has the
+        public property resolved for formatter.
+        """
+        if _overrides(self, IterableField, 'handle_outgoing', '_compute_property'):
+            return self.handle_outgoing
+        if self._published_property is not None:
+            property_name = formatter.convert_to_public_property(self._published_property)
+        else:
+            property_name = formatter.convert_to_public_property(self._attribute)
+        return functools.partial(self._handle_outgoing, property_name=property_name)
+
+    def _handle_outgoing(self, ctx, source_obj, target_dict, property_name):
+        collapsed = self._collapsed and not ctx.field_selection.expands(property_name)
         attrs = self._attribute.split('.')
         attribute = source_obj
 
@@ -723,14 +952,26 @@ class IterableField(Field):
         else:
             iterable = self.get_iterable(attribute)
 
-        for model in iterable:
-            model_resource = self._resource_class(model)
-            model_dict = model_resource.get(ctx, EmptyParams())
-            # only add '_id' if there is no 'resourceUri'
-            if 'resourceUri' not in model_dict:
-                model_dict['_id'] = model_resource.key
-            objects.append(model_dict)
-        target_dict[self._compute_property(ctx)] = objects
+        if collapsed:
+            target_dict[property_name] = [_get_uri(ctx, self._resource_class, model) for model in iterable]
+            return
+
+        sideload = ctx.included is not None and ctx.field_selection.sideloads(property_name)
+        with ctx.selecting_child(property_name):
+            for model in iterable:
+                uri = _sideload(ctx, self._resource_class, model) if sideload else None
+                if uri is not None:
+                    objects.append(uri)
+                    continue
+
+                model_dict = _get_sub_resource_dict(ctx, self._resource_class, model)
+                # only add '_id' if there is no 'resourceUri'
+                if 'resourceUri' not in model_dict:
+                    # copied, as the dict may be shared
+                    model_dict = model_dict.copy()
+                    model_dict['_id'] = self._resource_class(model).key
+                objects.append(model_dict)
+        target_dict[property_name] = objects
 
     def validate_resource(self, ctx, key, resource, source_dict_list):
         error_dict = {}
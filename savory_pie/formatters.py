@@ -7,11 +7,126 @@ except ImportError:
     import json
 import pytz
 import datetime
+import functools
 import re
 
 from dateutil import parser
 
 
+_API_VALUE_TYPES = frozenset([int, long, float, dict, list, bool, str, unicode, type(None)])
+
+# What json puts between the items of an array / object and between a key and
+# its value, so pre-encoded fragments can be joined exactly as json would.
+_ITEM_SEPARATOR = json.dumps([0, 0])[2:-2]
+_KEY_SEPARATOR = json.dumps({'a': 0})[4:-2]
+
+
+def _drops_encoding(method):
+    def modify(self, *args, **kwargs):
+        self.encoded = None
+        return method(self, *args, **kwargs)
+    modify.__name__ = method.__name__
+    return modify
+
+
+class EncodedDict(dict):
+    """
+    A dict that carries its own encoding, produced once by a formatter.
+    Formatters write the encoded text in place of the dict for as long as
+    that is what the dict holds.  Modifying the dict, or reading one of the
+    dicts or lists it holds (which may then be modified), drops the encoding,
+    which is None from then on; formatters then encode the dict afresh, its
+    keys in their original order followed by those added since.
+    """
+    def __init__(self, body_dict, encoded):
+        super(EncodedDict, self).__init__(body_dict)
+        self.encoded = encoded
+        self._key_order = list(body_dict)
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, (dict, list)):
+            self.encoded = None
+        return value
+
+    def __setitem__(self, key, value):
+        self.encoded = None
+        if not dict.__contains__(self, key):
+            self._key_order.append(key)
+        dict.__setitem__(self, key, value)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        keys = [key for key in self._key_order if dict.__contains__(self, key)]
+        if len(keys) < len(self):
+            known = set(keys)
+            keys.extend(key for key in dict.iterkeys(self) if key not in known)
+        return keys
+
+    def iterkeys(self):
+        return iter(self.keys())
+
+    __iter__ = iterkeys
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def iteritems(self):
+        return iter(self.items())
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def itervalues(self):
+        return iter(self.values())
+
+    def copy(self):
+        # the copy shares the values of the dict
+        self.encoded = None
+        copy = EncodedDict(self, None)
+        copy._key_order = self.keys()
+        return copy
+
+    __delitem__ = _drops_encoding(dict.__delitem__)
+    update = _drops_encoding(dict.update)
+    pop = _drops_encoding(dict.pop)
+    popitem = _drops_encoding(dict.popitem)
+    setdefault = _drops_encoding(dict.setdefault)
+    clear = _drops_encoding(dict.clear)
+    viewitems = _drops_encoding(dict.viewitems)
+    viewvalues = _drops_encoding(dict.viewvalues)
+
+
+class EncodedValue(object):
+    """
+    A value encoded by a formatter, written verbatim in its place, which
+    is never decoded -- a cached response, say.  sha1 is the hash of the
+    value when it was encoded (see helpers.encode_with_sha1), when known.
+    """
+    def __init__(self, encoded, sha1=None):
+        self.encoded = encoded
+        self.sha1 = sha1
+
+
+def _contains_encoded(value):
+    if isinstance(value, (EncodedDict, EncodedValue)):
+        return True
+    elif isinstance(value, dict):
+        # order doesn't matter here, so skip OrderedDict's slow iteration
+        items = dict.itervalues(value)
+    elif isinstance(value, (list, tuple)):
+        items = value
+    else:
+        return False
+
+    for item in items:
+        if isinstance(item, (dict, list, tuple, EncodedValue)) and _contains_encoded(item):
+            return True
+    return False
+
+
 class JSONFormatter(object):
     """
     Formatter reads and writes json while converting properties to and from
@@ -47,7 +162,48 @@ class JSONFormatter(object):
         return json.load(request)
 
     def write_to(self, body_dict, response):
-        json.dump(body_dict, response)
+        response.write(self.encode(body_dict))
+
+    def encode(self, value):
+        """
+        Returns value encoded as json.  EncodedValue-s and EncodedDict-s within
+        value are written verbatim rather than encoded again, unless the
+        EncodedDict-s have been modified.
+        """
+        if not _contains_encoded(value):
+            return json.dumps(value)
+        elif isinstance(value, EncodedValue) or (isinstance(value, EncodedDict) and value.encoded is not None):
+            return value.encoded
+        elif isinstance(value, dict):
+            return '{' + _ITEM_SEPARATOR.join(
+                _KEY_SEPARATOR.join([json.dumps(key if isinstance(key, basestring) else json.dumps(key)), self.encode(item)])
+                for key, item in value.iteritems()
+            ) + '}'
+        else:
+            return '[' + _ITEM_SEPARATOR.join(self.encode(item) for item in value) + ']'
+
+    def add_encoded_item(self, encoded_dict, key, value):
+        """
+        Returns encoded_dict, a dict encoded by this formatter, with key: value
+        appended -- exactly as if the dict had held it when it was encoded.
+        """
+        item = json.dumps(key) + _KEY_SEPARATOR + json.dumps(value)
+        if encoded_dict == '{}':
+            return '{' + item + '}'
+        return encoded_dict[:-1] + _ITEM_SEPARATOR + item + '}'
+
+    def stream_collection(self, objects, get_meta):
+        """
+        Generates the fragments of a collection response -- one per object
+        dict in objects, followed by the meta dict returned by get_meta, which
+        is only called once objects is exhausted.
+        """
+        yield '{"objects":['
+        separator = ''
+        for object_dict in objects:
+            yield separator + self.encode(object_dict)
+            separator = ','
+        yield '],"meta":' + json.dumps(get_meta()) + '}'
 
     # Not 100% happy with this API review pre 1.0
     def to_python_value(self, type_, api_value):
@@ -70,8 +226,43 @@ class JSONFormatter(object):
                 if not python_value.tzinfo:
                     python_value = python_value.replace(tzinfo=pytz.UTC)
                 return python_value.isoformat("T")
-            elif type(python_value) not in (int, long, float, dict, list,
-                                            bool, str, unicode, type(None)):
+            elif type(python_value) not in _API_VALUE_TYPES:
                 return str(python_value)
 
         return python_value
+
+    def compile_to_api_value(self, type_):
+        """
+        Returns a function of one argument equivalent to
+        functools.partial(self.to_api_value, type_), with the dispatch on type_
+        done once up front rather than on every value.
+        """
+        if type(self).to_api_value.__func__ is not JSONFormatter.to_api_value.__func__:
+            return functools.partial(self.to_api_value, type_)
+
+        if type_ is datetime.date:
+            def to_api_date(python_value):
+                if python_value is None:
+                    return None
+                return python_value.strftime("%Y-%m-%d")
+            return to_api_date
+
+        try:
+            is_datetime = issubclass(type_, datetime.datetime)
+        except TypeError:
+            return functools.partial(self.to_api_value, type_)
+
+        if is_datetime:
+            def to_api_datetime(python_value):
+                if python_value is None:
+                    return None
+                if not python_value.tzinfo:
+                    python_value = python_value.replace(tzinfo=pytz.UTC)
+                return python_value.isoformat("T")
+            return to_api_datetime
+
+        def to_api_primitive(python_value, api_value_types=_API_VALUE_TYPES):
+            if type(python_value) in api_value_types:
+                return python_value
+            return str(python_value)
+        return to_api_primitive
@@ -2,6 +2,7 @@ import hashlib
 
 from collections import OrderedDict
 from .errors import MethodNotAllowedError, PreConditionError
+from .formatters import EncodedDict, EncodedValue
 from .resources import EmptyParams, _ParamsImpl
 
 try:
@@ -24,6 +25,56 @@ def get_sha1(ctx, dct):
     return _hash_string(buf.getvalue())
 
 
+def encode_with_sha1(ctx, dct):
+    """
+    Returns dct encoded by ctx.formatter along with get_sha1(ctx, dct),
+    encoding dct just once unless it has magic variables to leave out.  An
+    EncodedValue is returned as it is, with its own hash.
+    """
+    if isinstance(dct, EncodedValue):
+        return dct.encoded, dct.sha1 if dct.sha1 is not None else _hash_string(dct.encoded)
+
+    encoded = ctx.formatter.encode(dct)
+    if any(key.startswith('$') for key in dct):
+        return encoded, get_sha1(ctx, dct)
+    return encoded, _hash_string(encoded)
+
+
+def add_sha1(ctx, dct):
+    """
+    Sets dct['$hash'] and returns dct as an EncodedDict, so the encoding the
+    hash was computed from is the one written to the response.
+    """
+    if '$hash' in dct:
+        dct['$hash'] = get_sha1(ctx, dct)
+        return dct
+
+    encoded, sha1 = encode_with_sha1(ctx, dct)
+    dct['$hash'] = sha1
+    return EncodedDict(dct, ctx.formatter.add_encoded_item(encoded, '$hash', sha1))
+
+
+def compute_etag(ctx, resource, params, *version):
+    """
+    Builds the ETag of a GET of resource with params from version -- values
+    that change whenever the data behind the response does.
+    """
+    params_items = sorted((key, params.get_list(key)) for key in params.keys())
+    return _hash_string(repr(
+        (type(resource).__name__, type(ctx.formatter).__name__, params_items) + version
+    ))
+
+
+def get_accept_header(ctx):
+    """
+    Returns the Accept header of the request of ctx, or '' if there is none.
+    """
+    meta = getattr(getattr(ctx, 'request', None), 'META', None)
+    if not isinstance(meta, dict):
+        return ''
+    return meta.get('HTTP_ACCEPT', '')
+
+
 def process_get_request(ctx, resource, get_params):
     if 'GET' in resource.allowed_methods:
         return resource.get(ctx, _ParamsImpl(get_params))
@@ -41,9 +92,12 @@ def process_post_request(ctx, resource, data):
 def process_put_request(ctx, resource, data, expected_hash=None):
     if 'PUT' in resource.allowed_methods:
         previous_content_dict = resource.get(ctx, EmptyParams())
+        # a resource provided ETag is what GET returned instead of the hash
+        get_etag = getattr(resource, 'get_etag', None)
+        previous_etag = get_etag(ctx, EmptyParams()) if expected_hash and get_etag else None
         content_dict = resource.put(ctx, data,)
         # validation errors take precedence over hash mismatch
-        if expected_hash and expected_hash != get_sha1(ctx, previous_content_dict):
+        if expected_hash and expected_hash not in (get_sha1(ctx, previous_content_dict), previous_etag):
             raise PreConditionError()
         else:
             return content_dict
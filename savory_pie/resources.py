@@ -92,9 +92,31 @@ class Resource(object):
         Optional method that is called during a DELETE request.
         """
 
+    def get_etag(self, ctx, params):
+        """
+        Optional hook that returns an ETag for a GET of this Resource with
+        params, computed without building the response -- e.g. from a version
+        column.  A GET whose If-None-Match matches it is answered with a 304
+        before get is ever called.
+
+        Returns None when no such tag is available, in which case the ETag is
+        a hash of the response.
+        """
+        return None
+
     def get_child_resource(self, ctx, path_fragment):
         return None
 
+    def get_child_resources(self, ctx, path_fragments):
+        """
+        Resolves several children at once.  Returns a list in the same order as
+        path_fragments, with None for each fragment that does not resolve.
+
+        Resources backed by a data store should override this to fetch all of
+        the children in a single round trip.
+        """
+        return [self.get_child_resource(ctx, path_fragment) for path_fragment in path_fragments]
+
 
 class APIResource(Resource):
     def __init__(self, resource_path=''):
@@ -8,6 +8,24 @@ from mock import Mock
 from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
 
 
+class Query(object):
+    def __init__(self):
+        self.where = []
+        self.order_by = []
+        self.default_ordering = True
+        self.alias_map = {}
+        self.extra_tables = ()
+
+    def __str__(self):
+        return 'WHERE {0} ORDER BY {1}'.format(self.where, self.order_by)
+
+    def sql_with_params(self):
+        return str(self), ()
+
+    def can_filter(self):
+        return True
+
+
 class QuerySet(Mock):
     def __init__(self, *elements):
         super(QuerySet, self).__init__()
@@ -19,6 +37,9 @@ class QuerySet(Mock):
         self._elements = elements
         self._selected = set()
         self._prefetched = set()
+        self.query = Query()
+        self.db = 'default'
+        self._result_cache = None
 
     def __iter__(self):
         return self.iterator()
@@ -31,7 +52,7 @@ class QuerySet(Mock):
 
     def __getitem__(self, key):
         if isinstance(key, slice):
-            return [self[x] for x in xrange(*key.indices(len(self)))]
+            return QuerySet(*[self[x] for x in xrange(*key.indices(len(self)))])
         elif isinstance(key, int):
             if key < 0:
                 key += len(self)
@@ -45,22 +66,46 @@ class QuerySet(Mock):
         return len(self._elements)
 
     def all(self):
-        return QuerySet(*self._elements)
+        queryset = QuerySet(*self._elements)
+        queryset.query.alias_map = self.query.alias_map
+        return queryset
 
     def distinct(self):
-
-        values = \
-            {
-                tuple(
-                    # remove the methods when comparing the uniqueness of the elements
-                    [i for i in obj.__dict__.items() if i[0] not in ('save', 'delete')]
-                ): obj for obj in self._elements
-            }.values()
-        return QuerySet(*values)
+        values = []
+        seen = set()
+        for obj in self._elements:
+            # remove the methods when comparing the uniqueness of the elements
+            key = tuple(sorted(i for i in obj.__dict__.items() if i[0] not in ('save', 'delete')))
+            if key not in seen:
+                seen.add(key)
+                values.append(obj)
+        # keep the order and the query, like a distinct ordered query would
+        queryset = QuerySet(*values)
+        queryset.query.where = list(self.query.where)
+        queryset.query.order_by = self.query.order_by
+        queryset.query.alias_map = self.query.alias_map
+        return queryset
 
     def count(self):
         return len(self._elements)
 
+    def values_list(self, *fields, **kwargs):
+        if kwargs.get('flat'):
+            return [getattr(obj, fields[0]) for obj in self._elements]
+        return [tuple(getattr(obj, field) for field in fields) for obj in self._elements]
+
+    def aggregate(self, **kwargs):
+        functions = {'Count': len, 'Max': max, 'Min': min, 'Sum': sum}
+        results = dict()
+        for alias, aggregate in kwargs.items():
+            attr = aggregate.source_expressions[0].name
+            values = [getattr(element, attr) for element in self._elements]
+            if values or aggregate.name == 'Count':
+                results[alias] = functions[aggregate.name](values)
+            else:
+                results[alias] = None
+        return results
+
     def exists(self):
         return len(self._elements)
 
@@ -69,9 +114,14 @@ class QuerySet(Mock):
             q = args[0]
         else:
             q = Q(*args, **kwargs)
-        queryset = QuerySet(*self._filter_q(q))
+        matches = self._filter_q(q)
+        # keep the order of the elements, like a filtered ordered query would
+        queryset = QuerySet(*[element for element in self._elements if element in matches])
         queryset._selected = set(queryset._selected)
         queryset._prefetched = set(queryset._prefetched)
+        queryset.query.where = self.query.where + [q]
+        queryset.query.order_by = self.query.order_by
+        queryset.query.alias_map = self.query.alias_map
         return queryset
 
     def order_by(self, *attributes):
@@ -91,7 +141,10 @@ class QuerySet(Mock):
             return 0
         elements = list(self._elements[:])
         elements.sort(compare)
-        return QuerySet(*elements)
+        queryset = QuerySet(*elements)
+        queryset.query.where = list(self.query.where)
+        queryset.query.order_by = list(attributes)
+        return queryset
 
     def get(self, **kwargs):
         filtered_elements = list(self._filter_elements(**kwargs))
@@ -137,6 +190,13 @@ class QuerySet(Mock):
 
         return queryset
 
+    def only(self, *fields):
+        queryset = QuerySet(*self._elements)
+        queryset._selected = set(self._selected)
+        queryset._prefetched = set(self._prefetched)
+        queryset._only = set(fields)
+        return queryset
+
     def _filter_q(self, q):
         if not q.children:
             return set(self._elements)
@@ -216,7 +276,7 @@ class Model(object):
         pass
 
     _models = []
-    _meta = Mock()
+    _meta = Mock(ordering=[], concrete_fields=[])
     objects = Manager()
     __metaclass__ = FieldsInitType
 
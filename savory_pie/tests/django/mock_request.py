@@ -4,8 +4,8 @@ from savory_pie.django import views
 from savory_pie.tests.mock_context import mock_context as _mock_context
 
 
-def savory_dispatch(root_resource, method, resource_path='', body=None, GET=None, POST=None):
-    view = views.api_view(root_resource)
+def savory_dispatch(root_resource, method, resource_path='', body=None, GET=None, POST=None, router=None):
+    view = views.api_view(root_resource, router=router)
     request = Request(
         method=method,
         resource_path=resource_path,
@@ -24,9 +24,11 @@ def savory_dispatch_batch(
         body=None,
         GET=None,
         POST=None,
-        base_regex=None
+        base_regex=None,
+        router=None,
+        max_workers=None
 ):
-    view = views.batch_api_view(root_resource, base_regex)
+    view = views.batch_api_view(root_resource, base_regex, router=router, max_workers=max_workers)
     request = Request(
         method=method,
         host=full_host,
@@ -72,10 +74,19 @@ class Request(object):
         return 'http://' + self.host + '/' + django_path
 
     def read(self):
+        return self._get_body_file().read()
+
+    def readline(self):
+        return self._get_body_file().readline()
+
+    def __iter__(self):
+        return iter(self.readline, '')
+
+    def _get_body_file(self):
         if not self.body_file:
             self.body_file = StringIO(self.body)
 
-        return self.body_file.read()
+        return self.body_file
 
 
 def mock_context(*args, **kwargs):
@@ -0,0 +1,150 @@
+import unittest
+
+from django.db.models.signals import post_save
+from mock import Mock, patch
+
+from savory_pie.django import caching, fields, resources
+from savory_pie.formatters import JSONFormatter
+from savory_pie.helpers import get_sha1
+from savory_pie.tests.django import mock_orm
+from savory_pie.tests.mock_context import mock_context
+
+
+class Store(mock_orm.Model):
+    pass
+
+
+class Order(mock_orm.Model):
+    pass
+
+
+class StoreResource(resources.ModelResource):
+    model_class = Store
+    fields = [
+        fields.AttributeField(attribute='name', type=str)
+    ]
+
+
+class OrderResource(resources.ModelResource):
+    model_class = Order
+    fields = [
+        fields.AttributeField(attribute='total', type=int),
+        fields.SubModelResourceField(attribute='store', resource_class=StoreResource),
+        fields.RelatedManagerField(attribute='returns', resource_class='savory_pie.tests.django.test_caching.OrderResource')
+    ]
+
+
+def user(*permissions):
+    return Mock(is_superuser=False, **{
+        'is_authenticated.return_value': True,
+        'get_all_permissions.return_value': set(permissions)
+    })
+
+
+class LRUResponseCacheTest(unittest.TestCase):
+    def test_get_set(self):
+        cache = caching.LRUResponseCache()
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', '{"a": 1}')
+        self.assertEqual(cache.get('a'), '{"a": 1}')
+        self.assertEqual(cache.stats(), {'hits': 0, 'misses': 0, 'entries': 1, 'size': 8})
+
+    def test_evicts_least_recently_used(self):
+        cache = caching.LRUResponseCache(max_size=10)
+        cache.set('a', 'aaaa')
+        cache.set('b', 'bbbb')
+        cache.get('a')
+        cache.set('c', 'cccc')
+
+        self.assertEqual(cache.get('a'), 'aaaa')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 'cccc')
+        self.assertEqual(cache.size, 8)
+
+    def test_too_large(self):
+        cache = caching.LRUResponseCache(max_size=3)
+        cache.set('a', 'aaaa')
+        self.assertIsNone(cache.get('a'))
+
+    def test_timeout(self):
+        cache = caching.LRUResponseCache(timeout=-1)
+        cache.set('a', 'aaaa')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size, 0)
+
+
+class DjangoResponseCacheTest(unittest.TestCase):
+    def test_get_set(self):
+        cache = caching.DjangoResponseCache()
+        key = caching.make_key('test', 'django-response-cache')
+        cache.set(key, '{}')
+        self.assertEqual(cache.get(key), '{}')
+
+
+class ProcessCachedGetRequestTest(unittest.TestCase):
+    def setUp(self):
+        self.resource = Mock(
+            spec=['get', 'allowed_methods', 'resource_path', 'response_cache', 'get_cache_models'],
+            allowed_methods={'GET'},
+            resource_path='orders',
+            response_cache=caching.LRUResponseCache()
+        )
+        self.resource.get.return_value = {'total': 3}
+        self.resource.get_cache_models.return_value = caching.get_reachable_models(OrderResource)
+
+    def get(self, query=None, user=None):
+        ctx = mock_context()
+        ctx.request = Mock(user=user)
+        ctx.streaming_response = False
+        return caching.process_cached_get_request(ctx, self.resource, query or {})
+
+    def test_hit(self):
+        content = self.get()
+        self.assertEqual(content.encoded, '{"total": 3}')
+        self.assertEqual(content.sha1, get_sha1(mock_context(), {'total': 3}))
+
+        # a hit is not decoded
+        with patch.object(JSONFormatter, 'read_from') as read_from:
+            cached_content = self.get()
+        self.assertFalse(read_from.called)
+        self.assertEqual((cached_content.encoded, cached_content.sha1), (content.encoded, content.sha1))
+        self.assertEqual(self.resource.get.call_count, 1)
+        self.assertEqual(self.resource.response_cache.stats()['hits'], 1)
+        self.assertEqual(self.resource.response_cache.stats()['misses'], 1)
+
+    def test_keyed_by_params_and_permissions(self):
+        self.get()
+        self.get(user=user('orders.view'))
+        self.get(user=user('orders.view', 'orders.change'))
+        self.get(user=user('orders.view'))
+        self.assertEqual(self.resource.get.call_count, 3)
+
+    def test_user_without_permissions(self):
+        class CustomUser(object):
+            def __init__(self, pk):
+                self.pk = pk
+
+            def is_authenticated(self):
+                return True
+
+        self.get(user=CustomUser(1))
+        self.get(user=CustomUser(1))
+        self.get(user=CustomUser(2))
+        self.assertEqual(self.resource.get.call_count, 2)
+
+    def test_invalidated_by_reachable_model(self):
+        self.get()
+        post_save.send(sender=Store, instance=Store())
+        self.get()
+        self.assertEqual(self.resource.get.call_count, 2)
+
+    def test_without_response_cache(self):
+        self.resource.response_cache = None
+        self.get()
+        self.get()
+        self.assertEqual(self.resource.get.call_count, 2)
+
+    def test_get_reachable_models(self):
+        self.assertEqual(caching.get_reachable_models(OrderResource), [Order, Store])
+        self.assertEqual(caching.get_embedded_models(StoreResource), [])
+        self.assertEqual(caching.get_embedded_models(OrderResource), [Store, Order])
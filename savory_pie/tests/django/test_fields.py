@@ -180,6 +180,37 @@ class AttributeFieldTest(unittest.TestCase):
 
         self.assertEqual(target_dict['fooBar'], 20)
 
+    def test_compiled_outgoing(self):
+        source_object = Mock()
+        source_object.foo.bar = 20
+        source_object.baz = None
+
+        ctx = mock_context()
+        target_dict = dict()
+        AttributeField(attribute='foo.bar', type=int, published_property='foo_bar')\
+            .compile_outgoing(ctx.formatter)(ctx, source_object, target_dict)
+        AttributeField(attribute='baz', type=int).compile_outgoing(ctx.formatter)(ctx, source_object, target_dict)
+
+        self.assertEqual(target_dict, {'fooBar': 20, 'baz': None})
+
+    def test_compiled_outgoing_none_in_path(self):
+        source_object = Mock()
+        source_object.foo = None
+
+        ctx = mock_context()
+        target_dict = dict()
+        AttributeField(attribute='foo.bar', type=int).compile_outgoing(ctx.formatter)(ctx, source_object, target_dict)
+
+        self.assertEqual(target_dict, {'bar': None})
+
+    def test_compile_outgoing_overridden(self):
+        class DoublingField(AttributeField):
+            def to_api_value(self, ctx, python_value):
+                return python_value * 2
+
+        field = DoublingField(attribute='foo', type=int)
+        self.assertEqual(field.compile_outgoing(mock_context().formatter), field.handle_outgoing)
+
     def test_prepare(self):
         field = AttributeField(attribute='foo.bar.baz', type=int)
 
@@ -297,6 +328,78 @@ class URIResourceFieldTest(unittest.TestCase):
 
         self.assertEqual(target_dict['foo'], 'uri://resources/2')
 
+    def test_outgoing_uri_only(self):
+
+        class Resource(ModelResource):
+            model_class = Mock()
+            parent_resource_path = 'resources'
+
+        field = URIResourceField(attribute='foo', resource_class=Resource, uri_only=True)
+
+        source_object = Mock(spec=['foo', 'foo_id'])
+        source_object.foo_id = 2
+
+        target_dict = dict()
+        field.handle_outgoing(mock_context(), source_object, target_dict)
+
+        self.assertEqual(target_dict['foo'], 'uri://resources/2')
+        self.assertIsInstance(source_object.foo, Mock)
+
+    def test_outgoing_uri_only_none(self):
+
+        class Resource(ModelResource):
+            model_class = Mock()
+            parent_resource_path = 'resources'
+
+        field = URIResourceField(attribute='foo', resource_class=Resource, uri_only=True)
+
+        source_object = Mock(spec=['foo', 'foo_id'], foo_id=None)
+
+        target_dict = dict()
+        field.handle_outgoing(mock_context(), source_object, target_dict)
+
+        self.assertIsNone(target_dict['foo'])
+
+    def test_prepare_uri_only(self):
+
+        class Resource(ModelResource):
+            model_class = Mock()
+            parent_resource_path = 'resources'
+
+        field = URIResourceField(attribute='foo', resource_class=Resource, uri_only=True)
+
+        related = Related()
+        field.prepare(mock_context(), related)
+
+        self.assertEqual(related._select, set())
+        self.assertEqual(related._prefetch, set())
+
+    def test_uri_only_top_level(self):
+
+        class Resource(ModelResource):
+            model_class = Mock()
+            parent_resource_path = 'resources'
+
+        with self.assertRaises(SavoryPieError):
+            URIResourceField(attribute='foo.bar', resource_class=Resource, uri_only=True)
+
+    def test_uri_only_needs_pk_published_key(self):
+
+        class Resource(ModelResource):
+            model_class = Mock()
+            parent_resource_path = 'resources'
+            published_key = ('slug', str)
+
+        field = URIResourceField(attribute='foo', resource_class=Resource, uri_only=True)
+
+        source_object = Mock(spec=['foo', 'foo_id'])
+        source_object.foo = mock_orm.Model(pk=2, slug='two')
+
+        target_dict = dict()
+        field.handle_outgoing(mock_context(), source_object, target_dict)
+
+        self.assertEqual(target_dict['foo'], 'uri://resources/two')
+
     def test_incoming(self):
 
         class Resource(ModelResource):
@@ -1262,6 +1365,34 @@ class URIListResourceFieldTestCase(unittest.TestCase):
         related_manager.remove.assert_called_with()
         related_manager.add.assert_called_with()
 
+    def test_incoming_resolves_uris_together(self):
+        class MockResource(ModelResource):
+            model_class = mock_orm.Model
+            fields = [
+                AttributeField(attribute='bar', type=int),
+            ]
+
+        field = URIListResourceField(attribute='foos', resource_class=MockResource)
+
+        source_dict = {
+            'foos': ['uri://resources/1', 'uri://resources/2']
+        }
+
+        target_object = mock_orm.Mock()
+        related_manager = mock_orm.Manager()
+        related_manager.all = Mock(return_value=mock_orm.QuerySet())
+        target_object.foos = related_manager
+
+        ctx = mock_context()
+        ctx.resolve_resource_uri = Mock()
+        ctx.resolve_resource_uris = Mock(return_value=[MockResource(mock_orm.Model(pk=1)), None])
+
+        with self.assertRaises(SavoryPieError):
+            field.handle_incoming(ctx, source_dict, target_object)
+
+        ctx.resolve_resource_uris.assert_called_once_with(['uri://resources/1', 'uri://resources/2'])
+        self.assertFalse(ctx.resolve_resource_uri.called)
+
     def test_outgoing(self):
         class MockResource(ModelResource):
             model_class = mock_orm.Model
@@ -1289,6 +1420,58 @@ class URIListResourceFieldTestCase(unittest.TestCase):
 
         self.assertEqual(['uri://resources/1', 'uri://resources/2'], target_dict['foos'])
 
+    def test_outgoing_uri_only(self):
+        class MockResource(ModelResource):
+            model_class = mock_orm.Model
+            parent_resource_path = 'resources'
+
+        field = URIListResourceField(attribute='foos', resource_class=MockResource, uri_only=True)
+
+        queryset = mock_orm.QuerySet(mock_orm.Model(pk=1), mock_orm.Model(pk=2))
+        queryset.values_list = Mock(return_value=[1, 2])
+        source_object = mock_orm.Model()
+        source_object.foos = mock_orm.Manager()
+        source_object.foos.all = Mock(return_value=queryset)
+
+        target_dict = {}
+        field.handle_outgoing(mock_context(), source_object, target_dict)
+
+        queryset.values_list.assert_called_with('pk', flat=True)
+        self.assertEqual(['uri://resources/1', 'uri://resources/2'], target_dict['foos'])
+
+    def test_outgoing_uri_only_prefetched(self):
+        class MockResource(ModelResource):
+            model_class = mock_orm.Model
+            parent_resource_path = 'resources'
+
+        field = URIListResourceField(attribute='foos', resource_class=MockResource, uri_only=True)
+
+        queryset = mock_orm.QuerySet(mock_orm.Model(pk=1), mock_orm.Model(pk=2))
+        queryset._result_cache = list(queryset)
+        queryset.values_list = Mock()
+        source_object = mock_orm.Model()
+        source_object.foos = mock_orm.Manager()
+        source_object.foos.all = Mock(return_value=queryset)
+
+        target_dict = {}
+        field.handle_outgoing(mock_context(), source_object, target_dict)
+
+        self.assertFalse(queryset.values_list.called)
+        self.assertEqual(['uri://resources/1', 'uri://resources/2'], target_dict['foos'])
+
+    def test_prepare_uri_only_dotted(self):
+        class MockResource(ModelResource):
+            model_class = mock_orm.Model
+            parent_resource_path = 'resources'
+
+        field = URIListResourceField(attribute='bar.foos', resource_class=MockResource, uri_only=True)
+
+        related = Related()
+        field.prepare(mock_context(), related)
+
+        self.assertEqual(related._select, {'bar'})
+        self.assertEqual(related._prefetch, {'bar__foos'})
+
 
 class StubModel(object):
     objects = None
@@ -11,14 +11,20 @@ import unittest
 
 from django.contrib.auth.models import User as DjangoUser
 from django.http import QueryDict
-from savory_pie.django import resources, fields, views
+from django.db.models.signals import post_delete, post_init, post_save
+from django.test.utils import CaptureQueriesContext
+from savory_pie.context import FieldSelection
+from savory_pie.django import caching, resources, fields, views
 from savory_pie.django.filters import ParameterizedFilter
+from savory_pie.django.validators import StringFieldMaxLengthValidator, UniqueTogetherValidator, ValidationError
 from savory_pie.tests.django import user_resource_schema, mock_orm, date_str
+from savory_pie.tests.django.mock_request import savory_dispatch
 from savory_pie.tests.mock_context import mock_context
-from savory_pie.resources import EmptyParams, _ParamsImpl
+from savory_pie.resources import APIResource, EmptyParams, _ParamsImpl
 from savory_pie.errors import SavoryPieError
 from savory_pie import formatters
 import django.core.exceptions
+import django.db
 
 
 class ResourceTest(unittest.TestCase):
@@ -131,6 +137,56 @@ class ModelResourceTest(unittest.TestCase):
             'resourceUri': 'uri://users/1'
         })
 
+    def test_get_reuses_outgoing_plan(self):
+        class PlannedUserResource(resources.ModelResource):
+            parent_resource_path = 'users'
+            model_class = User
+            fields = [
+                fields.AttributeField(attribute='name', type=str),
+            ]
+
+        ctx = mock_context()
+        plan = PlannedUserResource.get_outgoing_plan(ctx.formatter)
+        self.assertIs(plan, PlannedUserResource.get_outgoing_plan(ctx.formatter))
+
+        dct = PlannedUserResource(User(pk=1, name='Bob')).get(ctx, EmptyParams())
+        self.assertEqual(dct, {'name': 'Bob', 'resourceUri': 'uri://users/1'})
+
+        PlannedUserResource.fields = PlannedUserResource.fields + [fields.AttributeField(attribute='age', type=int)]
+        dct = PlannedUserResource(User(pk=1, name='Bob', age=20)).get(ctx, EmptyParams())
+        self.assertEqual(dct, {'name': 'Bob', 'age': 20, 'resourceUri': 'uri://users/1'})
+
+    def test_get_with_instance_fields(self):
+        resource = AddressableUserResource(User(pk=1, name='Bob', age=20))
+        resource.fields = [fields.AttributeField(attribute='name', type=str)]
+
+        dct = resource.get(mock_context(), EmptyParams())
+        self.assertEqual(dct, {'name': 'Bob', 'resourceUri': 'uri://users/1'})
+
+    def test_get_without_to_many_joins_is_not_distinct(self):
+        queryset = mock_orm.QuerySet(User(pk=1, name='Alice', age=31))
+        queryset.query.alias_map = {'user': Mock(join_field=Mock(one_to_many=False, many_to_many=False))}
+        resource = AddressableUserQuerySetResource(queryset)
+
+        with patch.object(mock_orm.QuerySet, 'distinct') as distinct:
+            data = resource.get(mock_context(), EmptyParams())
+        self.assertFalse(distinct.called)
+        self.assertEqual(data['meta']['count'], 1)
+
+    def test_etag(self):
+        class VersionedUserResource(AddressableUserResource):
+            etag_attribute = 'version'
+
+        ctx = mock_context()
+        user = User(pk=1, name='Bob', version=1)
+        self.assertIsNone(AddressableUserResource(user).get_etag(ctx, EmptyParams()))
+
+        etag = VersionedUserResource(user).get_etag(ctx, EmptyParams())
+        self.assertEqual(etag, VersionedUserResource(user).get_etag(ctx, EmptyParams()))
+
+        user.version = 2
+        self.assertNotEqual(etag, VersionedUserResource(user).get_etag(ctx, EmptyParams()))
+
     def test_put(self):
         user = User()
 
@@ -243,7 +299,8 @@ class ModelResourceTest(unittest.TestCase):
 
         self.assertEqual(data['meta'], {
             'resourceUri': 'uri://users',
-            'count': 2
+            'count': 2,
+            'countStrategy': 'exact'
         })
 
         result = data['objects']
@@ -338,6 +395,26 @@ class ModelResourceTest(unittest.TestCase):
 
         self.assertTrue(user.delete.called)
 
+    def test_resource_path_template(self):
+        self.assertEqual(AddressableUserResource.get_resource_path_template(), 'users/{0}')
+        self.assertEqual(
+            AddressableUserResource.get_resource_path_template().format(5),
+            AddressableUserResource(User(pk=5)).resource_path
+        )
+
+    def test_resource_path_template_unavailable(self):
+        class SlugUserResource(AddressableUserResource):
+            published_key = ('name', str)
+
+        class CustomPathUserResource(AddressableUserResource):
+            @property
+            def resource_path(self):
+                return 'people/' + self.key
+
+        self.assertIsNone(UnaddressableUserResource.get_resource_path_template())
+        self.assertIsNone(SlugUserResource.get_resource_path_template())
+        self.assertIsNone(CustomPathUserResource.get_resource_path_template())
+
     def test_get_by_source_dict(self):
         source_dict = {
             'name': 'Bob',
@@ -440,7 +517,8 @@ class QuerySetResourceTest(unittest.TestCase):
 
         self.assertEqual(data['meta'], {
             'resourceUri': 'uri://users',
-            'count': 2
+            'count': 2,
+            'countStrategy': 'exact'
         })
 
         self.assertEqual(len(data['objects']), 2)
@@ -497,27 +575,341 @@ class QuerySetResourceTest(unittest.TestCase):
         self.assertEqual(data, None)
 
     def test_get_distinct(self):
-        resource = AddressableUserQuerySetResource(mock_orm.QuerySet(
+        queryset = mock_orm.QuerySet(
             User(pk=1, name='Alice', age=31),
             User(pk=1, name='Alice', age=31)
-        ))
+        )
+        # as if joined through a reverse ForeignKey
+        queryset.query.alias_map = {'user': Mock(join_field=Mock(one_to_many=True, many_to_many=False))}
+        resource = AddressableUserQuerySetResource(queryset)
         data = resource.get(mock_context(), EmptyParams())
         self.assertEqual(data['meta'], {
             'resourceUri': 'uri://users',
-            'count': 1
+            'count': 1,
+            'countStrategy': 'exact'
         })
 
         self.assertEqual(map(self.remove_hash, data['objects']), [
             {'resourceUri': 'uri://users/1', 'name': 'Alice', 'age': 31},
         ])
 
+    def test_get_distinct_filters_once(self):
+        queryset = mock_orm.QuerySet(
+            User(pk=1, name='Alice', age=31),
+            User(pk=1, name='Alice', age=31)
+        )
+        queryset.query.alias_map = {'user': Mock(join_field=Mock(one_to_many=True, many_to_many=False))}
+        name_filter = Mock(filter=Mock(side_effect=lambda ctx, params, queryset: queryset))
+        resource = AddressableUserQuerySetResource(queryset)
+        resource.filters = [name_filter]
+
+        filtered_queryset = resource.get_filtered_queryset(mock_context(), EmptyParams())
+        self.assertEqual(len(filtered_queryset), 1)
+        self.assertEqual(name_filter.filter.call_count, 1)
+
+    def test_etag(self):
+        class VersionedUserResource(AddressableUserResource):
+            etag_attribute = 'version'
+
+        class VersionedUserQuerySetResource(resources.QuerySetResource):
+            resource_class = VersionedUserResource
+
+        ctx = mock_context()
+        users = [User(pk=1, name='Alice', version=3), User(pk=2, name='Bob', version=5)]
+        self.assertIsNone(AddressableUserQuerySetResource(mock_orm.QuerySet(*users)).get_etag(ctx, EmptyParams()))
+
+        etag = VersionedUserQuerySetResource(mock_orm.QuerySet(*users)).get_etag(ctx, EmptyParams())
+        self.assertEqual(etag, VersionedUserQuerySetResource(mock_orm.QuerySet(*users)).get_etag(ctx, EmptyParams()))
+
+        # a newer version, a removed model, and different params all change the tag
+        users[0].version = 6
+        etags = {etag, VersionedUserQuerySetResource(mock_orm.QuerySet(*users)).get_etag(ctx, EmptyParams())}
+        etags.add(VersionedUserQuerySetResource(mock_orm.QuerySet(*users[:1])).get_etag(ctx, EmptyParams()))
+        etags.add(VersionedUserQuerySetResource(mock_orm.QuerySet(*users)).get_etag(
+            ctx, _ParamsImpl(QueryDict('page=1'))
+        ))
+        self.assertEqual(len(etags), 4)
+
+    def test_etag_uncounted(self):
+        class VersionedUserResource(AddressableUserResource):
+            etag_attribute = 'version'
+
+        class UncountedUserQuerySetResource(resources.QuerySetResource):
+            resource_class = VersionedUserResource
+            count_strategy = 'none'
+
+        caching.cache.clear()
+        ctx = mock_context()
+        users = [User(pk=1, name='Alice', version=3), User(pk=2, name='Bob', version=5)]
+        with patch.object(mock_orm.QuerySet, 'aggregate', autospec=True, side_effect=mock_orm.QuerySet.aggregate) as aggregate:
+            etag = UncountedUserQuerySetResource(mock_orm.QuerySet(*users)).get_etag(ctx, EmptyParams())
+        self.assertEqual(aggregate.call_args[1].keys(), ['version'])
+
+        # a delete shows in the model's generation instead of a count
+        post_delete.send(sender=User, instance=users.pop(0))
+        self.assertNotEqual(UncountedUserQuerySetResource(mock_orm.QuerySet(*users)).get_etag(ctx, EmptyParams()), etag)
+
+    def test_fragment_cache(self):
+        class VersionedUserResource(AddressableUserResource):
+            etag_attribute = 'version'
+
+        class FragmentUserQuerySetResource(resources.QuerySetResource):
+            resource_class = VersionedUserResource
+            fragment_cache = caching.LRUResponseCache()
+
+        ctx = mock_context()
+        ctx.request = Mock(user=None)
+        users = [
+            User(pk=1, name='Alice', age=31, version=1),
+            User(pk=2, name='Bob', age=20, version=1),
+            User(pk=3, name='Carol', age=45, version=1),
+        ]
+
+        resource = FragmentUserQuerySetResource(mock_orm.QuerySet(*users))
+        data = resource.get(ctx, EmptyParams())
+        self.assertEqual(resource.fragment_cache.stats()['misses'], 3)
+
+        users[1].name = 'Robert'
+        users[2].name = 'Caroline'
+        users[2].version = 2
+        with patch.object(resource, '_get_object', wraps=resource._get_object) as get_object:
+            cached_data = resource.get(ctx, EmptyParams())
+        self.assertEqual([call[0][1] for call in get_object.call_args_list], [users[2]])
+        self.assertEqual(resource.fragment_cache.stats(), {'hits': 2, 'misses': 4, 'entries': 4, 'size': resource.fragment_cache.size})
+
+        # the objects found are written as they were encoded
+        self.assertIsInstance(cached_data['objects'][0], formatters.EncodedValue)
+        cached_objects = json.loads(ctx.formatter.encode(cached_data))['objects']
+        self.assertEqual(cached_objects[:2], data['objects'][:2])
+        self.assertEqual(map(self.remove_hash, cached_objects), [
+            {'resourceUri': 'uri://users/1', 'name': 'Alice', 'age': 31},
+            {'resourceUri': 'uri://users/2', 'name': 'Bob', 'age': 20},
+            {'resourceUri': 'uri://users/3', 'name': 'Caroline', 'age': 45},
+        ])
+
+        # a different selection serializes the objects again
+        resource.get(ctx, _ParamsImpl(QueryDict('fields=name')))
+        self.assertEqual(resource.fragment_cache.stats()['misses'], 7)
+
+    def test_get_override_adds_keys(self):
+        class RankedUserQuerySetResource(AddressableUserQuerySetResource):
+            def get(self, ctx, params):
+                content_dict = super(RankedUserQuerySetResource, self).get(ctx, params)
+                for rank, obj in enumerate(content_dict['objects'], 1):
+                    obj['rank'] = rank
+                return content_dict
+
+        ctx = mock_context()
+        resource = RankedUserQuerySetResource(mock_orm.QuerySet(User(pk=1, name='Alice'), User(pk=2, name='Bob')))
+        data = json.loads(ctx.formatter.encode(resource.get(ctx, EmptyParams())))
+        self.assertEqual([(obj['name'], obj['rank']) for obj in data['objects']], [('Alice', 1), ('Bob', 2)])
+
+    def test_get_override_modifies_sub_resource(self):
+        class ManagedUserResource(AddressableUserResource):
+            fields = AddressableUserResource.fields + [
+                fields.SubModelResourceField(attribute='manager', resource_class=UnaddressableUserResource)
+            ]
+
+        class FlaggedUserQuerySetResource(resources.QuerySetResource):
+            resource_class = ManagedUserResource
+
+            def get(self, ctx, params):
+                content_dict = super(FlaggedUserQuerySetResource, self).get(ctx, params)
+                for obj in content_dict['objects']:
+                    obj['manager']['flagged'] = True
+                return content_dict
+
+        ctx = mock_context()
+        manager = User(pk=3, name='Carol', age=50)
+        resource = FlaggedUserQuerySetResource(mock_orm.QuerySet(User(pk=1, name='Alice', age=31, manager=manager)))
+        data = json.loads(ctx.formatter.encode(resource.get(ctx, EmptyParams())), object_pairs_hook=OrderedDict)
+        self.assertTrue(data['objects'][0]['manager']['flagged'])
+        self.assertEqual(list(data['objects'][0]), ['name', 'age', 'manager', 'resourceUri', '$hash'])
+
+    def test_cursor_pagination(self):
+        class CursorUserQuerySetResource(resources.QuerySetResource):
+            resource_class = AddressableUserResource
+            page_size = 2
+            cursor_pagination = True
+            filters = [ParameterizedFilter('minAge', 'age__gte', order_by=['-age'])]
+
+        users = [
+            User(pk=1, name='Alice', age=31),
+            User(pk=2, name='Bob', age=20),
+            User(pk=3, name='Carol', age=31),
+            User(pk=4, name='Dave', age=45),
+            User(pk=5, name='Erin', age=20),
+        ]
+
+        ctx = mock_context()
+
+        def get_page(query):
+            ctx.request = Mock(GET=QueryDict(query))
+            resource = CursorUserQuerySetResource(mock_orm.QuerySet(*users))
+            data = resource.get(ctx, _ParamsImpl(ctx.request.GET))
+            links = dict((key, data['meta'][key].split('?', 1)[1]) for key in ('prev', 'next') if key in data['meta'])
+            return [obj['name'] for obj in data['objects']], links, data['meta']
+
+        names, links, meta = get_page('minAge=0')
+        self.assertEqual(names, ['Dave', 'Alice'])
+        self.assertEqual(meta['count'], 5)
+        self.assertNotIn('prev', links)
+        self.assertNotIn('total_pages', meta)
+
+        names, links, meta = get_page(links['next'])
+        self.assertEqual(names, ['Carol', 'Bob'])
+        self.assertIn('minAge=0', links['next'])
+
+        # rows inserted before the cursor don't shift the following pages
+        users.append(User(pk=6, name='Frank', age=50))
+        names, last_links, meta = get_page(links['next'])
+        self.assertEqual(names, ['Erin'])
+        self.assertNotIn('next', last_links)
+
+        names, links, meta = get_page(links['prev'])
+        self.assertEqual(names, ['Dave', 'Alice'])
+        names, links, meta = get_page(links['prev'])
+        self.assertEqual(names, ['Frank'])
+        self.assertNotIn('prev', links)
+
+    def test_cursor_pagination_page_size(self):
+        class CursorUserQuerySetResource(resources.QuerySetResource):
+            resource_class = AddressableUserResource
+            page_size = 2
+            max_page_size = 3
+            cursor_pagination = True
+
+        resource = CursorUserQuerySetResource(mock_orm.QuerySet(*[User(pk=pk, name='', age=0) for pk in range(5)]))
+        ctx = mock_context()
+        ctx.request = Mock(GET=QueryDict(''))
+
+        for query, expected in [('', 2), ('pageSize=1', 1), ('pageSize=10', 3)]:
+            data = resource.get(ctx, _ParamsImpl(QueryDict(query)))
+            self.assertEqual(len(data['objects']), expected)
+
+    def test_cursor_pagination_invalid_cursor(self):
+        class CursorUserQuerySetResource(resources.QuerySetResource):
+            resource_class = AddressableUserResource
+            page_size = 2
+            cursor_pagination = True
+
+        resource = CursorUserQuerySetResource(mock_orm.QuerySet(User(pk=1, name='', age=0)))
+        with self.assertRaises(SavoryPieError):
+            resource.get(mock_context(), _ParamsImpl(QueryDict('after=garbage')))
+
+    def test_count_strategy_none(self):
+        class UncountedUserQuerySetResource(resources.QuerySetResource):
+            resource_class = AddressableUserResource
+            page_size = 2
+            count_strategy = 'none'
+            filters = [ParameterizedFilter('minAge', 'age__gte', order_by=['age'])]
+
+        queryset = mock_orm.QuerySet(*[User(pk=pk, name='', age=pk) for pk in range(1, 6)])
+        ctx = mock_context()
+        ctx.request = Mock(GET=QueryDict(''))
+
+        with patch.object(mock_orm.QuerySet, 'count') as count:
+            data = UncountedUserQuerySetResource(queryset).get(ctx, _ParamsImpl(QueryDict('minAge=0&page=1')))
+            self.assertEqual([obj['age'] for obj in data['objects']], [3, 4])
+            self.assertEqual(data['meta']['countStrategy'], 'none')
+            self.assertTrue(data['meta']['hasMore'])
+            self.assertIn('next', data['meta'])
+            self.assertIn('prev', data['meta'])
+            self.assertNotIn('count', data['meta'])
+            self.assertNotIn('total_pages', data['meta'])
+
+            data = UncountedUserQuerySetResource(queryset).get(ctx, _ParamsImpl(QueryDict('minAge=0&page=2')))
+            self.assertEqual([obj['age'] for obj in data['objects']], [5])
+            self.assertFalse(data['meta']['hasMore'])
+            self.assertNotIn('next', data['meta'])
+
+        self.assertFalse(count.called)
+
+    def test_count_strategy_cached(self):
+        class CachedCountUserQuerySetResource(resources.QuerySetResource):
+            resource_class = AddressableUserResource
+            count_strategy = 'cached'
+            filters = [ParameterizedFilter('minAge', 'age__gte')]
+
+        caching.cache.clear()
+        users = [User(pk=1, name='Alice', age=31), User(pk=2, name='Bob', age=20)]
+
+        def get_count(query):
+            resource = CachedCountUserQuerySetResource(mock_orm.QuerySet(*users))
+            meta = resource.get(mock_context(), _ParamsImpl(QueryDict(query)))['meta']
+            self.assertEqual(meta['countStrategy'], 'cached')
+            return meta['count']
+
+        with patch.object(mock_orm.QuerySet, 'count', autospec=True, side_effect=len) as count:
+            self.assertEqual(get_count(''), 2)
+            self.assertEqual(get_count(''), 2)
+            self.assertEqual(count.call_count, 1)
+
+            self.assertEqual(get_count('minAge=30'), 1)
+            self.assertEqual(count.call_count, 2)
+
+            users.append(User(pk=3, name='Carol', age=40))
+            post_save.send(sender=User, instance=users[-1], created=True)
+            self.assertEqual(get_count(''), 3)
+            self.assertEqual(count.call_count, 3)
+
+    def test_streaming_get(self):
+        resource = AddressableUserQuerySetResource(mock_orm.QuerySet(
+            User(pk=3, name='Carol', age=40),
+            User(pk=1, name='Alice', age=31),
+            User(pk=2, name='Bob', age=20)
+        ))
+        resource.streaming = True
+        resource.stream_chunk_size = 2
+
+        ctx = mock_context()
+        data = resource.get(ctx, EmptyParams())
+        self.assertTrue(ctx.streaming_response)
+
+        data = json.loads(''.join(data))
+        self.assertEqual(data['meta'], {
+            'resourceUri': 'uri://users',
+            'count': 3,
+            'countStrategy': 'exact'
+        })
+        self.assertEqual(map(self.remove_hash, data['objects']), [
+            {'resourceUri': 'uri://users/1', 'name': 'Alice', 'age': 31},
+            {'resourceUri': 'uri://users/2', 'name': 'Bob', 'age': 20},
+            {'resourceUri': 'uri://users/3', 'name': 'Carol', 'age': 40},
+        ])
+
+    def test_iter_chunks(self):
+        resource = ComplexUserResourceQuerySetResource()
+        resource.stream_chunk_size = 2
+        queryset = mock_orm.QuerySet(*[User(pk=pk) for pk in [5, 3, 1, 4, 2]])
+
+        chunks = list(resource.iter_chunks(mock_context(), queryset))
+
+        self.assertEqual([[user.pk for user in chunk] for chunk in chunks], [[1, 2], [3, 4], [5]])
+
+    def test_iter_chunks_prepares_each_chunk(self):
+        resource = ComplexUserResourceQuerySetResource()
+        resource.stream_chunk_size = 2
+        queryset = Mock(name='queryset')
+        queryset.order_by.return_value.__getitem__ = Mock(return_value='first')
+        queryset.order_by.return_value.filter.return_value.__getitem__ = Mock(return_value='rest')
+
+        with patch.object(resources.Related, 'prepare') as prepare:
+            prepare.side_effect = [[User(pk=1), User(pk=2)], [User(pk=3)]]
+            chunks = list(resource.iter_chunks(mock_context(), queryset))
+
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(prepare.call_args_list, [call('first'), call('rest')])
+        queryset.order_by.return_value.filter.assert_called_with(pk__gt=2)
+
     def test_empty_queryset(self):
         resource = AddressableUserQuerySetResource(mock_orm.QuerySet())
         data = resource.get(mock_context(), EmptyParams())
 
         self.assertEqual(data['meta'], {
             'resourceUri': 'uri://users',
-            'count': 0
+            'count': 0,
+            'countStrategy': 'exact'
         })
 
         self.assertEqual(data['objects'], [])
@@ -576,6 +968,74 @@ class QuerySetResourceTest(unittest.TestCase):
         model_resource = queryset_resource.get_child_resource(mock_context(), 999)
         self.assertIsNone(model_resource)
 
+    def test_get_child_resource_from_identity_map(self):
+        alice = User(pk=1, name='Alice', age=31)
+        queryset = mock_orm.QuerySet(alice)
+        queryset.get = Mock(wraps=queryset.get)
+
+        queryset_resource = AddressableUserQuerySetResource(queryset)
+        queryset_resource.prepare_queryset = Mock(return_value=queryset)
+        ctx = mock_context()
+
+        self.assertIs(queryset_resource.get_child_resource(ctx, '1').model, alice)
+        self.assertIs(queryset_resource.get_child_resource(ctx, '1').model, alice)
+        self.assertEqual(queryset.get.call_count, 1)
+
+    def test_get_child_resource_skips_models_loaded_elsewhere(self):
+        class AdultUserResource(AddressableUserResource):
+            @classmethod
+            def get_from_queryset(cls, queryset, path_fragment):
+                return queryset.get(pk=int(path_fragment), age__gt=30)
+
+        class AdultUserQuerySetResource(resources.QuerySetResource):
+            resource_class = AdultUserResource
+
+        ctx = mock_context()
+        ctx.identity_map.add(User(pk=2, name='Bob', age=20))
+
+        queryset_resource = AdultUserQuerySetResource(mock_orm.QuerySet(User(pk=2, name='Bob', age=20)))
+        self.assertIsNone(queryset_resource.get_child_resource(ctx, '2'))
+
+    def test_get_child_resource_filtered_queryset_skips_identity_map(self):
+        alice = User(pk=1, name='Alice', age=31)
+        stored_alice = User(pk=1, name='Alice', age=31)
+        queryset = mock_orm.QuerySet(stored_alice, User(pk=2, name='Bob', age=20)).filter(age__gt=30)
+
+        queryset_resource = AddressableUserQuerySetResource(queryset)
+        ctx = mock_context()
+        ctx.identity_map.add(alice)
+
+        model_resource = queryset_resource.get_child_resource(ctx, '1')
+        self.assertIs(model_resource.model, stored_alice)
+
+    def test_get_child_resource_adds_to_identity_map(self):
+        alice = User(pk=1, name='Alice', age=31)
+        queryset_resource = AddressableUserQuerySetResource(mock_orm.QuerySet(alice))
+        ctx = mock_context()
+
+        queryset_resource.get_child_resource(ctx, '1')
+        self.assertIs(ctx.identity_map.get(User, 1), alice)
+
+    def test_get_child_resources(self):
+        alice = User(pk=1, name='Alice', age=31)
+        bob = User(pk=2, name='Bob', age=20)
+        queryset = mock_orm.QuerySet(alice, bob)
+        queryset.filter = Mock(wraps=queryset.filter)
+
+        queryset_resource = AddressableUserQuerySetResource(queryset)
+        queryset_resource.prepare_queryset = Mock(return_value=queryset)
+
+        model_resources = queryset_resource.get_child_resources(mock_context(), ['2', '999', 'x', '1', 'schema'])
+
+        self.assertEqual(queryset.filter.call_count, 1)
+        self.assertEqual(sorted(queryset.filter.call_args[1]['pk__in']), [1, 2, 999])
+        self.assertEqual(model_resources[0].model, bob)
+        self.assertIsNone(model_resources[1])
+        self.assertIsNone(model_resources[2])
+        self.assertEqual(model_resources[3].model, alice)
+        self.assertEqual(model_resources[3].resource_path, 'users/1')
+        self.assertIsInstance(model_resources[4], resources.SchemaResource)
+
 
 class ResourcePrepareTest(unittest.TestCase):
     class TestResource(resources.ModelResource):
@@ -594,6 +1054,48 @@ class ResourcePrepareTest(unittest.TestCase):
             'domain'
         })
 
+    def test_prepare_only(self):
+        class ProjectedUserResource(UnaddressableUserResource):
+            project_columns = True
+
+        class TestResource(resources.ModelResource):
+            model_class = User
+            etag_attribute = 'updated'
+            project_columns = True
+            fields = [
+                fields.AttributeField(attribute='name', type=str),
+                fields.AttributeField(attribute='group.name', type=str),
+                fields.SubModelResourceField(attribute='manager', resource_class=ProjectedUserResource),
+                fields.RelatedManagerField(attribute='reports', resource_class=UnaddressableUserResource),
+                fields.URIResourceField(attribute='domain', resource_class=AddressableUserResource)
+            ]
+
+        related = TestResource.prepare(mock_context(), resources.Related())
+        self.assertEqual(related._only, {
+            'pk', 'updated', 'name', 'group__name', 'manager', 'manager__pk', 'manager__name', 'manager__age',
+            'domain'
+        })
+
+    def test_prepare_only_unknown_field(self):
+        class NoopField(object):
+            def handle_outgoing(self, ctx, source_obj, target_dict):
+                pass
+
+        class TestResource(resources.ModelResource):
+            model_class = User
+            fields = [
+                fields.AttributeField(attribute='name', type=str),
+                NoopField()
+            ]
+
+        related = TestResource.prepare(mock_context(), resources.Related())
+        self.assertIn('*', related._only)
+
+        TestResource.fields = TestResource.fields[:1]
+        TestResource.project_columns = False
+        related = TestResource.prepare(mock_context(), resources.Related())
+        self.assertIn('*', related._only)
+
     def test_prepare_optional(self):
         class NoopField(object):
             def handle_incoming(self, ctx, source_dict, target_obj):
@@ -617,13 +1119,922 @@ class ResourcePrepareTest(unittest.TestCase):
         Django will reset related selects when a filter is added
         """
         queryset = MagicMock()
+        queryset.all().filter().query = mock_orm.Query()
+        queryset.all().filter().model._meta.ordering = []
+        queryset.reset_mock()
         queryset_resource = ComplexUserResourceQuerySetResource(queryset)
 
         queryset_resource.get(mock_context(), EmptyParams())
-        calls = call.all().distinct().filter().select_related('manager').prefetch_related('reports').call_list()
+        calls = call.all().filter().select_related('manager').prefetch_related('reports').call_list()
         queryset.assert_has_calls(calls)
 
 
+class ManagedUserResource(resources.ModelResource):
+    parent_resource_path = 'users'
+    model_class = User
+
+    fields = [
+        fields.AttributeField(attribute='name', type=str),
+        fields.AttributeField(attribute='age', type=int),
+        fields.SubModelResourceField(attribute='manager', resource_class=UnaddressableUserResource)
+    ]
+
+
+class ManagedUserQuerySetResource(resources.QuerySetResource):
+    resource_class = ManagedUserResource
+
+
+class SparseFieldsetTest(unittest.TestCase):
+    def get_objects(self, query):
+        resource = ManagedUserQuerySetResource(mock_orm.QuerySet(
+            User(pk=1, name='Alice', age=31, manager=User(pk=2, name='Bob', age=50))
+        ))
+        data = resource.get(mock_context(), _ParamsImpl(QueryDict(query)))
+        return [dict((k, v) for k, v in obj.items() if k[:1] != '$') for obj in data['objects']]
+
+    def test_fields(self):
+        self.assertEqual(self.get_objects('fields=name'), [
+            {'resourceUri': 'uri://users/1', 'name': 'Alice'}
+        ])
+
+    def test_dotted_fields(self):
+        self.assertEqual(self.get_objects('fields=name,manager.age'), [
+            {'resourceUri': 'uri://users/1', 'name': 'Alice', 'manager': {'age': 50}}
+        ])
+
+    def test_exclude(self):
+        self.assertEqual(self.get_objects('exclude=age&exclude=manager.name'), [
+            {'resourceUri': 'uri://users/1', 'name': 'Alice', 'manager': {'age': 50}}
+        ])
+
+    def test_model_resource_get(self):
+        user = User(pk=1, name='Alice', age=31, manager=None)
+        data = ManagedUserResource(user).get(mock_context(), _ParamsImpl(QueryDict('exclude=manager')))
+        self.assertEqual(data, {'resourceUri': 'uri://users/1', 'name': 'Alice', 'age': 31})
+
+    def test_prepare_skips_unselected_fields(self):
+        ctx = mock_context()
+        ctx.field_selection = FieldSelection.from_params(_ParamsImpl(QueryDict('fields=name')))
+        related = ComplexUserResource.prepare(ctx, resources.Related())
+        self.assertEqual(related._select, set())
+        self.assertEqual(related._prefetch, set())
+
+        ctx.field_selection = FieldSelection.from_params(_ParamsImpl(QueryDict('fields=manager.name')))
+        related = ComplexUserResource.prepare(ctx, resources.Related())
+        self.assertEqual(related._select, {'manager'})
+        self.assertEqual(related._prefetch, set())
+
+    def test_get_skips_unselected_joins(self):
+        queryset = MagicMock()
+        queryset.all().filter().query = mock_orm.Query()
+        queryset.all().filter().model._meta.ordering = []
+        queryset.reset_mock()
+        queryset_resource = ComplexUserResourceQuerySetResource(queryset)
+
+        queryset_resource.get(mock_context(), _ParamsImpl(QueryDict('fields=reports')))
+        calls = call.all().filter().prefetch_related('reports').call_list()
+        queryset.assert_has_calls(calls)
+        self.assertFalse(queryset.all().filter().select_related.called)
+
+
+class LeadUserResource(resources.ModelResource):
+    parent_resource_path = 'users'
+    model_class = User
+
+    fields = [
+        fields.AttributeField(attribute='name', type=str),
+        fields.SubModelResourceField(attribute='manager', resource_class=AddressableUserResource)
+    ]
+
+
+class TeamUserResource(resources.ModelResource):
+    parent_resource_path = 'users'
+    model_class = User
+
+    fields = [
+        fields.AttributeField(attribute='name', type=str),
+        fields.SubModelResourceField(attribute='manager', resource_class=LeadUserResource),
+        fields.SubModelResourceField(attribute='mentor', resource_class=UnaddressableUserResource),
+        fields.RelatedManagerField(attribute='reports', resource_class=AddressableUserResource)
+    ]
+
+
+class TeamUserQuerySetResource(resources.QuerySetResource):
+    resource_class = TeamUserResource
+
+
+class SideloadTest(unittest.TestCase):
+    def setUp(self):
+        self.director = User(pk=1, name='Dana', age=60)
+        manager = User(pk=2, name='Bob', age=50, manager=self.director)
+        reports = mock_orm.Manager()
+        reports.all = Mock(return_value=mock_orm.QuerySet(User(pk=5, name='Erin', age=20)))
+        self.users = [
+            User(pk=3, name='Alice', manager=manager, mentor=self.director, reports=reports),
+            User(pk=4, name='Carol', manager=manager, mentor=None, reports=reports),
+        ]
+
+    def get(self, query):
+        resource = TeamUserQuerySetResource(mock_orm.QuerySet(*self.users))
+        return resource.get(mock_context(), _ParamsImpl(QueryDict(query)))
+
+    def remove_hash(self, dct):
+        return dict((k, v) for k, v in dct.items() if k[:1] != '$')
+
+    def test_sideload(self):
+        data = self.get('sideload=manager,reports')
+        self.assertEqual(map(self.remove_hash, data['objects']), [{
+            'resourceUri': 'uri://users/3',
+            'name': 'Alice',
+            'manager': 'uri://users/2',
+            'mentor': {'name': 'Dana', 'age': 60},
+            'reports': ['uri://users/5']
+        }, {
+            'resourceUri': 'uri://users/4',
+            'name': 'Carol',
+            'manager': 'uri://users/2',
+            'mentor': None,
+            'reports': ['uri://users/5']
+        }])
+        self.assertEqual(data['included'], {
+            'uri://users/2': {
+                'resourceUri': 'uri://users/2',
+                'name': 'Bob',
+                'manager': {'resourceUri': 'uri://users/1', 'name': 'Dana', 'age': 60}
+            },
+            'uri://users/5': {'resourceUri': 'uri://users/5', 'name': 'Erin', 'age': 20}
+        })
+
+    def test_nested_sideload(self):
+        data = self.get('sideload=manager.manager')
+        self.assertEqual(data['objects'][0]['manager'], {
+            'resourceUri': 'uri://users/2',
+            'name': 'Bob',
+            'manager': 'uri://users/1'
+        })
+        self.assertEqual(data['included'].keys(), ['uri://users/1'])
+
+    def test_unaddressable_is_embedded(self):
+        data = self.get('sideload=mentor')
+        self.assertEqual(data['objects'][0]['mentor'], {'name': 'Dana', 'age': 60})
+        self.assertEqual(data['included'], {})
+
+    def test_no_sideload(self):
+        self.assertNotIn('included', self.get('fields=name'))
+
+
+class CollapsedUserResource(resources.ModelResource):
+    parent_resource_path = 'users'
+    model_class = User
+
+    fields = [
+        fields.AttributeField(attribute='name', type=str),
+        fields.SubModelResourceField(attribute='manager', resource_class=LeadUserResource, collapsed=True),
+        fields.RelatedManagerField(attribute='reports', resource_class=AddressableUserResource, collapsed=True)
+    ]
+
+
+class CollapsedUserQuerySetResource(resources.QuerySetResource):
+    resource_class = CollapsedUserResource
+
+
+class CollapsedFieldTest(unittest.TestCase):
+    def setUp(self):
+        reports = mock_orm.Manager()
+        reports.all = Mock(return_value=mock_orm.QuerySet(User(pk=5, name='Erin', age=20)))
+        self.manager = User(pk=2, name='Bob', manager=None)
+        self.user = User(pk=3, name='Alice', manager=self.manager, reports=reports)
+
+    def get(self, query):
+        resource = CollapsedUserQuerySetResource(mock_orm.QuerySet(self.user))
+        data = resource.get(mock_context(), _ParamsImpl(QueryDict(query)))
+        return dict((k, v) for k, v in data['objects'][0].items() if k[:1] != '$')
+
+    def test_collapsed(self):
+        self.assertEqual(self.get(''), {
+            'resourceUri': 'uri://users/3',
+            'name': 'Alice',
+            'manager': 'uri://users/2',
+            'reports': ['uri://users/5']
+        })
+
+    def test_uri_from_foreign_key(self):
+        self.user.manager_id = 7
+        self.assertEqual(self.get('')['manager'], 'uri://users/7')
+
+    def test_expand(self):
+        self.assertEqual(self.get('expand=manager,reports'), {
+            'resourceUri': 'uri://users/3',
+            'name': 'Alice',
+            'manager': {'resourceUri': 'uri://users/2', 'name': 'Bob', 'manager': None},
+            'reports': [{'resourceUri': 'uri://users/5', 'name': 'Erin', 'age': 20}]
+        })
+
+    def test_prepare(self):
+        ctx = mock_context()
+        related = CollapsedUserResource.prepare(ctx, resources.Related())
+        self.assertEqual(related._select, set())
+        self.assertEqual(related._prefetch, {'reports'})
+
+        ctx.field_selection = FieldSelection.from_params(_ParamsImpl(QueryDict('expand=manager')))
+        related = CollapsedUserResource.prepare(ctx, resources.Related())
+        self.assertEqual(related._select, {'manager', 'manager__manager'})
+
+    def test_put_uri(self):
+        ctx = mock_context()
+        ctx.resolve_resource_uri = Mock(return_value=AddressableUserResource(self.manager))
+        user = User(reports=mock_orm.Manager())
+        user.reports.all = Mock(return_value=mock_orm.QuerySet())
+        user._meta.get_field().related.field.name = 'name'
+        CollapsedUserResource(user).put(ctx, {'name': 'Carol', 'manager': 'uri://users/2', 'reports': ['uri://users/2']})
+        ctx.resolve_resource_uri.assert_called_with('uri://users/2')
+        self.assertIs(user.manager, self.manager)
+        user.reports.add.assert_called_with(self.manager)
+
+
+class Company(django.db.models.Model):
+    name = django.db.models.CharField(max_length=20)
+
+
+class Employee(django.db.models.Model):
+    name = django.db.models.CharField(max_length=20)
+    age = django.db.models.IntegerField()
+    company = django.db.models.ForeignKey(Company, null=True)
+
+    @property
+    def initials(self):
+        return self.name[:1]
+
+
+class EmployeeResource(resources.ModelResource):
+    parent_resource_path = 'employees'
+    model_class = Employee
+
+    fields = [
+        fields.AttributeField(attribute='name', type=str),
+        fields.AttributeField(attribute='age', type=int),
+        fields.AttributeField(attribute='company.name', type=str, published_property='company_name')
+    ]
+
+
+class EmployeeQuerySetResource(resources.QuerySetResource):
+    resource_class = EmployeeResource
+
+
+class ModelEmployeeQuerySetResource(resources.QuerySetResource):
+    resource_class = EmployeeResource
+
+    def to_resource(self, model):
+        return super(ModelEmployeeQuerySetResource, self).to_resource(model)
+
+
+class ValuesPlanTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            django.setup()
+        except AttributeError:
+            pass
+
+        with django.db.connection.schema_editor() as editor:
+            editor.create_model(Company)
+            editor.create_model(Employee)
+
+        acme = Company.objects.create(name='Acme')
+        Employee.objects.create(name='Alice', age=31, company=acme)
+        Employee.objects.create(name='Bob', age=20, company=None)
+
+    @classmethod
+    def tearDownClass(cls):
+        with django.db.connection.schema_editor() as editor:
+            editor.delete_model(Employee)
+            editor.delete_model(Company)
+
+    def test_plan(self):
+        plan = EmployeeResource.get_values_plan(formatters.JSONFormatter())
+        self.assertEqual([(path, property_name) for path, property_name, _ in plan], [
+            ('name', 'name'), ('age', 'age'), ('company__name', 'companyName')
+        ])
+        self.assertIsNotNone(EmployeeQuerySetResource(Employee.objects.all()).get_values_plan(mock_context()))
+        self.assertIsNone(ModelEmployeeQuerySetResource(Employee.objects.all()).get_values_plan(mock_context()))
+
+    def test_plan_needs_columns(self):
+        class InitialsResource(resources.ModelResource):
+            model_class = Employee
+            fields = [
+                fields.AttributeField(attribute='initials', type=str)
+            ]
+
+        class CompanyResource(resources.ModelResource):
+            model_class = Employee
+            fields = [
+                fields.SubModelResourceField(attribute='company', resource_class=EmployeeResource)
+            ]
+
+        self.assertIsNone(InitialsResource.get_values_plan(formatters.JSONFormatter()))
+        self.assertIsNone(CompanyResource.get_values_plan(formatters.JSONFormatter()))
+
+    def test_get_matches_models(self):
+        for params in [EmptyParams(), _ParamsImpl(QueryDict('fields=name,companyName'))]:
+            ctx = mock_context()
+            resource = EmployeeQuerySetResource(Employee.objects.order_by('pk'))
+            loaded = []
+
+            def receiver(sender, instance, **kwargs):
+                loaded.append(instance)
+
+            post_init.connect(receiver, sender=Employee)
+            try:
+                data = resource.get(ctx, params)
+            finally:
+                post_init.disconnect(receiver, sender=Employee)
+            self.assertEqual(loaded, [])
+
+            model_data = ModelEmployeeQuerySetResource(Employee.objects.order_by('pk')).get(ctx, params)
+            self.assertEqual(data, model_data)
+
+        self.assertEqual(data['objects'][1], {
+            'name': 'Bob', 'companyName': None, 'resourceUri': 'uri://employees/2', '$hash': data['objects'][1]['$hash']
+        })
+
+    def test_table(self):
+        ctx = mock_context()
+        resource = EmployeeQuerySetResource(Employee.objects.order_by('pk'))
+        loaded = []
+
+        def receiver(sender, instance, **kwargs):
+            loaded.append(instance)
+
+        post_init.connect(receiver, sender=Employee)
+        try:
+            data = resource.get(ctx, _ParamsImpl(QueryDict('format=table')))
+        finally:
+            post_init.disconnect(receiver, sender=Employee)
+        self.assertEqual(loaded, [])
+
+        self.assertEqual(data['columns'], ['name', 'age', 'companyName', 'resourceUri'])
+        self.assertEqual([list(row) for row in data['rows']], [
+            ['Alice', 31, 'Acme', 'uri://employees/1'],
+            ['Bob', 20, None, 'uri://employees/2'],
+        ])
+        self.assertNotIn('objects', data)
+        self.assertEqual(data['meta']['count'], 2)
+
+        model_data = ModelEmployeeQuerySetResource(Employee.objects.order_by('pk')).get(
+            ctx, _ParamsImpl(QueryDict('format=table&fields=name,companyName'))
+        )
+        self.assertEqual(model_data['columns'], ['name', 'companyName', 'resourceUri'])
+        self.assertEqual(model_data['rows'], [
+            ['Alice', 'Acme', 'uri://employees/1'],
+            ['Bob', None, 'uri://employees/2'],
+        ])
+
+    def test_table_accept_header(self):
+        ctx = mock_context()
+        ctx.request = Mock(META={'HTTP_ACCEPT': EmployeeQuerySetResource.table_content_type})
+        resource = EmployeeQuerySetResource(Employee.objects.order_by('pk'))
+
+        data = resource.get(ctx, EmptyParams())
+        self.assertEqual(len(data['rows']), 2)
+
+        ctx.request.META = {}
+        self.assertIn('objects', resource.get(ctx, EmptyParams()))
+
+    def test_table_etag(self):
+        class VersionedEmployeeResource(EmployeeResource):
+            etag_attribute = 'age'
+
+        class VersionedEmployeeQuerySetResource(resources.QuerySetResource):
+            resource_class = VersionedEmployeeResource
+
+        ctx = mock_context()
+        resource = VersionedEmployeeQuerySetResource()
+        etag = resource.get_etag(ctx, EmptyParams())
+        self.assertNotEqual(resource.get_etag(ctx, _ParamsImpl(QueryDict('format=table'))), etag)
+
+        ctx.request = Mock(META={'HTTP_ACCEPT': resource.table_content_type})
+        self.assertNotEqual(resource.get_etag(ctx, EmptyParams()), etag)
+
+
+class Product(django.db.models.Model):
+    code = django.db.models.CharField(max_length=20, unique=True)
+    name = django.db.models.CharField(max_length=20)
+
+
+class ProductResource(resources.ModelResource):
+    parent_resource_path = 'products'
+    model_class = Product
+    published_key = ('code', str)
+
+    fields = [
+        fields.AttributeField(attribute='code', type=str),
+        fields.AttributeField(
+            attribute='name', type=str, validator=StringFieldMaxLengthValidator(5, error_message='too long')
+        ),
+    ]
+
+
+class ProductQuerySetResource(resources.QuerySetResource):
+    resource_class = ProductResource
+    bulk_create_chunk_size = 2
+
+
+class BulkCreateTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            django.setup()
+        except AttributeError:
+            pass
+
+        with django.db.connection.schema_editor() as editor:
+            editor.create_model(Product)
+            editor.create_model(Company)
+            editor.create_model(Employee)
+
+    @classmethod
+    def tearDownClass(cls):
+        with django.db.connection.schema_editor() as editor:
+            editor.delete_model(Employee)
+            editor.delete_model(Company)
+            editor.delete_model(Product)
+
+    def setUp(self):
+        Product.objects.all().delete()
+        Employee.objects.all().delete()
+
+    def post(self, resource, source_dicts):
+        with CaptureQueriesContext(django.db.connection) as queries:
+            new_resources = resource.post(mock_context(), source_dicts)
+        inserts = [query['sql'] for query in queries.captured_queries if 'INSERT INTO' in query['sql']]
+        return [new_resource.resource_path for new_resource in new_resources], len(inserts)
+
+    def test_bulk_create(self):
+        saved = []
+
+        def receiver(sender, instance, **kwargs):
+            saved.append(instance)
+
+        post_save.connect(receiver, sender=Product)
+        try:
+            paths, insert_count = self.post(ProductQuerySetResource(), [
+                {'code': 'a', 'name': 'Apple'}, {'code': 'b', 'name': 'Bean'}, {'code': 'c', 'name': 'Corn'}
+            ])
+        finally:
+            post_save.disconnect(receiver, sender=Product)
+
+        self.assertEqual(paths, ['products/a', 'products/b', 'products/c'])
+        # two chunks, no save
+        self.assertEqual(insert_count, 2)
+        self.assertEqual(saved, [])
+        self.assertEqual(list(Product.objects.order_by('code').values_list('name', flat=True)), ['Apple', 'Bean', 'Corn'])
+
+    def test_validated_as_a_set(self):
+        with self.assertRaises(ValidationError) as cm:
+            ProductQuerySetResource().post(mock_context(), [
+                {'code': 'a', 'name': 'Apple'}, {'code': 'b', 'name': 'Bananas'}, {'code': 'c', 'name': 'Cabbage'}
+            ])
+        self.assertEqual(cm.exception.errors, {
+            '1': {'ProductResource.name': ['too long']},
+            '2': {'ProductResource.name': ['too long']},
+        })
+        self.assertEqual(Product.objects.count(), 0)
+
+    def test_duplicates_in_set(self):
+        class UniqueProductResource(ProductResource):
+            validators = [UniqueTogetherValidator('code')]
+
+        class UniqueProductQuerySetResource(resources.QuerySetResource):
+            resource_class = UniqueProductResource
+
+        with self.assertRaises(ValidationError) as cm:
+            UniqueProductQuerySetResource().post(mock_context(), [
+                {'code': 'a', 'name': 'Apple'}, {'code': 'b', 'name': 'Bean'}, {'code': 'b', 'name': 'Beet'}
+            ])
+        self.assertEqual(cm.exception.errors, {'2': {'UniqueProductResource': ['This set of fields must be unique.']}})
+        self.assertEqual(Product.objects.count(), 0)
+
+    def test_invalid_field_data(self):
+        class NumberedProductResource(ProductResource):
+            fields = [
+                fields.AttributeField(attribute='code', type=str),
+                fields.AttributeField(attribute='name', type=int),
+            ]
+
+        class NumberedProductQuerySetResource(resources.QuerySetResource):
+            resource_class = NumberedProductResource
+
+        resource = NumberedProductQuerySetResource()
+        self.assertTrue(resource.can_bulk_create(mock_context(), NumberedProductResource.create_resource()))
+        with self.assertRaises(ValidationError) as cm:
+            resource.post(mock_context(), [
+                {'code': 'a', 'name': 1}, {'code': 'b', 'name': 'two'}, {'code': 'c', 'name': 3}
+            ])
+        self.assertEqual(list(cm.exception.errors), ['1'])
+        self.assertIn('invalidFieldData', cm.exception.errors['1'])
+        self.assertEqual(Product.objects.count(), 0)
+
+    def test_integrity_error(self):
+        # no validator checks that code is unique
+        with self.assertRaises(ValidationError) as cm:
+            ProductQuerySetResource().post(mock_context(), [{'code': 'b', 'name': 'Bean'}, {'code': 'b', 'name': 'Beet'}])
+        self.assertEqual(list(cm.exception.errors), ['databaseError'])
+        self.assertEqual(Product.objects.count(), 0)
+
+        response = savory_dispatch(
+            APIResource().register(ProductQuerySetResource()),
+            method='POST',
+            resource_path='products',
+            body=json.dumps([{'code': 'b', 'name': 'Bean'}, {'code': 'b', 'name': 'Beet'}])
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_falls_back_to_put(self):
+        class NameResource(EmployeeResource):
+            fields = EmployeeResource.fields[:2]
+
+        class NameQuerySetResource(resources.QuerySetResource):
+            resource_class = NameResource
+
+        # sqlite does not return the keys of bulk-created rows
+        resource = NameQuerySetResource()
+        self.assertFalse(resource.can_bulk_create(mock_context(), NameResource.create_resource()))
+
+        paths, insert_count = self.post(resource, [{'name': 'Alice', 'age': 31}, {'name': 'Bob', 'age': 20}])
+        alice, bob = Employee.objects.order_by('pk')
+        self.assertEqual(paths, ['employees/{0}'.format(alice.pk), 'employees/{0}'.format(bob.pk)])
+        self.assertEqual(insert_count, 2)
+
+    def test_post_view(self):
+        response = savory_dispatch(
+            APIResource().register(ProductQuerySetResource()),
+            method='POST',
+            resource_path='products',
+            body=json.dumps([{'code': 'a', 'name': 'Apple'}, {'code': 'b', 'name': 'Bean'}])
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.content), {
+            'resourceUris': ['http://localhost/api/products/a', 'http://localhost/api/products/b']
+        })
+
+
+class ImportProductQuerySetResource(resources.QuerySetResource):
+    resource_class = ProductResource
+    allow_import = True
+    import_chunk_size = 2
+    import_max_errors = 2
+
+
+class ImportTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            django.setup()
+        except AttributeError:
+            pass
+
+        with django.db.connection.schema_editor() as editor:
+            editor.create_model(Product)
+            editor.create_model(Company)
+            editor.create_model(Employee)
+
+    @classmethod
+    def tearDownClass(cls):
+        with django.db.connection.schema_editor() as editor:
+            editor.delete_model(Employee)
+            editor.delete_model(Company)
+            editor.delete_model(Product)
+
+    def setUp(self):
+        Product.objects.all().delete()
+        Employee.objects.all().delete()
+
+    def test_only_when_allowed(self):
+        ctx = mock_context()
+        self.assertIsNone(ProductQuerySetResource().get_child_resource(ctx, 'import'))
+        resource = ImportProductQuerySetResource().get_child_resource(ctx, 'import')
+        self.assertIsInstance(resource, resources.ImportResource)
+        self.assertEqual(resource.allowed_methods, {'POST'})
+
+    def test_import(self):
+        lines = [
+            '{"code": "a", "name": "Apple"}\n',
+            '{"code": "b", "name": "Bean"}\n',
+            '\n',
+            '{"code": "c", "name": "Corn"}\n',
+        ]
+        with CaptureQueriesContext(django.db.connection) as queries:
+            result = ImportProductQuerySetResource().get_child_resource(mock_context(), 'import').post(
+                mock_context(), iter(lines))
+
+        self.assertEqual(result, {'createdCount': 3, 'errorCount': 0, 'errors': {}})
+        self.assertEqual(list(Product.objects.order_by('code').values_list('name', flat=True)), ['Apple', 'Bean', 'Corn'])
+        # a transaction per chunk
+        self.assertEqual(len([query for query in queries.captured_queries if 'BEGIN' in query['sql']]), 2)
+
+    def test_line_errors(self):
+        lines = [
+            '{"code": "a", "name": "Apple"}',
+            'not json',
+            '{"code": "b", "name": "Bananas"}',
+            '{"code": "a", "name": "Again"}',
+            '[1, 2]',
+            '{"code": "c", "name": "Corn"}',
+        ]
+        result = ImportProductQuerySetResource().get_child_resource(mock_context(), 'import').post(
+            mock_context(), lines)
+
+        self.assertEqual(result['createdCount'], 2)
+        self.assertEqual(result['errorCount'], 4)
+        # only import_max_errors are reported
+        self.assertEqual(sorted(result['errors']), ['2', '3'])
+        self.assertIn('invalidJson', result['errors']['2'])
+        self.assertEqual(result['errors']['3'], {'ProductResource.name': ['too long']})
+        self.assertEqual(list(Product.objects.order_by('code').values_list('name', flat=True)), ['Apple', 'Corn'])
+
+    def test_invalid_chunk(self):
+        lines = [
+            '{"code": "a", "name": "Apple"}',
+            '{"code": "b", "name": "Bean"}',
+            '{"code": "c", "name": "Cabbage"}',
+            '{"code": "d", "name": "Dragonfruit"}',
+            '{"code": "e", "name": "Eggs"}',
+        ]
+        result = ImportProductQuerySetResource().get_child_resource(mock_context(), 'import').post(
+            mock_context(), lines)
+
+        # the second chunk has no valid line, the third is still imported
+        self.assertEqual(result['createdCount'], 3)
+        self.assertEqual(result['errorCount'], 2)
+        self.assertEqual(sorted(result['errors']), ['3', '4'])
+        self.assertEqual(list(Product.objects.order_by('code').values_list('name', flat=True)), ['Apple', 'Bean', 'Eggs'])
+
+    def test_duplicate_in_chunk(self):
+        Product.objects.create(code='a', name='Apple')
+        lines = ['{"code": "b", "name": "Bean"}', '{"code": "a", "name": "Again"}']
+        result = ImportProductQuerySetResource().get_child_resource(mock_context(), 'import').post(
+            mock_context(), lines)
+
+        self.assertEqual(result['createdCount'], 1)
+        self.assertEqual(list(result['errors']), ['2'])
+        self.assertEqual(list(Product.objects.order_by('code').values_list('name', flat=True)), ['Apple', 'Bean'])
+
+    def test_malformed_line(self):
+        class CompanyResource(resources.ModelResource):
+            parent_resource_path = 'companies'
+            model_class = Company
+
+        class CompanyURIResource(EmployeeResource):
+            fields = EmployeeResource.fields[:2] + [
+                fields.URIResourceField(attribute='company', resource_class=CompanyResource)
+            ]
+
+        class ImportCompanyURIQuerySetResource(resources.QuerySetResource):
+            resource_class = CompanyURIResource
+            allow_import = True
+            import_chunk_size = 2
+
+        lines = [
+            '{"name": "Alice", "age": 31, "company": null}',
+            '{"name": "Bob", "age": 20, "company": "uri://companies/1"}',
+            '{"name": "Carol", "age": 40, "company": null}',
+        ]
+        ctx = mock_context()
+        ctx.resolve_resource_uri = lambda uri: None
+        result = ImportCompanyURIQuerySetResource().get_child_resource(ctx, 'import').post(ctx, lines)
+
+        self.assertEqual(result['createdCount'], 2)
+        self.assertEqual(result['errorCount'], 1)
+        self.assertEqual(list(result['errors']), ['2'])
+        self.assertIn('invalidFieldData', result['errors']['2'])
+        self.assertEqual(list(Employee.objects.order_by('name').values_list('name', flat=True)), ['Alice', 'Carol'])
+
+    def test_post_view(self):
+        response = savory_dispatch(
+            APIResource().register(ImportProductQuerySetResource()),
+            method='POST',
+            resource_path='products/import',
+            body='{"code": "a", "name": "Apple"}\n{"code": "b", "name": "Bean"}\n'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {'createdCount': 2, 'errorCount': 0, 'errors': {}})
+        self.assertEqual(Product.objects.count(), 2)
+
+
+class Store(django.db.models.Model):
+    name = django.db.models.CharField(max_length=20)
+    notes = django.db.models.CharField(max_length=100, default='')
+
+
+class Shelf(django.db.models.Model):
+    label = django.db.models.CharField(max_length=20)
+    position = django.db.models.IntegerField(default=0)
+    store = django.db.models.ForeignKey(Store)
+
+
+class StoreResource(resources.ModelResource):
+    parent_resource_path = 'stores'
+    model_class = Store
+    project_columns = True
+
+    fields = [
+        fields.AttributeField(attribute='name', type=str)
+    ]
+
+
+class StoreQuerySetResource(resources.QuerySetResource):
+    resource_class = StoreResource
+
+
+class ShelfResource(resources.ModelResource):
+    parent_resource_path = 'shelves'
+    model_class = Shelf
+    project_columns = True
+
+    fields = [
+        fields.AttributeField(attribute='label', type=str),
+        fields.SubModelResourceField(attribute='store', resource_class=StoreResource)
+    ]
+
+
+class ShelfQuerySetResource(resources.QuerySetResource):
+    resource_class = ShelfResource
+
+
+class ProjectionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            django.setup()
+        except AttributeError:
+            pass
+
+        with django.db.connection.schema_editor() as editor:
+            editor.create_model(Store)
+            editor.create_model(Shelf)
+
+    @classmethod
+    def tearDownClass(cls):
+        with django.db.connection.schema_editor() as editor:
+            editor.delete_model(Shelf)
+            editor.delete_model(Store)
+
+    def setUp(self):
+        Shelf.objects.all().delete()
+        Store.objects.all().delete()
+        self.store = Store.objects.create(name='Main', notes='open late')
+        self.shelf = Shelf.objects.create(label='Top', position=3, store=self.store)
+        self.api_resource = APIResource().register(StoreQuerySetResource()).register(ShelfQuerySetResource())
+
+    def dispatch(self, method, resource_path, body=None):
+        with CaptureQueriesContext(django.db.connection) as queries:
+            response = savory_dispatch(self.api_resource, method=method, resource_path=resource_path, body=body)
+        return response, [query['sql'] for query in queries.captured_queries if 'SELECT' in query['sql']]
+
+    def test_get_projected(self):
+        response, selects = self.dispatch('GET', 'shelves/{0}'.format(self.shelf.pk))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['store']['name'], 'Main')
+        self.assertNotIn('position', selects[0])
+        self.assertNotIn('notes', selects[0])
+
+        response, selects = self.dispatch('GET', 'shelves')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('notes', selects[-1])
+
+    def test_get_not_projected_by_default(self):
+        class PositionShelfResource(resources.ModelResource):
+            parent_resource_path = 'shelves'
+            model_class = Shelf
+            fields = [
+                fields.AttributeField(attribute='label', type=str)
+            ]
+
+            def get_etag(self, ctx, params):
+                # reads a column no field declares
+                return str(self.model.position)
+
+        class PositionShelfQuerySetResource(resources.QuerySetResource):
+            resource_class = PositionShelfResource
+
+        self.api_resource = APIResource().register(PositionShelfQuerySetResource())
+        response, selects = self.dispatch('GET', 'shelves/{0}'.format(self.shelf.pk))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '3')
+        self.assertEqual(len(selects), 1)
+
+    def test_get_uri_only_through_related(self):
+        class NeighbourShelfResource(ShelfResource):
+            fields = [
+                fields.AttributeField(attribute='label', type=str),
+                fields.URIListResourceField(attribute='store.shelf_set', resource_class=ShelfResource,
+                                            published_property='neighbours', uri_only=True),
+            ]
+
+        class NeighbourShelfQuerySetResource(resources.QuerySetResource):
+            resource_class = NeighbourShelfResource
+
+        store = Store.objects.create(name='Annex')
+        shelves = [Shelf.objects.create(label=label, store=store) for label in 'abc']
+        self.api_resource = APIResource().register(NeighbourShelfQuerySetResource())
+
+        response, selects = self.dispatch('GET', 'shelves')
+        self.assertEqual(response.status_code, 200)
+        objects = json.loads(response.content)['objects']
+        self.assertEqual(objects[-1]['neighbours'], [
+            'http://localhost/api/shelves/{0}'.format(shelf.pk) for shelf in shelves
+        ])
+        # the shelves with their stores, the stores' shelves and the count
+        self.assertEqual(len(selects), 3)
+
+    def test_put(self):
+        response, selects = self.dispatch('PUT', 'stores/{0}'.format(self.store.pk), json.dumps({'name': 'Corner'}))
+        self.assertEqual(response.status_code, 204)
+        self.assertIn('notes', selects[0])
+
+        store = Store.objects.get(pk=self.store.pk)
+        self.assertEqual((store.name, store.notes), ('Corner', 'open late'))
+
+    def test_put_nested_with_model_loaded_elsewhere(self):
+        ctx = mock_context()
+        # e.g. by a validator, without the store joined
+        ctx.identity_map.add(Shelf.objects.get(pk=self.shelf.pk))
+
+        with CaptureQueriesContext(django.db.connection) as queries:
+            resource = ShelfQuerySetResource().get_child_resource(ctx, str(self.shelf.pk))
+            resource.put(ctx, {'label': 'Bottom', 'store': {'name': 'Corner'}})
+        selects = [query['sql'] for query in queries.captured_queries if 'SELECT' in query['sql']]
+        # the shelf is read with its store joined, the store is not read again
+        self.assertEqual(len(selects), 1)
+        self.assertIn('FROM "django_shelf" INNER JOIN "django_store"', selects[0])
+        self.assertEqual(Store.objects.get(pk=self.store.pk).name, 'Corner')
+
+    def test_put_nested(self):
+        response, _ = self.dispatch('PUT', 'shelves/{0}'.format(self.shelf.pk), json.dumps({
+            'label': 'Bottom',
+            'store': {'name': 'Corner'}
+        }))
+        self.assertEqual(response.status_code, 204)
+
+        shelf = Shelf.objects.select_related('store').get(pk=self.shelf.pk)
+        self.assertEqual((shelf.label, shelf.position), ('Bottom', 3))
+        self.assertEqual((shelf.store.name, shelf.store.notes), ('Corner', 'open late'))
+
+
+class CachedCountTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            django.setup()
+        except AttributeError:
+            pass
+
+        with django.db.connection.schema_editor() as editor:
+            editor.create_model(Store)
+            editor.create_model(Shelf)
+
+    @classmethod
+    def tearDownClass(cls):
+        with django.db.connection.schema_editor() as editor:
+            editor.delete_model(Shelf)
+            editor.delete_model(Store)
+
+    def setUp(self):
+        caching.cache.clear()
+        self.store = Store.objects.create(name='Main')
+        Shelf.objects.create(label='Top', store=self.store)
+        Shelf.objects.create(label='Bottom', store=self.store)
+
+    def tearDown(self):
+        Shelf.objects.all().delete()
+        Store.objects.all().delete()
+
+    def get_count(self, query):
+        class CachedCountShelfQuerySetResource(ShelfQuerySetResource):
+            count_strategy = 'cached'
+            filters = [
+                ParameterizedFilter('storeName', 'store__name'),
+                ParameterizedFilter('ids', 'pk__in', value_fn=json.loads)
+            ]
+
+        ctx = mock_context()
+        ctx.request = Mock(GET=QueryDict(query))
+        return CachedCountShelfQuerySetResource().get(ctx, _ParamsImpl(ctx.request.GET))['meta']['count']
+
+    def test_related_model_saved(self):
+        self.assertEqual(self.get_count('storeName=Main'), 2)
+        self.assertEqual(self.get_count('storeName=Corner'), 0)
+
+        # a save of the joined model is seen
+        self.store.name = 'Corner'
+        self.store.save()
+        self.assertEqual(self.get_count('storeName=Main'), 0)
+        self.assertEqual(self.get_count('storeName=Corner'), 2)
+
+    def test_empty_result(self):
+        self.assertEqual(self.get_count('ids=[]'), 0)
+
+
 class DjangoUserResource(resources.ModelResource):
     '''
     Exists to test SchemaResource using Django's User model
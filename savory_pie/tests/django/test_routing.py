@@ -0,0 +1,160 @@
+try:
+    import ujson as json
+except ImportError:
+    from warnings import warn
+    warn('Using plain JSON instead of uJSON, performance may be degraded.')
+    import json
+import unittest
+
+import django.db
+from django.core.cache import cache
+
+from savory_pie.django import fields, resources
+from savory_pie.django.routing import DatabaseRouter, ReplicaRouter
+from savory_pie.resources import APIResource, EmptyParams
+from savory_pie.tests.django.mock_request import Request, savory_dispatch, savory_dispatch_batch
+from savory_pie.tests.mock_context import mock_context
+
+
+class Branch(django.db.models.Model):
+    name = django.db.models.CharField(max_length=20)
+
+
+class BranchResource(resources.ModelResource):
+    parent_resource_path = 'branches'
+    model_class = Branch
+
+    fields = [
+        fields.AttributeField(attribute='name', type=str),
+    ]
+
+
+class BranchQuerySetResource(resources.QuerySetResource):
+    resource_path = 'branches'
+    resource_class = BranchResource
+
+
+def create_root_resource():
+    root_resource = APIResource()
+    root_resource.register(BranchQuerySetResource())
+    return root_resource
+
+
+class ReplicaRouterTest(unittest.TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_reads_round_robin(self):
+        router = ReplicaRouter(['replica1', 'replica2'])
+        aliases = [router.db_for_request(Request('GET')) for _ in range(3)]
+        self.assertEqual(aliases, ['replica1', 'replica2', 'replica1'])
+
+    def test_writes_go_to_primary(self):
+        router = ReplicaRouter(['replica1'], primary='primary')
+        for method in ['POST', 'PUT', 'DELETE']:
+            self.assertEqual(router.db_for_request(Request(method)), 'primary')
+        self.assertEqual(router.db_for_write(Request('GET')), 'primary')
+
+    def test_no_replicas(self):
+        router = ReplicaRouter([])
+        self.assertEqual(router.db_for_request(Request('GET')), 'default')
+
+    def test_sticky_after_write(self):
+        router = ReplicaRouter(['replica1'], sticky_seconds=5)
+        request = Request('PUT')
+        request.META['REMOTE_ADDR'] = '10.0.0.1'
+        other_request = Request('GET')
+        other_request.META['REMOTE_ADDR'] = '10.0.0.2'
+
+        router.record_write(request)
+
+        request.method = 'GET'
+        self.assertEqual(router.db_for_request(request), 'default')
+        self.assertEqual(router.db_for_request(other_request), 'replica1')
+
+    def test_not_sticky_without_client(self):
+        router = ReplicaRouter(['replica1'], sticky_seconds=5)
+        request = Request('GET')
+        router.record_write(request)
+        self.assertEqual(router.db_for_request(request), 'replica1')
+
+    def test_base_router(self):
+        router = DatabaseRouter()
+        self.assertIsNone(router.db_for_request(Request('GET')))
+        self.assertIsNone(router.db_for_write(Request('GET')))
+
+
+class RoutingTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            django.setup()
+        except AttributeError:
+            pass
+
+        for alias in ['default', 'replica']:
+            with django.db.connections[alias].schema_editor() as editor:
+                editor.create_model(Branch)
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in ['default', 'replica']:
+            with django.db.connections[alias].schema_editor() as editor:
+                editor.delete_model(Branch)
+
+    def setUp(self):
+        cache.clear()
+        for alias, name in [('default', 'Primary'), ('replica', 'Stale')]:
+            Branch.objects.using(alias).all().delete()
+            Branch.objects.using(alias).create(pk=1, name=name)
+
+    def test_context_alias(self):
+        ctx = mock_context()
+        ctx.db_alias = 'replica'
+
+        data = BranchQuerySetResource().get(ctx, EmptyParams())
+        self.assertEqual([obj['name'] for obj in data['objects']], ['Stale'])
+
+        resource = BranchQuerySetResource().get_child_resource(ctx, '1')
+        self.assertEqual(resource.model.name, 'Stale')
+
+    def test_api_view(self):
+        router = ReplicaRouter(['replica'])
+
+        response = savory_dispatch(create_root_resource(), method='GET', resource_path='branches/1', router=router)
+        self.assertEqual(json.loads(response.content)['name'], 'Stale')
+
+        response = savory_dispatch(
+            create_root_resource(),
+            method='PUT',
+            resource_path='branches/1',
+            body=json.dumps({'name': 'Renamed'}),
+            router=router
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(Branch.objects.using('default').get(pk=1).name, 'Renamed')
+        self.assertEqual(Branch.objects.using('replica').get(pk=1).name, 'Stale')
+
+    def test_batch_reads_after_write_from_primary(self):
+        router = ReplicaRouter(['replica'])
+        uri = 'http://localhost:8081/api/v2/branches/1'
+        request_data = {
+            'data': [
+                {'method': 'get', 'uri': uri, 'body': {}},
+                {'method': 'put', 'uri': uri, 'body': {'name': 'Renamed'}},
+                {'method': 'get', 'uri': uri, 'body': {}},
+            ]
+        }
+        response = savory_dispatch_batch(
+            create_root_resource(),
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps(request_data),
+            base_regex=r'^api/v2/(?P<base_resource>.*)$',
+            router=router
+        )
+
+        data = json.loads(response.content)['data']
+        self.assertEqual([result['status'] for result in data], [200, 204, 200])
+        self.assertEqual(data[0]['data']['name'], 'Stale')
+        self.assertEqual(data[2]['data']['name'], 'Renamed')
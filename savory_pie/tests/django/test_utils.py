@@ -1,10 +1,32 @@
 import logging
 import unittest
 import mock
-from savory_pie.django.utils import Related, getLogger
+import django
+from django.db import models
+from savory_pie.django.utils import Related, getLogger, has_multivalued_joins
 from savory_pie.tests.django import mock_orm
 
 
+class Publisher(models.Model):
+    name = models.CharField(max_length=20)
+    history = models.TextField()
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=20)
+
+
+class Book(models.Model):
+    title = models.CharField(max_length=20)
+    text = models.TextField()
+    publisher = models.ForeignKey(Publisher)
+    tags = models.ManyToManyField(Tag)
+
+    @property
+    def display_title(self):
+        return self.title.title()
+
+
 class LoggerTestCase(unittest.TestCase):
 
     def test_logger_callable(self):
@@ -235,3 +257,59 @@ class RelatedTest(unittest.TestCase):
         self.assertEqual(queryset._prefetched, {
             'bar'
         })
+
+    def test_only(self):
+        related = Related()
+        related.only('title')
+        related.sub_select('publisher').only('name')
+        related.sub_prefetch('reviews').only('body')
+
+        self.assertEqual(related._only, {'title', 'publisher__name'})
+
+
+class ColumnProjectionTest(unittest.TestCase):
+    def setUp(self):
+        # Because of the app loading refactoring introduced in Django 1.7, this step is necessary
+        try:
+            django.setup()
+        except AttributeError:
+            pass
+
+    def test_prepare_only(self):
+        related = Related()
+        related.select('publisher')
+        related.only('pk', 'title', 'publisher__name')
+
+        queryset = related.prepare(Book.objects.all())
+        self.assertEqual(queryset.query.deferred_loading, (
+            {'id', 'publisher', 'publisher__name', 'title'}, False
+        ))
+        sql = str(queryset.query)
+        self.assertNotIn('"text"', sql)
+        self.assertNotIn('"history"', sql)
+        self.assertIn('"name"', sql)
+
+    def test_get_only_load_all(self):
+        related = Related()
+        related.select('publisher')
+        related.only('display_title')
+        related.sub_select('publisher').load_all()
+
+        self.assertEqual(related.get_only(Book), [
+            'id', 'publisher', 'publisher__history', 'publisher__id', 'publisher__name', 'text', 'title'
+        ])
+
+    def test_prepare_without_only(self):
+        related = Related()
+        related.select('publisher')
+
+        queryset = related.prepare(Book.objects.all())
+        self.assertEqual(queryset.query.deferred_loading, (set(), True))
+
+    def test_has_multivalued_joins(self):
+        self.assertFalse(has_multivalued_joins(Book.objects.all()))
+        self.assertFalse(has_multivalued_joins(Book.objects.filter(publisher__name='Penguin')))
+        self.assertFalse(has_multivalued_joins(Book.objects.order_by('publisher__name')))
+        self.assertTrue(has_multivalued_joins(Book.objects.filter(tags__name='classic')))
+        self.assertTrue(has_multivalued_joins(Book.objects.order_by('tags__name')))
+        self.assertTrue(has_multivalued_joins(Book.objects.extra(tables=['other'])))
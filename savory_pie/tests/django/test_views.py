@@ -6,15 +6,17 @@ except ImportError:
     warn('Using plain JSON instead of uJSON, performance may be degraded.')
     import json
 from datetime import datetime
+import threading
 
+import django.db
 import mock
 from mock import Mock, patch
 from savory_pie.errors import AuthorizationError, PreConditionError
 from savory_pie.formatters import JSONFormatter
-from savory_pie.resources import _ParamsImpl
+from savory_pie.resources import APIResource, _ParamsImpl
 from savory_pie.helpers import get_sha1
-from savory_pie.django import validators
-from savory_pie.tests.django.mock_request import savory_dispatch, savory_dispatch_batch
+from savory_pie.django import caching, fields, resources, validators, views
+from savory_pie.tests.django.mock_request import Request, savory_dispatch, savory_dispatch_batch
 from savory_pie.tests.mock_context import mock_context
 
 
@@ -245,6 +247,185 @@ class BatchViewTest(unittest.TestCase):
 
         self.assertEqual(data[0]['etag'], get_sha1(ctx, {u'name': u'value'}))
 
+    def test_get_batch_streaming(self):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['GET'],
+        )
+        grand_child_resource = root_resource.get_child_resource.return_value.get_child_resource.return_value
+
+        def streaming_get(ctx, params):
+            ctx.streaming_response = True
+            return iter(['{"objects":[', '{"name":"value"}', '],"meta":{"count":1}}'])
+        grand_child_resource.get = streaming_get
+
+        request_data = {
+            "data": [
+                self._generate_batch_partial('get', 'http://localhost:8081/api/v2/child/grandchild', {})
+            ]
+        }
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps(request_data)
+        )
+        self.assertEqual(response.status_code, 200)
+
+        data = json.loads(response.content)['data']
+        self.assertEqual(data[0]['status'], 200)
+        self.assertEqual(data[0]['data'], {'objects': [{'name': 'value'}], 'meta': {'count': 1}})
+
+    def test_get_batch_resolves_siblings_together(self):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['GET'],
+            result={'name': 'value'}
+        )
+        child_resource = root_resource.get_child_resource.return_value
+        grand_child_resource = child_resource.get_child_resource.return_value
+        child_resource.get_child_resources = Mock(return_value=[grand_child_resource, None])
+
+        request_data = {
+            "data": [
+                self._generate_batch_partial('get', 'http://localhost:8081/api/v2/child/1', {}),
+                self._generate_batch_partial('get', 'http://localhost:8081/api/v2/child/2', {}),
+            ]
+        }
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps(request_data)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(child_resource.get_child_resources.call_count, 1)
+        self.assertEqual(call_args_sans_context(child_resource.get_child_resources), [['1', '2']])
+
+        data = json.loads(response.content)['data']
+        self.assertEqual(data[0]['status'], 200)
+        self.assertEqual(data[0]['data'], {u'name': u'value'})
+
+    def test_get_batch_dedupes_identical_gets(self):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['GET', 'PUT'],
+            result={'name': 'value'}
+        )
+        grand_child_resource = root_resource.get_child_resource.return_value.get_child_resource.return_value
+        uri = 'http://localhost:8081/api/v2/child/grandchild'
+
+        request_data = {
+            "data": [
+                self._generate_batch_partial('get', uri, {'a': 1, 'b': 2}),
+                self._generate_batch_partial('get', uri, {'a': 2}),
+                self._generate_batch_partial('get', uri, {'b': 2, 'a': 1}),
+                self._generate_batch_partial('put', uri, {'name': 'other'}),
+                self._generate_batch_partial('get', uri, {'a': 1, 'b': 2}),
+            ]
+        }
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps(request_data)
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # two distinct GETs, the PUT's own and the GET after the PUT, which is run again
+        self.assertEqual(grand_child_resource.get.call_count, 4)
+        data = json.loads(response.content)['data']
+        self.assertEqual([result['status'] for result in data], [200, 200, 200, 200, 200])
+        self.assertEqual(data[2], data[0])
+
+    @patch('savory_pie.django.views.connections')
+    def test_get_batch_concurrent(self, connections):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['GET', 'PUT'],
+        )
+        grand_child_resource = root_resource.get_child_resource.return_value.get_child_resource.return_value
+        calls = []
+        started = threading.Event()
+
+        def get(ctx, params):
+            n = params.get('n')
+            calls.append(('get', n, threading.current_thread()))
+            if n == 0:
+                # only returns once another GET is running alongside
+                started.wait(5)
+            elif n == 1:
+                started.set()
+            return {'n': n}
+        grand_child_resource.get = get
+
+        def put(ctx, source_dict):
+            calls.append(('put', source_dict['n'], threading.current_thread()))
+        grand_child_resource.put = put
+
+        uri = 'http://localhost:8081/api/v2/child/grandchild'
+        request_data = {
+            "data": [
+                self._generate_batch_partial('get', uri, {'n': 0}),
+                self._generate_batch_partial('get', uri, {'n': 1}),
+                self._generate_batch_partial('put', uri, {'n': 2}),
+                self._generate_batch_partial('put', uri, {'n': 3}),
+                self._generate_batch_partial('get', uri, {'n': 4}),
+            ]
+        }
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps(request_data),
+            max_workers=2
+        )
+        self.assertEqual(response.status_code, 200)
+
+        data = json.loads(response.content)['data']
+        self.assertEqual([result['status'] for result in data], [200, 200, 204, 204, 200])
+        self.assertEqual([result['data']['n'] for result in data if 'data' in result], [0, 1, 4])
+        self.assertTrue(started.is_set())
+
+        # writes run in order, on the request's thread
+        self.assertEqual([(call[1], call[2]) for call in calls if call[0] == 'put'], [
+            (2, threading.current_thread()), (3, threading.current_thread())
+        ])
+        self.assertNotIn(threading.current_thread(), [call[2] for call in calls if call[0] == 'get' and call[1] in (0, 1)])
+        self.assertEqual(connections.close_all.call_count, 3)
+
+    def test_get_batch_in_transaction(self):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['GET'],
+        )
+        grand_child_resource = root_resource.get_child_resource.return_value.get_child_resource.return_value
+        threads = []
+
+        def get(ctx, params):
+            threads.append(threading.current_thread())
+            return {}
+        grand_child_resource.get = get
+
+        uri = 'http://localhost:8081/api/v2/child/grandchild'
+        request_data = {
+            "data": [
+                self._generate_batch_partial('get', uri, {'n': 0}),
+                self._generate_batch_partial('get', uri, {'n': 1}),
+            ]
+        }
+        # as under ATOMIC_REQUESTS
+        with django.db.transaction.atomic():
+            response = savory_dispatch_batch(
+                root_resource,
+                full_host='localhost:8081',
+                method='POST',
+                body=json.dumps(request_data),
+                max_workers=2
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(threads, [threading.current_thread()] * 2)
+
     def test_post_batch(self):
         result = Mock(resource_path='grand_child_path')
         root_resource = self.create_root_resource_with_children(
@@ -557,6 +738,92 @@ class ViewTest(unittest.TestCase):
         self.assertTrue(root_resource.get.called)
         self.assertIsNotNone(root_resource.get.call_args_list[0].request)
 
+    def test_get_response_cache_hit(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('GET')
+        root_resource.get = Mock(return_value={'foo': 'bar', '$hash': 'xyz'})
+        root_resource.response_cache = caching.LRUResponseCache()
+        root_resource.get_cache_models = Mock(return_value=[])
+
+        response = savory_dispatch(root_resource, method='GET')
+        cached_response = savory_dispatch(root_resource, method='GET')
+
+        self.assertEqual(root_resource.get.call_count, 1)
+        self.assertEqual(json.loads(cached_response.content), {'foo': 'bar', '$hash': 'xyz'})
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(cached_response['ETag'], response['ETag'])
+        self.assertEqual(cached_response['ETag'], get_sha1(mock_context(), {'foo': 'bar'}))
+
+    def dispatch_with_meta(self, root_resource, method, meta, body=None):
+        request = Request(method=method, body=body)
+        request.META.update(meta)
+        return views.api_view(root_resource)(request=request, resource_path='')
+
+    def test_get_not_modified(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('GET')
+        root_resource.get_etag = Mock(return_value='abc')
+
+        response = self.dispatch_with_meta(root_resource, 'GET', {'HTTP_IF_NONE_MATCH': '"xyz", "abc"'})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], 'abc')
+        self.assertFalse(root_resource.get.called)
+
+    def test_get_resource_etag(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('GET')
+        root_resource.get = Mock(return_value={'foo': 'bar'})
+        root_resource.get_etag = Mock(return_value='abc')
+
+        response = self.dispatch_with_meta(root_resource, 'GET', {'HTTP_IF_NONE_MATCH': 'xyz'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], 'abc')
+        self.assertEqual(response.content, '{"foo": "bar"}')
+
+    def test_get_resource_etag_revalidated(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('GET')
+        root_resource.get = Mock(return_value={'foo': 'bar'})
+        root_resource.get_etag = Mock(return_value='abc')
+
+        response = self.dispatch_with_meta(root_resource, 'GET', {})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], 'abc')
+
+        response = self.dispatch_with_meta(root_resource, 'GET', {'HTTP_IF_NONE_MATCH': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(root_resource.get.call_count, 1)
+
+    def test_get_resource_etag_streaming(self):
+        def get(ctx, params):
+            ctx.streaming_response = True
+            return iter(['{"foo": "bar"}'])
+
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('GET')
+        root_resource.get = Mock(side_effect=get)
+        root_resource.get_etag = Mock(return_value='abc')
+
+        response = self.dispatch_with_meta(root_resource, 'GET', {})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], 'abc')
+
+    def test_put_if_match_resource_etag(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('PUT')
+        root_resource.get.return_value = {}
+        root_resource.put.return_value = None
+        root_resource.get_etag = Mock(return_value='abc')
+
+        response = self.dispatch_with_meta(root_resource, 'PUT', {'HTTP_IF_MATCH': 'abc'}, body='{"foo": "bar"}')
+        self.assertEqual(response.status_code, 204)
+
+        response = self.dispatch_with_meta(root_resource, 'PUT', {'HTTP_IF_MATCH': 'xyz'}, body='{"foo": "bar"}')
+        self.assertEqual(response.status_code, 412)
+
     def test_get_success_streaming(self):
         def get(ctx, params):
             ctx.streaming_response = True
@@ -874,3 +1141,95 @@ class DjangoFPramsTest(unittest.TestCase):
 
         self.assertEqual(result, ['bar', 'baz'])
         get.getlist.assert_called_with('foo')
+
+
+class Account(django.db.models.Model):
+    name = django.db.models.CharField(max_length=20)
+
+
+class AccountResource(resources.ModelResource):
+    parent_resource_path = 'accounts'
+    model_class = Account
+
+    fields = [
+        fields.AttributeField(attribute='name', type=str),
+    ]
+
+    def put(self, ctx, source_dict, *args, **kwargs):
+        super(AccountResource, self).put(ctx, source_dict, *args, **kwargs)
+        if self.model.name == 'boom':
+            raise ValueError('boom')
+
+
+class AccountQuerySetResource(resources.QuerySetResource):
+    resource_path = 'accounts'
+    resource_class = AccountResource
+
+
+class AtomicBatchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            django.setup()
+        except AttributeError:
+            pass
+
+        with django.db.connection.schema_editor() as editor:
+            editor.create_model(Account)
+
+    @classmethod
+    def tearDownClass(cls):
+        with django.db.connection.schema_editor() as editor:
+            editor.delete_model(Account)
+
+    def setUp(self):
+        Account.objects.all().delete()
+        Account.objects.create(pk=1, name='Alice')
+
+    def dispatch(self, sub_requests, atomic):
+        root_resource = APIResource()
+        root_resource.register(AccountQuerySetResource())
+        request_data = {
+            'atomic': atomic,
+            'data': [
+                {'method': method, 'uri': 'http://localhost:8081/api/v2/' + path, 'body': body}
+                for method, path, body in sub_requests
+            ]
+        }
+
+        commit = django.db.connection.commit
+        with patch.object(django.db.connection, 'commit', side_effect=commit) as commit:
+            response = savory_dispatch_batch(
+                root_resource,
+                full_host='localhost:8081',
+                method='POST',
+                body=json.dumps(request_data),
+                base_regex=r'^api/v2/(?P<base_resource>.*)$'
+            )
+        self.assertEqual(response.status_code, 200)
+        return [result['status'] for result in json.loads(response.content)['data']], commit.call_count
+
+    def test_atomic(self):
+        statuses, commit_count = self.dispatch([
+            ('post', 'accounts', {'name': 'Bob'}),
+            ('put', 'accounts/1', {'name': 'boom'}),
+            ('post', 'accounts', {'name': 'Carol'}),
+            ('delete', 'accounts/1', None),
+            ('get', 'accounts', {}),
+        ], atomic=True)
+
+        self.assertEqual(statuses, [201, 500, 201, 200, 200])
+        self.assertEqual(commit_count, 1)
+        # the failed PUT alone was rolled back
+        self.assertEqual(sorted(Account.objects.values_list('name', flat=True)), ['Bob', 'Carol'])
+
+    def test_not_atomic(self):
+        statuses, commit_count = self.dispatch([
+            ('post', 'accounts', {'name': 'Bob'}),
+            ('put', 'accounts/1', {'name': 'boom'}),
+            ('post', 'accounts', {'name': 'Carol'}),
+        ], atomic=False)
+
+        self.assertEqual(statuses, [201, 500, 201])
+        self.assertEqual(commit_count, 2)
+        self.assertEqual(sorted(Account.objects.values_list('name', flat=True)), ['Alice', 'Bob', 'Carol'])
@@ -1,5 +1,7 @@
 import contextlib
+from collections import OrderedDict
 
+from savory_pie.context import ALL_FIELDS, IdentityMap, SubResourceMemo
 from savory_pie.formatters import JSONFormatter
 
 from mock import Mock
@@ -12,8 +14,42 @@ def mock_context():
         yield
         ctx.pop()
 
+    @contextlib.contextmanager
+    def selecting(field_selection):
+        previous = ctx.field_selection
+        if field_selection is not None:
+            ctx.field_selection = field_selection
+        try:
+            yield
+        finally:
+            ctx.field_selection = previous
+
+    @contextlib.contextmanager
+    def including():
+        if ctx.included is not None or not ctx.field_selection.has_sideloads:
+            yield None
+            return
+        ctx.included = OrderedDict()
+        try:
+            yield ctx.included
+        finally:
+            ctx.included = None
+
     ctx = Mock(name='context', spec=['push', 'pop', 'peek'])
     ctx.formatter = JSONFormatter()
     ctx.build_resource_uri = lambda resource: 'uri://' + resource.resource_path
+    ctx.build_resource_path_uri = lambda resource_path: 'uri://' + resource_path
+    ctx.resolve_resource_uris = lambda uris: [ctx.resolve_resource_uri(uri) for uri in uris]
     ctx.target = target
+    ctx.identity_map = IdentityMap()
+    ctx.field_selection = ALL_FIELDS
+    ctx.sub_resource_memo = SubResourceMemo()
+    ctx.included = None
+    ctx.db_alias = None
+    ctx.project_columns = False
+    ctx.using = lambda queryset: queryset if ctx.db_alias is None else queryset.using(ctx.db_alias)
+    ctx.including = including
+    ctx.selecting = selecting
+    ctx.selecting_child = lambda property_name: selecting(ctx.field_selection.child(property_name))
+    ctx.selecting_field = lambda field: ctx.selecting_child(field._compute_property(ctx))
     return ctx
@@ -8,6 +8,7 @@ from savory_pie.auth import (
     subobject_auth_adapter,
     uri_auth_adapter
 )
+from savory_pie.context import IdentityMap
 from savory_pie.errors import AuthorizationError
 from savory_pie.fields import IterableField, URIResourceField, URIListResourceField
 
@@ -51,7 +52,8 @@ class AuthorizationAdapterTestCase(unittest.TestCase):
         field._resource_class.return_value = 'FieldResource'
         field._compute_property.return_value = 'source_name'
         source_dict = {'source_name': {'resourceUri': 'uri'}}
-        ctx = Mock(spec=['build_resource_uri'])
+        ctx = Mock(spec=['build_resource_uri', 'identity_map'])
+        ctx.identity_map = IdentityMap()
         ctx.build_resource_uri.return_value = 'target'
         target_obj = Mock(spec=['fieldName'], fieldName='subObject')
 
@@ -76,7 +78,8 @@ class URIAuthorizationAdapterTestCase(unittest.TestCase):
         field._compute_property.return_value = 'source_name'
         field.get_iterable.return_value = ['uri1', 'uri3', 'uri2']
 
-        ctx = Mock(spec=['build_resource_uri'])
+        ctx = Mock(spec=['build_resource_uri', 'identity_map'])
+        ctx.identity_map = IdentityMap()
         ctx.build_resource_uri.side_effect = self._passthrough_method
 
         target_obj = Mock(spec=['fieldName'])
@@ -95,7 +98,8 @@ class URIAuthorizationAdapterTestCase(unittest.TestCase):
         field._resource_class.side_effect = self._passthrough_method
         field._compute_property.return_value = 'source_name'
 
-        ctx = Mock(spec=['build_resource_uri'])
+        ctx = Mock(spec=['build_resource_uri', 'identity_map'])
+        ctx.identity_map = IdentityMap()
         ctx.build_resource_uri.side_effect = self._passthrough_method
 
         target_obj = Mock(spec=['fieldName'])
@@ -115,7 +119,8 @@ class URIAuthorizationAdapterTestCase(unittest.TestCase):
         field._compute_property.return_value = 'source_name'
         field.get_iterable.return_value = ['uri3', 'uri1', 'uri2']
 
-        ctx = Mock(spec=['build_resource_uri'])
+        ctx = Mock(spec=['build_resource_uri', 'identity_map'])
+        ctx.identity_map = IdentityMap()
         ctx.build_resource_uri.side_effect = self._passthrough_method
 
         target_obj = Mock(spec=['fieldName'])
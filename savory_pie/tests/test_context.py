@@ -0,0 +1,224 @@
+import unittest
+
+from mock import Mock
+
+from savory_pie.context import ALL_FIELDS, APIContext, FieldSelection, IdentityMap
+from savory_pie.formatters import JSONFormatter
+from savory_pie.resources import APIResource, Resource, _ParamsImpl
+
+
+class ChildResource(Resource):
+    def __init__(self, key):
+        self.key = key
+
+
+class BulkResource(Resource):
+    resource_path = 'things'
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.get_child_resources = Mock(side_effect=self._get_child_resources)
+
+    def _get_child_resources(self, ctx, path_fragments):
+        return [ChildResource(fragment) if fragment in self.keys else None for fragment in path_fragments]
+
+
+class ResolveResourceUrisTest(unittest.TestCase):
+    def setUp(self):
+        self.things = BulkResource({'1', '2', '3'})
+        root = APIResource()
+        root.register(self.things)
+        self.ctx = APIContext('http://localhost/api/', root, JSONFormatter())
+
+    def test_input_order(self):
+        resources = self.ctx.resolve_resource_uris([
+            'http://localhost/api/things/3',
+            'http://localhost/api/things/1',
+            'http://localhost/api/things/2',
+        ])
+        self.assertEqual([resource.key for resource in resources], ['3', '1', '2'])
+
+    def test_single_call_per_parent(self):
+        self.ctx.resolve_resource_uris([
+            'http://localhost/api/things/1',
+            'http://localhost/api/things/2',
+        ])
+        self.things.get_child_resources.assert_called_once_with(self.ctx, ['1', '2'])
+
+    def test_misses(self):
+        resources = self.ctx.resolve_resource_uris([
+            'http://localhost/api/things/1',
+            'http://localhost/api/things/999',
+            'http://localhost/api/unknown/1',
+            'http://elsewhere/api/things/2',
+        ])
+        self.assertEqual(resources[0].key, '1')
+        self.assertEqual(resources[1:], [None, None, None])
+
+    def test_resource_path_filled_in(self):
+        resource, = self.ctx.resolve_resource_uris(['http://localhost/api/things/2'])
+        self.assertEqual(resource.resource_path, '/things/2')
+
+    def test_fallback_to_get_child_resource(self):
+        root = Mock(spec=['get_child_resource'])
+        root.get_child_resource.side_effect = lambda ctx, fragment: ChildResource(fragment)
+        ctx = APIContext('http://localhost/api/', root, JSONFormatter())
+
+        resources = ctx.resolve_resource_uris(['http://localhost/api/a', 'http://localhost/api/b'])
+        self.assertEqual([resource.key for resource in resources], ['a', 'b'])
+
+
+class Model(object):
+    def __init__(self, pk):
+        self.pk = pk
+
+
+class OtherModel(Model):
+    pass
+
+
+class IdentityMapTest(unittest.TestCase):
+    def test_add_get(self):
+        identity_map = IdentityMap()
+        model = Model(pk=1)
+        self.assertIs(identity_map.add(model), model)
+
+        self.assertIs(identity_map.get(Model, 1), model)
+        self.assertIsNone(identity_map.get(Model, 2))
+        self.assertIsNone(identity_map.get(OtherModel, 1))
+        self.assertIsNone(identity_map.get(Model, None))
+
+    def test_unsaved_models_are_ignored(self):
+        identity_map = IdentityMap()
+        identity_map.add(Model(pk=None))
+        self.assertEqual(len(identity_map), 0)
+
+    def test_discard(self):
+        identity_map = IdentityMap()
+        model = identity_map.add(Model(pk=1))
+        identity_map.discard(model)
+        self.assertIsNone(identity_map.get(Model, 1))
+
+    def test_get_related_hit(self):
+        identity_map = IdentityMap()
+        related = identity_map.add(Model(pk=7))
+        obj = Mock(spec=['other', 'other_id'], other_id=7)
+
+        self.assertIs(identity_map.get_related(obj, 'other', Model), related)
+        # the foreign key descriptor was never touched
+        self.assertNotIsInstance(obj.other, Model)
+
+    def test_get_related_miss(self):
+        identity_map = IdentityMap()
+        related = Model(pk=7)
+        obj = Mock(spec=['other', 'other_id'], other=related, other_id=7)
+
+        self.assertIs(identity_map.get_related(obj, 'other', Model), related)
+        self.assertIs(identity_map.get(Model, 7), related)
+
+    def test_add_get_loaded(self):
+        identity_map = IdentityMap()
+        model = identity_map.add_loaded('query', '1', Model(pk=1))
+
+        self.assertIs(identity_map.get_loaded('query', '1'), model)
+        self.assertIsNone(identity_map.get_loaded('other query', '1'))
+        self.assertIsNone(identity_map.get_loaded(None, '1'))
+        self.assertIs(identity_map.get(Model, 1), model)
+
+        identity_map.discard(model)
+        self.assertIsNone(identity_map.get_loaded('query', '1'))
+
+    def test_clear(self):
+        identity_map = IdentityMap()
+        identity_map.add(Model(pk=1))
+        identity_map.clear()
+        self.assertEqual(len(identity_map), 0)
+
+
+class MultiDict(dict):
+    def get(self, key, default=None):
+        return self[key][-1] if key in self else default
+
+    def getlist(self, key):
+        return dict.get(self, key, [])
+
+
+class FieldSelectionTest(unittest.TestCase):
+    def parse(self, query):
+        GET = MultiDict()
+        for pair in query.split('&'):
+            key, value = pair.split('=')
+            GET.setdefault(key, []).append(value)
+        return FieldSelection.from_params(_ParamsImpl(GET))
+
+    def test_no_params(self):
+        self.assertIsNone(self.parse('page=1'))
+        self.assertTrue(ALL_FIELDS.is_all)
+        self.assertTrue(ALL_FIELDS.includes('anything'))
+
+    def test_fields(self):
+        selection = self.parse('fields=name,manager.name&fields=reports')
+        self.assertTrue(selection.includes('name'))
+        self.assertTrue(selection.includes('manager'))
+        self.assertTrue(selection.includes('reports'))
+        self.assertFalse(selection.includes('age'))
+
+        manager = selection.child('manager')
+        self.assertTrue(manager.includes('name'))
+        self.assertFalse(manager.includes('age'))
+        self.assertIs(selection.child('reports'), ALL_FIELDS)
+
+    def test_cache_key(self):
+        self.assertEqual(
+            self.parse('fields=name,manager.name,manager.age').cache_key,
+            self.parse('fields=manager.age,name&fields=manager.name').cache_key
+        )
+        self.assertNotEqual(self.parse('fields=name').cache_key, self.parse('exclude=name').cache_key)
+        self.assertNotEqual(self.parse('fields=name').cache_key, ALL_FIELDS.cache_key)
+
+    def test_sideload(self):
+        selection = self.parse('sideload=store,items.product')
+        self.assertFalse(selection.is_all)
+        self.assertTrue(selection.has_sideloads)
+        self.assertTrue(selection.includes('name'))
+        self.assertTrue(selection.sideloads('store'))
+        self.assertFalse(selection.sideloads('items'))
+        self.assertIs(selection.child('store'), ALL_FIELDS)
+        self.assertTrue(selection.child('items').sideloads('product'))
+        self.assertNotEqual(selection.cache_key, self.parse('fields=name').cache_key)
+
+    def test_expand(self):
+        selection = self.parse('expand=store,items.product')
+        self.assertFalse(selection.is_all)
+        self.assertTrue(selection.expands('store'))
+        self.assertTrue(selection.expands('items'))
+        self.assertFalse(selection.expands('customer'))
+        self.assertTrue(selection.child('items').expands('product'))
+        self.assertIs(selection.child('store'), ALL_FIELDS)
+        self.assertTrue(self.parse('sideload=items.product').expands('items'))
+
+    def test_whole_field_wins_over_path(self):
+        selection = self.parse('fields=manager.name,manager')
+        self.assertIs(selection.child('manager'), ALL_FIELDS)
+
+        selection = self.parse('fields=manager,manager.name')
+        self.assertIs(selection.child('manager'), ALL_FIELDS)
+
+    def test_exclude(self):
+        selection = self.parse('exclude=age,manager.age')
+        self.assertFalse(selection.includes('age'))
+        self.assertTrue(selection.includes('name'))
+        self.assertTrue(selection.includes('manager'))
+        self.assertFalse(selection.child('manager').includes('age'))
+        self.assertTrue(selection.child('manager').includes('name'))
+
+    def test_selecting(self):
+        ctx = APIContext('uri://', None, JSONFormatter())
+        selection = self.parse('fields=manager.name')
+        with ctx.selecting(selection):
+            self.assertIs(ctx.field_selection, selection)
+            with ctx.selecting_child('manager'):
+                self.assertFalse(ctx.field_selection.includes('age'))
+            with ctx.selecting(None):
+                self.assertIs(ctx.field_selection, selection)
+        self.assertIs(ctx.field_selection, ALL_FIELDS)
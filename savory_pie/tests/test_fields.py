@@ -165,6 +165,62 @@ class CompleteURIResourceFieldTestCase(unittest.TestCase):
         self.assertEqual(target_dict['completeResourceUri'], 'uri://resources/1')
 
 
+class SubResourceMemoTestCase(unittest.TestCase):
+    def setUp(self):
+        from savory_pie.tests.django import mock_orm
+
+        class StoreResource(ModelResource):
+            model_class = mock_orm.Model
+            fields = [
+                AttributeField(attribute='name', type=str),
+            ]
+
+        self.resource_class = StoreResource
+        self.store = mock_orm.Model(pk=7, name='Downtown')
+        self.orders = [mock_orm.Model(store=self.store) for _ in range(3)]
+        self.get = mock.patch.object(StoreResource, 'get', autospec=True, side_effect=StoreResource.get)
+
+    def test_sub_object(self):
+        field = SubObjectResourceField(attribute='store', resource_class=self.resource_class)
+        ctx = mock_context()
+
+        with self.get as get:
+            with ctx.sub_resource_memo.enabled():
+                target_dicts = [{} for _ in self.orders]
+                for order, target_dict in zip(self.orders, target_dicts):
+                    field.handle_outgoing(ctx, order, target_dict)
+                self.assertEqual(len(ctx.sub_resource_memo), 1)
+
+            self.assertEqual(len(ctx.sub_resource_memo), 0)
+            self.assertEqual(get.call_count, 1)
+            self.assertEqual(target_dicts, [{'store': {'name': 'Downtown'}}] * 3)
+
+            # without the memo every order is serialized
+            field.handle_outgoing(ctx, self.orders[0], {})
+            self.assertEqual(get.call_count, 2)
+
+    def test_iterable_copies_shared_dict(self):
+        from savory_pie.tests.django import mock_orm
+
+        sub_object_field = SubObjectResourceField(attribute='store', resource_class=self.resource_class)
+        iterable_field = IterableField(attribute='stores', resource_class=self.resource_class)
+        order = mock_orm.Model(store=self.store, stores=mock_orm.Manager())
+        order.stores.all = Mock(return_value=mock_orm.QuerySet(self.store))
+        ctx = mock_context()
+
+        with self.get as get:
+            with ctx.sub_resource_memo.enabled():
+                target_dict = {}
+                sub_object_field.handle_outgoing(ctx, order, target_dict)
+                iterable_field.handle_outgoing(ctx, order, target_dict)
+
+            self.assertEqual(get.call_count, 1)
+            self.assertEqual(target_dict, {
+                'store': {'name': 'Downtown'},
+                'stores': [{'name': 'Downtown', '_id': '7'}]
+            })
+
+
 class AttributeFieldTestCase(unittest.TestCase):
     def test_incoming_required_and_present(self):
         ctx = mock_context()
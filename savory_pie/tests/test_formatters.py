@@ -1,9 +1,12 @@
 import unittest
 import decimal
+from collections import OrderedDict
 import datetime
+import mock
 import pytz
 
 import savory_pie.formatters
+from savory_pie.formatters import json
 
 
 class JSONToAPITest(unittest.TestCase):
@@ -185,3 +188,111 @@ class JSONToPython(unittest.TestCase):
                 self.fail(message + ', got ' + str(e.__class__))
             if succeeded_incorrectly:
                 self.fail(message)
+
+
+class StreamCollectionTest(unittest.TestCase):
+
+    def test_stream_collection(self):
+        json_formatter = savory_pie.formatters.JSONFormatter()
+        get_meta = mock.Mock(return_value={'count': 2})
+
+        fragments = json_formatter.stream_collection(iter([{'a': 1}, {'a': 2}]), get_meta)
+        head = [next(fragments), next(fragments)]
+        self.assertFalse(get_meta.called)
+
+        self.assertEqual(
+            json.loads(''.join(head + list(fragments))),
+            {'objects': [{'a': 1}, {'a': 2}], 'meta': {'count': 2}}
+        )
+
+
+class EncodeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.json_formatter = savory_pie.formatters.JSONFormatter()
+
+    def test_encode_plain(self):
+        value = {'meta': {'count': 2}, 'objects': [{'a': 1}, {'a': u'\u00e9'}], 1: None}
+        self.assertEqual(self.json_formatter.encode(value), json.dumps(value))
+
+    def test_encode_writes_encoded_dicts_verbatim(self):
+        encoded = savory_pie.formatters.EncodedDict({'a': 1}, '{"a": "encoded"}')
+        value = {'meta': {'count': 1}, 'objects': [encoded]}
+        self.assertEqual(
+            json.loads(self.json_formatter.encode(value)),
+            {'meta': {'count': 1}, 'objects': [{'a': 'encoded'}]}
+        )
+
+    def test_encode_writes_encoded_values_verbatim(self):
+        value = {'objects': [{'a': 1}, savory_pie.formatters.EncodedValue('{"a": "encoded"}')]}
+        self.assertEqual(
+            json.loads(self.json_formatter.encode(value)),
+            {'objects': [{'a': 1}, {'a': 'encoded'}]}
+        )
+
+    def test_modified_encoded_dict(self):
+        for modify in [
+            lambda dct: dct.__setitem__('b', 2),
+            lambda dct: dct.update(b=2),
+            lambda dct: dct.setdefault('b', 2),
+            lambda dct: dct.pop('a'),
+            lambda dct: dct.clear(),
+        ]:
+            encoded = savory_pie.formatters.EncodedDict({'a': 1}, '{"a": "encoded"}')
+            modify(encoded)
+            self.assertIsNone(encoded.encoded)
+            self.assertEqual(json.loads(self.json_formatter.encode({'objects': [encoded]})), {'objects': [encoded]})
+
+    def test_modified_nested_value(self):
+        encoded = savory_pie.formatters.EncodedDict({'a': {'b': 1}}, '{"a": {"b": "encoded"}}')
+        encoded['a']['b'] = 2
+        self.assertEqual(json.loads(self.json_formatter.encode({'objects': [encoded]})), {'objects': [{'a': {'b': 2}}]})
+
+        encoded = savory_pie.formatters.EncodedDict({'a': [1]}, '{"a": ["encoded"]}')
+        for key, value in encoded.iteritems():
+            value.append(2)
+        self.assertEqual(json.loads(self.json_formatter.encode({'objects': [encoded]})), {'objects': [{'a': [1, 2]}]})
+
+    def test_modified_encoded_dict_keeps_order(self):
+        dct = OrderedDict([('z', 1), ('a', 2), ('m', 3)])
+        encoded = savory_pie.formatters.EncodedDict(dct, json.dumps(dct))
+        del encoded['a']
+        encoded['b'] = 4
+        self.assertEqual(self.json_formatter.encode(encoded), json.dumps(OrderedDict([('z', 1), ('m', 3), ('b', 4)])))
+
+    def test_add_encoded_item(self):
+        dct = OrderedDict([('a', 1)])
+        encoded = self.json_formatter.add_encoded_item(json.dumps(dct), '$hash', 'abc')
+        dct['$hash'] = 'abc'
+        self.assertEqual(encoded, json.dumps(dct))
+
+
+class CompileToAPIValueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.json_formatter = savory_pie.formatters.JSONFormatter()
+
+    def test_matches_to_api_value(self):
+        now = datetime.datetime(2013, 3, 5, 14, 50, 39, 123456, pytz.UTC)
+        for _type, value in [(int, 15),
+                             (long, 15L),
+                             (float, 15.5),
+                             (bool, True),
+                             (unicode, u'abc'),
+                             (unicode, None),
+                             (decimal.Decimal, decimal.Decimal('5.10')),
+                             (datetime.datetime, now),
+                             (datetime.datetime, now.replace(tzinfo=None)),
+                             (datetime.datetime, None),
+                             (datetime.date, datetime.date(2013, 3, 5)),
+                             (datetime.date, None)]:
+            to_api_value = self.json_formatter.compile_to_api_value(_type)
+            self.assertEqual(self.json_formatter.to_api_value(_type, value), to_api_value(value))
+
+    def test_overridden_to_api_value(self):
+        class UpperFormatter(savory_pie.formatters.JSONFormatter):
+            def to_api_value(self, type_, python_value):
+                return python_value.upper()
+
+        to_api_value = UpperFormatter().compile_to_api_value(str)
+        self.assertEqual('ABC', to_api_value('abc'))
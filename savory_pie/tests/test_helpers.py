@@ -1,8 +1,11 @@
 import unittest
+from collections import OrderedDict
 from mock import Mock, patch
 
 from savory_pie import helpers
 from savory_pie.errors import MethodNotAllowedError, PreConditionError
+from savory_pie.formatters import json
+from savory_pie.tests.mock_context import mock_context
 
 
 class ResourceHelperTestCase(unittest.TestCase):
@@ -69,3 +72,32 @@ class ResourceHelperTestCase(unittest.TestCase):
         ctx = Mock(name='ctx')
         helpers.process_delete_request(ctx, resource)
         resource.delete.assert_called_with(ctx)
+
+
+class Sha1HelperTestCase(unittest.TestCase):
+    def setUp(self):
+        self.ctx = mock_context()
+
+    def test_encode_with_sha1(self):
+        dct = OrderedDict([('name', 'Bob'), ('age', 20)])
+        encoded, sha1 = helpers.encode_with_sha1(self.ctx, dct)
+        self.assertEqual(encoded, json.dumps(dct))
+        self.assertEqual(sha1, helpers.get_sha1(self.ctx, dct))
+
+    def test_encode_with_sha1_magic_variables(self):
+        dct = OrderedDict([('name', 'Bob'), ('$hash', 'abc')])
+        encoded, sha1 = helpers.encode_with_sha1(self.ctx, dct)
+        self.assertEqual(encoded, json.dumps(dct))
+        self.assertEqual(sha1, helpers.get_sha1(self.ctx, {'name': 'Bob'}))
+
+    def test_add_sha1(self):
+        dct = OrderedDict([('name', 'Bob'), ('age', 20)])
+        sha1 = helpers.get_sha1(self.ctx, dct)
+
+        hashed = helpers.add_sha1(self.ctx, dct)
+        self.assertEqual(hashed['$hash'], sha1)
+        self.assertEqual(hashed.encoded, json.dumps(OrderedDict([('name', 'Bob'), ('age', 20), ('$hash', sha1)])))
+
+    def test_add_sha1_empty(self):
+        hashed = helpers.add_sha1(self.ctx, OrderedDict())
+        self.assertEqual(json.loads(hashed.encoded), {'$hash': helpers.get_sha1(self.ctx, {})})